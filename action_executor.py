@@ -0,0 +1,152 @@
+import threading, heapq, itertools, time, collections, metrics
+from pynput.keyboard import Controller
+
+# Constants
+KEYBOARD = "keyboard"
+
+# Event of an action's timeline: time from the start of the action (in seconds), whether the key is pressed or released, and the resolved key
+TimelineEvent = collections.namedtuple("TimelineEvent", ["offset", "press", "key"])
+
+# Returns the timeline of an action: its keys pressed and released one after the other, each of them held for wait_time seconds, or all of them pressed at
+# once and released wait_time seconds later (in the same order) when it is executed as a combination
+def build_timeline(keys, combination, wait_time):
+    if combination:
+        return tuple([TimelineEvent(0.0, True, key) for key in keys] + [TimelineEvent(wait_time, False, key) for key in keys])
+
+    timeline = []
+
+    for i, key in enumerate(keys):
+        timeline.append(TimelineEvent(i * wait_time, True, key))
+        timeline.append(TimelineEvent((i + 1) * wait_time, False, key))
+
+    return tuple(timeline)
+
+# Output backend that synthesizes the keys with a pynput keyboard controller (or another object with the same press and release methods), ignoring the keys
+# that the platform can't synthesize
+class KeyboardOutput:
+    def __init__(self, controller: Controller = None):
+        self.controller = controller if controller is not None else Controller()
+
+    def press(self, key):
+        try:
+            self.controller.press(key)
+        except Controller.InvalidKeyException:
+            pass
+
+    def release(self, key):
+        try:
+            self.controller.release(key)
+        except Controller.InvalidKeyException:
+            pass
+
+# Output backend that synthesizes nothing and records the (time, pressed, key) tuple of every key event instead, for tests and benchmarks
+class RecordingOutput:
+    def __init__(self):
+        self.events = []
+
+    def press(self, key):
+        self.events.append((time.perf_counter(), True, key))
+
+    def release(self, key):
+        self.events.append((time.perf_counter(), False, key))
+
+# Action executor class. Actions are submitted as timelines, whose events are scheduled on a heap ordered by due time and performed by this thread, so the
+# thread that submits them never waits for a key to be released. Each output device executes one action at a time: an action submitted while another one is
+# in flight on the same device starts when it ends, so the keys of two actions are never interleaved, and events due at the same time are performed in the
+# order they were submitted.
+class ActionExecutor(threading.Thread):
+    def __init__(self, outputs: dict = None):
+        super().__init__(daemon=True)
+
+        # Output backend of each device, indexed by device name (a pynput keyboard if none is provided)
+        self.outputs = outputs if outputs is not None else {KEYBOARD: KeyboardOutput()}
+
+        # Scheduled events, as (due time, sequence number, device, pressed, key, callback) tuples, where pressed is None for the placeholder event of an
+        # action without keys and callback is called after the last event of each action; the sequence number keeps events due at the same time in order
+        self.events = []
+        self.sequence = itertools.count()
+
+        # Time at which the last action submitted to each device ends, and keys currently held down on each device, in the order they were pressed (released
+        # in reverse order when the executor stops, so that modifiers are released last)
+        self.free_times = dict.fromkeys(self.outputs, 0.0)
+        self.pressed_keys = {device: {} for device in self.outputs}
+
+        # Condition used to wake this thread up when an event is scheduled or the executor is stopped
+        self.condition = threading.Condition()
+        self.stopped = False
+
+    # Schedules the events of an action's timeline on a device, starting now or when the device's previous action ends, and returns the time (on the
+    # time.perf_counter clock) at which the action will end. The callback, if any, is called by this thread once the action has been executed.
+    def submit(self, timeline, device=KEYBOARD, callback=None):
+        with self.condition:
+            start_time = max(time.perf_counter(), self.free_times[device])
+            end_time = start_time + (timeline[-1].offset if timeline else 0.0)
+            self.free_times[device] = end_time
+
+            if timeline:
+                for i, event in enumerate(timeline):
+                    heapq.heappush(self.events, (start_time + event.offset, next(self.sequence), device, event.press, event.key,
+                                                 callback if i == len(timeline) - 1 else None))
+            else:
+                heapq.heappush(self.events, (start_time, next(self.sequence), device, None, None, callback))
+
+            self.condition.notify()
+
+            return end_time
+
+    # Returns True if no event is waiting to be performed; otherwise, returns False
+    def idle(self):
+        with self.condition:
+            return not self.events
+
+    # Stops the thread: the events already due are performed, the later ones are discarded and the keys still held down are released
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    # When the thread is started, the executor waits for the next due event and performs every event due by then, without holding the lock so that actions
+    # can be submitted meanwhile
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and (not self.events or self.events[0][0] > time.perf_counter()):
+                    self.condition.wait(self.events[0][0] - time.perf_counter() if self.events else None)
+
+                now = time.perf_counter()
+                due_events = []
+
+                while self.events and self.events[0][0] <= now:
+                    due_events.append(heapq.heappop(self.events))
+
+                stopped = self.stopped
+
+            self.perform(due_events, now)
+
+            if stopped:
+                break
+
+        with self.condition:
+            self.events.clear()
+
+        for device, keys in self.pressed_keys.items():
+            for key in reversed(list(keys)):
+                self.outputs[device].release(key)
+
+            keys.clear()
+
+    # Performs due events in order, recording how late each one is
+    def perform(self, due_events, now):
+        for due_time, _, device, pressed, key, callback in due_events:
+            metrics.KEY_EVENT_LATENESS.observe(now - due_time)
+
+            if pressed is not None:
+                if pressed:
+                    self.outputs[device].press(key)
+                    self.pressed_keys[device][key] = None
+                else:
+                    self.outputs[device].release(key)
+                    self.pressed_keys[device].pop(key, None)
+
+            if callback is not None:
+                callback()
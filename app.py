@@ -1,32 +1,137 @@
-import gui, gesture_recognizer, gesture_handler, threading, queue
+import startup, gesture_recognizer, gesture_handler, config_file, ring_buffer, buffer_pool, metrics, result_log, event_server, threading, queue, argparse, sys
+
+startup.mark("imports")
+
+# Constants
+FRAME_BUFFER_SIZE = 2
+EXECUTED_ACTION_BUFFER_SIZE = 8
+
+# Parses the command line arguments
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Gesture Maestro")
+    parser.add_argument("--metrics-port", type=int, help="serve the pipeline metrics in the Prometheus text format on this local TCP port")
+    parser.add_argument("--metrics-socket", help="serve the pipeline metrics in the Prometheus text format on this Unix socket")
+    parser.add_argument("--metrics-overlay", action="store_true", help="draw the pipeline metrics over the preview")
+    parser.add_argument("--events-port", type=int, help="publish the gestures and executed actions to the clients of this local TCP port")
+    parser.add_argument("--events-socket", help="publish the gestures and executed actions to the clients of this Unix socket")
+    parser.add_argument("--events-format", choices=(event_server.FORMAT_NDJSON, event_server.FORMAT_BINARY), default=event_server.FORMAT_NDJSON,
+                        help="format of the published events: newline-delimited JSON or binary frames")
+    parser.add_argument("--headless", action="store_true", help="run without an interface, writing the executed actions to stdout")
+    parser.add_argument("--source", nargs="+", default=["0"],
+                        help="frame sources used in headless mode: capture device indices, video files or directories of images (one recognizer per source)")
+    parser.add_argument("--source-workers", choices=("threads", "processes"), default="threads",
+                        help="run the recognizer of each source in a thread or in a child process when there are several sources (the pipeline metrics "
+                             "recorded by the child processes are not reported)")
+    parser.add_argument("--isolate-recognizer", action="store_true",
+                        help="run the gesture recognizer in a separate process, sending frames to the interface through shared memory")
+    parser.add_argument("--record-results", metavar="PATH", help="record every recognition result into a binary result log (appended to if it exists)")
+    parser.add_argument("--replay", metavar="PATH", help="replay a result log into the gesture handler in headless mode, instead of recognizing gestures")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="speed of the replay relative to the recorded one (0 replays as fast as possible)")
+    parser.add_argument("--report-interval", type=float, default=60.0, help="seconds between memory and CPU usage reports in headless mode (0 disables them)")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Start the metrics server if it has been requested
+    metrics_server = None
+
+    if args.metrics_port or args.metrics_socket:
+        metrics_server = metrics.MetricsServer(args.metrics_port, args.metrics_socket)
+        metrics_server.start()
+
+    # Start the event server if it has been requested
+    events = None
+
+    if args.events_port or args.events_socket:
+        events = event_server.EventServer(args.events_port, args.events_socket, args.events_format)
+        events.start()
+
+    # In headless mode, neither Tkinter nor the interface are imported
+    if args.headless:
+        import headless
+
+        return headless.run(args.source, args.report_interval, metrics_server, args.source_workers, args.record_results, args.replay, args.replay_speed, events)
+
+    import gui
 
-def main():
-    # Create queue where the gesture recognizer's callback method will put each processed frame to be displayed
-    frame_queue = queue.Queue()
-    
     # Create queue where the gesture recognizer's callback method will put the recognized gestures
     gesture_queue = queue.Queue()
 
-    # Create queue where the gesture handler will put the executed actions
-    executed_action_queue = queue.Queue()
+    # Create bounded buffer where the gesture handler will put the executed actions
+    executed_action_queue = ring_buffer.RingBuffer(EXECUTED_ACTION_BUFFER_SIZE)
 
     # Define an Event that will be used to keep the gesture recognizer working while the main thread (interface) is alive and the capture device is functional
     stop_recognizer = threading.Event()
-    
-    # Create the gesture recognizer thread
-    recognizer_thread = gesture_recognizer.LiveRecognizer(stop_recognizer, frame_queue, gesture_queue)
-    
+
+    if args.isolate_recognizer:
+        import process_recognizer
+
+        # Create the thread that runs the gesture recognizer in a separate process and receives its gestures; the frames to be displayed are read from the
+        # shared memory ring it writes them into
+        recognizer_thread = process_recognizer.ProcessRecognizer(stop_recognizer, gesture_queue, result_log_path=args.record_results)
+        frame_queue = recognizer_thread.frame_queue
+    else:
+        # Create the pool of frame buffers reused by the gesture recognizer and the interface
+        frame_pool = buffer_pool.BufferPool()
+
+        # Create bounded buffer where the gesture recognizer's callback method will put each processed frame to be displayed. When the interface falls behind,
+        # the oldest frames are overwritten and given back to the pool, so only a fixed number of frames is kept in memory.
+        frame_queue = ring_buffer.RingBuffer(FRAME_BUFFER_SIZE, frame_pool.release)
+
+        # Create the gesture recognizer thread
+        recognizer_thread = gesture_recognizer.LiveRecognizer(stop_recognizer, frame_queue, gesture_queue, frame_pool=frame_pool)
+
+        # Record every recognition result into the result log, if requested
+        if args.record_results:
+            recognizer_thread.result_log = result_log.ResultLogWriter(args.record_results)
+
+    # Report the depth of every queue in the pipeline metrics
+    metrics.register_queue("frame_queue", frame_queue)
+    metrics.register_queue("gesture_queue", gesture_queue)
+    metrics.register_queue("executed_action_queue", executed_action_queue)
+
+    # Report the state of the gesture recognizer's inference rate controller in the pipeline metrics
+    metrics.register_rate_controller(recognizer_thread)
+
     # Create the gesture handler thread
     handler_thread = gesture_handler.GestureHandler(stop_recognizer, gesture_queue, executed_action_queue)
 
+    # Publish the gestures taken by the gesture handler and the actions it executes to the clients of the event server
+    if events is not None:
+        handler_thread.add_listener(events.publish)
+
     # Create the Tkinter window
-    interface = gui.GUI(stop_recognizer, frame_queue, executed_action_queue, recognizer_thread, handler_thread)
+    interface = gui.GUI(stop_recognizer, frame_queue, executed_action_queue, recognizer_thread, handler_thread, args.metrics_overlay)
 
     # Execute the loop that keeps the Tkinter window running in the main thread
     interface.mainloop()
-    
-    # Set the Event's internal flag to true after the Tkinter window has been closed
-    stop_recognizer.set()
+
+    # Stop the gesture recognizer and handler after the Tkinter window has been closed, waking them up, as well as the thread that woke the window up
+    interface.service.stop()
+    interface.event_notifier.stop()
+
+    if interface.config_watcher is not None:
+        interface.config_watcher.stop()
+
+    # Close the result log once the recognizer has stopped writing into it
+    if getattr(recognizer_thread, "result_log", None) is not None:
+        if recognizer_thread.is_alive():
+            recognizer_thread.join()
+
+        recognizer_thread.result_log.close()
+
+    # Write the configuration edits that haven't been persisted yet
+    config_file.flush()
+
+    if metrics_server is not None:
+        metrics_server.stop()
+
+    if events is not None:
+        events.stop()
+
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+
+# Benchmarks never synthesize real key presses, so pynput's dummy backend is used unless another one is selected; this lets them run on machines without a
+# display server
+os.environ.setdefault("PYNPUT_BACKEND", "dummy")
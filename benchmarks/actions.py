@@ -0,0 +1,158 @@
+import argparse, copy, sys, time
+import config_file, gesture_handler, action_executor
+from benchmarks import common
+from pynput.keyboard import Key
+
+# Action microbenchmark: compares the per-action overhead of the handler's hot path (action lookup, combination check and key resolution) before and after
+# the actions were compiled into action plans, with a zero press-release wait time and a controller that does nothing. The key events of each plan's timeline
+# are performed right away, without the executor's scheduling (see benchmarks/executor.py). As the old hot path slept between press and release even when the
+# wait time was zero, it is measured both with a sleep that does nothing, which the speedup is computed against, and with time.sleep.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.actions [--iterations 100000] [--output actions.json]
+
+# Actions covering single characters, special keys and combinations
+ACTIONS = {
+    "Closed_Fist": ["a"],
+    "Open_Palm": ["space"],
+    "Pointing_Up": ["ctrl", "c"],
+    "Thumb_Down": ["alt", "shift", "tab"],
+    "Thumb_Up": ["media_volume_up"],
+    "Victory": ["h", "i", "enter"],
+    "ILoveYou": ["ctrl_l", "shift", "esc"]
+}
+
+# Controller that validates its arguments like pynput's (strings must be single characters) without synthesizing anything
+class NullController:
+    def press(self, key):
+        if isinstance(key, str) and len(key) != 1:
+            raise ValueError(key)
+
+    release = press
+
+# Handler hot path before action plans existed: dictionary lookups, combination check and key resolution through exceptions on every action, sleeping with
+# the given function between press and release
+class LegacyHandler:
+    InvalidKeyException = gesture_handler.Controller.InvalidKeyException
+
+    def __init__(self, keyboard, config, sleep=time.sleep):
+        self.keyboard = keyboard
+        self.sleep = sleep
+        self.actions = config["Actions"]
+        self.combination_mode = config["Settings"]["COMBINATION_MODE"]
+        self.press_release_wait_time = config["Settings"]["PRESS_RELEASE_WAIT_TIME"]
+
+    def dispatch(self, hand, gesture):
+        action = self.actions[hand][gesture]
+
+        if action:
+            if self.combination_mode and gesture_handler.action_is_combination(action):
+                self.execute_combination(action)
+            else:
+                self.execute_action(action)
+
+    def execute_action(self, action):
+        for key in action:
+            try:
+                self.keyboard.press(key)
+                self.sleep(self.press_release_wait_time)
+                self.keyboard.release(key)
+            except ValueError:
+                try:
+                    key = getattr(Key, key)
+
+                    self.keyboard.press(key)
+                    self.sleep(self.press_release_wait_time)
+                    self.keyboard.release(key)
+                except AttributeError:
+                    pass
+            except self.InvalidKeyException:
+                pass
+
+    def execute_combination(self, action):
+        for key in action:
+            try:
+                self.keyboard.press(key)
+            except ValueError:
+                try:
+                    self.keyboard.press(getattr(Key, key))
+                except AttributeError:
+                    pass
+            except self.InvalidKeyException:
+                pass
+
+        self.sleep(self.press_release_wait_time)
+
+        for key in action:
+            try:
+                self.keyboard.release(key)
+            except ValueError:
+                try:
+                    self.keyboard.release(getattr(Key, key))
+                except AttributeError:
+                    pass
+            except self.InvalidKeyException:
+                pass
+
+# Returns the mean time (in seconds) of dispatching every configured gesture once, over the given number of rounds
+def measure(dispatch, gestures, iterations):
+    start = time.perf_counter()
+
+    for _ in range(iterations):
+        for hand, gesture in gestures:
+            dispatch(hand, gesture)
+
+    return (time.perf_counter() - start) / (iterations * len(gestures))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-action overhead microbenchmark.")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    args = parser.parse_args(argv)
+
+    config = copy.deepcopy(config_file.BASE_CONFIG_DICT)
+    config["Settings"]["COMBINATION_MODE"] = True
+    config["Settings"]["PRESS_RELEASE_WAIT_TIME"] = 0
+    config["Actions"]["Left"].update(ACTIONS)
+    config["Actions"]["Right"].update(ACTIONS)
+    gestures = [(hand, gesture) for hand in ("Left", "Right") for gesture in ACTIONS]
+
+    legacy = LegacyHandler(NullController(), config, lambda seconds: None)
+    sleeping_legacy = LegacyHandler(NullController(), config)
+
+    output = action_executor.KeyboardOutput(NullController())
+    handler = gesture_handler.GestureHandler(None, None, None, executor=action_executor.ActionExecutor({action_executor.KEYBOARD: output}))
+    handler.load_config(config)
+
+    def dispatch_plan(hand, gesture):
+        plan = handler.config.action_plans.get((hand, gesture))
+
+        if plan is not None:
+            for event in plan.timeline:
+                if event.press:
+                    output.press(event.key)
+                else:
+                    output.release(event.key)
+
+    legacy_time = measure(legacy.dispatch, gestures, args.iterations)
+    sleeping_legacy_time = measure(sleeping_legacy.dispatch, gestures, args.iterations)
+    plan_time = measure(dispatch_plan, gestures, args.iterations)
+
+    results = {
+        "legacy_us_per_action": legacy_time * 1e6,
+        "legacy_sleep_us_per_action": sleeping_legacy_time * 1e6,
+        "plan_us_per_action": plan_time * 1e6,
+        "speedup": legacy_time / plan_time
+    }
+
+    report = common.build_report("actions", results, {"iterations": args.iterations})
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import argparse, sys, tracemalloc
+import numpy as np
+import cv2
+from PIL import Image
+import buffer_pool, overlay
+from benchmarks import common
+from benchmarks.overlay import synthetic_hand
+
+# Allocation benchmark: runs the per-frame image pipeline (frame read, color conversion, optional downscaling for inference, landmark drawing and conversion
+# to a Pillow image for display) the way the recognizer did before the buffer pool existed and with the pool, and reports, with tracemalloc, the number of
+# allocations and bytes allocated per frame. Every array created by a frame is kept alive until its allocations have been recorded, then freed as the real
+# pipeline does. Copies made inside MediaPipe (mp.Image) and Pillow (Image.fromarray) use their own allocators, which tracemalloc doesn't see; they are the
+# same in both paths.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.allocations [--width 1280 --height 720 --inference-width 640 --frames 200] [--output allocations.json]
+
+# Allocations smaller than this size (in bytes) are ignored, so that the interpreter's own small objects don't hide the frame buffers
+MIN_ALLOCATION_SIZE = 1024
+
+# Capture device stand-in that decodes frames like cv2.VideoCapture.read: into a new array, or into the given one if it has the frame's shape
+class SyntheticCamera:
+    def __init__(self, width, height):
+        self.frame = np.random.default_rng(0).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+    def read(self, out=None):
+        if out is None or out.shape != self.frame.shape:
+            return True, self.frame.copy()
+
+        np.copyto(out, self.frame)
+
+        return True, out
+
+# Frame pipeline before the buffer pool: a new array for every read, downscaled copy and color conversion, the latter done on the recognizer's output
+class LegacyPipeline:
+    def __init__(self, camera, inference_width, hands):
+        self.camera = camera
+        self.inference_width = inference_width
+        self.hands = hands
+        self.renderer = overlay.LandmarkRenderer()
+
+    def step(self):
+        ret, frame = self.camera.read()
+        height, width = frame.shape[:2]
+        inference_frame = cv2.resize(frame, (self.inference_width, round(height * self.inference_width / width)), interpolation=cv2.INTER_AREA)
+
+        image_array = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        for hand_landmarks in self.hands:
+            self.renderer.draw(image_array, hand_landmarks)
+
+        image_pil = Image.fromarray(image_array)
+
+        return frame, inference_frame, image_array, image_pil
+
+# Frame pipeline with the buffer pool: the frame is read into a reused buffer and converted to RGB once into a pooled one, which is downscaled into another
+# pooled buffer, drawn on in place and released once the Pillow copy exists
+class PooledPipeline:
+    def __init__(self, camera, inference_width, hands):
+        self.camera = camera
+        self.inference_width = inference_width
+        self.hands = hands
+        self.renderer = overlay.LandmarkRenderer()
+        self.pool = buffer_pool.BufferPool()
+        self.capture_buffer = None
+
+    def step(self):
+        ret, self.capture_buffer = self.camera.read(self.capture_buffer)
+        frame = cv2.cvtColor(self.capture_buffer, cv2.COLOR_BGR2RGB, dst=self.pool.acquire(self.capture_buffer.shape))
+
+        height, width = frame.shape[:2]
+        inference_height = round(height * self.inference_width / width)
+        inference_frame = cv2.resize(frame, (self.inference_width, inference_height), dst=self.pool.acquire((inference_height, self.inference_width, 3)),
+                                     interpolation=cv2.INTER_AREA)
+        self.pool.release(inference_frame)
+
+        for hand_landmarks in self.hands:
+            self.renderer.draw(frame, hand_landmarks)
+
+        image_pil = Image.fromarray(frame)
+        self.pool.release(frame)
+
+        return frame, inference_frame, image_pil
+
+# Returns the mean number of allocations and bytes allocated per frame by a pipeline, after a few warm-up frames
+def measure(pipeline, frames, warmup=5):
+    for _ in range(warmup):
+        pipeline.step()
+
+    allocation_counts = []
+    allocated_bytes = []
+    size_filter = lambda statistics: [stat for stat in statistics if stat.size_diff >= MIN_ALLOCATION_SIZE]
+
+    tracemalloc.start()
+
+    for _ in range(frames):
+        before = tracemalloc.take_snapshot()
+        outputs = pipeline.step()
+        after = tracemalloc.take_snapshot()
+
+        statistics = size_filter(after.compare_to(before, "traceback"))
+        allocation_counts.append(sum(max(stat.count_diff, 0) for stat in statistics))
+        allocated_bytes.append(sum(stat.size_diff for stat in statistics))
+
+        del outputs
+
+    tracemalloc.stop()
+
+    return {
+        "allocations_per_frame": sum(allocation_counts) / frames,
+        "bytes_per_frame": sum(allocated_bytes) / frames
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-frame allocation benchmark.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--inference-width", type=int, default=640)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    hands = [synthetic_hand(rng, 0.3), synthetic_hand(rng, 0.7)]
+    camera = SyntheticCamera(args.width, args.height)
+
+    results = {
+        "legacy": measure(LegacyPipeline(camera, args.inference_width, hands), args.frames),
+        "pooled": measure(PooledPipeline(camera, args.inference_width, hands), args.frames)
+    }
+
+    report = common.build_report("allocations", results, vars(args))
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import json, math, platform, subprocess, sys, time
+
+# Constants
+DEFAULT_REGRESSION_THRESHOLD = 0.1
+
+# Returns the given percentile (0-100) of a list of values using linear interpolation, or None if the list is empty
+def percentile(values, pct):
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+# Returns a dictionary summarizing a list of durations in seconds, converted to milliseconds
+def summarize_ms(values):
+    values_ms = [value * 1000 for value in values]
+
+    return {
+        "count": len(values_ms),
+        "mean": sum(values_ms) / len(values_ms) if values_ms else None,
+        "p50": percentile(values_ms, 50),
+        "p95": percentile(values_ms, 95),
+        "p99": percentile(values_ms, 99),
+        "max": max(values_ms) if values_ms else None
+    }
+
+# Returns the short hash of the current git revision, or None if it cannot be retrieved
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Wraps the results of a benchmark with information about the environment it was run on
+def build_report(benchmark, results, parameters=None):
+    return {
+        "benchmark": benchmark,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters or {},
+        "results": results
+    }
+
+# Writes a report as JSON to the given path, or to stdout if no path is provided
+def write_report(report, path=None):
+    if path:
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+
+# Returns the numeric leaves of a nested dictionary as a flat dictionary whose keys are dot-separated paths
+def flatten(results, prefix=""):
+    flat = {}
+
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+
+    return flat
+
+# Compares the results of two reports and returns a list of (metric, baseline, current, relative change) tuples for every metric that got worse by more than
+# the threshold. Metrics whose path ends with one of the higher_is_better suffixes (e.g. "fps") are regressions when they decrease; any other metric (durations,
+# dropped frames...) is a regression when it increases.
+def find_regressions(baseline, current, threshold=DEFAULT_REGRESSION_THRESHOLD, higher_is_better=("fps", "throughput", "speedup", "frames_read", "results", "gestures", "actions")):
+    baseline_flat = flatten(baseline["results"])
+    current_flat = flatten(current["results"])
+    regressions = []
+
+    for metric, baseline_value in baseline_flat.items():
+        current_value = current_flat.get(metric)
+
+        if current_value is None or baseline_value == 0 or metric.endswith(".count"):
+            continue
+
+        change = (current_value - baseline_value) / abs(baseline_value)
+
+        if metric.split(".")[-1].endswith(higher_is_better):
+            change = -change
+
+        if change > threshold:
+            regressions.append((metric, baseline_value, current_value, change))
+
+    return regressions
+
+# Loads a JSON report from the given path
+def load_report(path):
+    with open(path, 'r') as file:
+        return json.load(file)
+
+# Prints the regressions of a report against a baseline report (or the path to one) to stderr and returns 1 if any was found; otherwise, returns 0
+def report_regressions(baseline, current, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    if isinstance(baseline, str):
+        baseline = load_report(baseline)
+
+    regressions = find_regressions(baseline, current, threshold)
+
+    for metric, baseline_value, current_value, change in regressions:
+        print(f"REGRESSION {metric}: {baseline_value:.4g} -> {current_value:.4g} ({change:+.1%})", file=sys.stderr)
+
+    if not regressions:
+        print(f"No regressions above {threshold:.0%} against revision {baseline.get('revision')}", file=sys.stderr)
+
+    return 1 if regressions else 0
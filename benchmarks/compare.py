@@ -0,0 +1,26 @@
+import argparse, sys
+from benchmarks import common
+
+# Compares two JSON reports produced by any benchmark (e.g. one per revision) and exits with status 1 if the second one shows regressions.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.compare baseline.json current.json [--threshold 0.1]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports and flag regressions.")
+    parser.add_argument("baseline", help="JSON report of the reference revision")
+    parser.add_argument("current", help="JSON report of the revision under test")
+    parser.add_argument("--threshold", type=float, default=common.DEFAULT_REGRESSION_THRESHOLD, help="relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    baseline = common.load_report(args.baseline)
+    current = common.load_report(args.current)
+
+    if baseline["benchmark"] != current["benchmark"]:
+        print(f"Reports belong to different benchmarks ({baseline['benchmark']} and {current['benchmark']})", file=sys.stderr)
+        return 2
+
+    return common.report_regressions(baseline, current, args.threshold)
+
+if __name__ == "__main__":
+    sys.exit(main())
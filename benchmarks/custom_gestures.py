@@ -0,0 +1,69 @@
+import argparse, sys, time
+import numpy as np
+import custom_gestures
+from benchmarks import common
+
+# Custom gesture benchmark: measures the time the classifier needs to classify the hands of a result (one or two hands) against a growing number of
+# synthetic templates, and checks that each hand is given the gesture whose templates it was generated from.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.custom_gestures [--templates 10 100 1000] [--iterations 5000] [--output custom_gestures.json]
+
+# Returns a (count, 21, 3) array of random hands scattered around a base hand pose, as MediaPipe's normalized landmarks
+def synthetic_hands(rng, pose, count, noise=0.01):
+    return (pose + rng.normal(0, noise, (count, custom_gestures.LANDMARK_COUNT, 3))).astype(np.float32)
+
+# Returns the time (in seconds) of each classification of the same hands, and whether every hand was given the expected gesture
+def measure(classifier, hands, left_hands, expected, iterations):
+    durations = []
+    correct = True
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        gestures = classifier.classify(hands, left_hands)
+        durations.append(time.perf_counter() - start)
+
+        correct = correct and gestures == expected
+
+    return durations, correct
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custom gesture classification benchmark.")
+    parser.add_argument("--templates", type=int, nargs="+", default=[10, 100, 1000], help="total numbers of templates to compare")
+    parser.add_argument("--gestures", type=int, default=10, help="number of custom gestures the templates are split into")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    poses = rng.uniform(0.3, 0.7, (args.gestures, custom_gestures.LANDMARK_COUNT, 3))
+    names = [f"gesture_{i}" for i in range(args.gestures)]
+    results = {}
+
+    for template_count in args.templates:
+        samples = max(template_count // args.gestures, 1)
+        templates = {name: custom_gestures.normalize(synthetic_hands(rng, pose, samples), np.zeros(samples, bool)) for name, pose in zip(names, poses)}
+        classifier = custom_gestures.CustomGestureClassifier(templates)
+
+        hands = np.concatenate((synthetic_hands(rng, poses[0], 1), synthetic_hands(rng, poses[-1], 1)))
+
+        one_hand, one_hand_correct = measure(classifier, hands[:1], [False], names[:1], args.iterations)
+        two_hands, two_hands_correct = measure(classifier, hands, [False, False], [names[0], names[-1]], args.iterations)
+
+        results[f"templates_{template_count}"] = {
+            "one_hand_ms": common.summarize_ms(one_hand),
+            "two_hands_ms": common.summarize_ms(two_hands),
+            "correct": one_hand_correct and two_hands_correct
+        }
+
+    report = common.build_report("custom_gestures", results, vars(args))
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
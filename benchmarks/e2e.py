@@ -0,0 +1,181 @@
+import argparse, copy, queue, sys, threading, time
+import buffer_pool, config_file, frame_source, gesture_handler, gesture_recognizer, ring_buffer
+from benchmarks import common
+
+# End-to-end benchmark: replays a recorded clip through the gesture recognizer and handler (headless, with a fake keyboard) and measures the latency between
+# a frame being read and the key of the resulting action being pressed.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.e2e --video clip.mp4 --output current.json [--baseline previous.json]
+
+# Fake keyboard controller that records when each key is pressed instead of synthesizing it
+class FakeController:
+    def __init__(self):
+        # End-to-end latencies (in seconds) from frame read to first key press of each action
+        self.latencies = []
+
+        # Time of every key press, and number of them already attributed to an executed action
+        self.press_times = []
+        self.attributed_count = 0
+
+    def press(self, key):
+        self.press_times.append(time.perf_counter())
+
+    def release(self, key):
+        pass
+
+    # Makes a gesture handler report its executed actions to this controller, which measures each of them against the capture time of the gesture that
+    # triggered it. Actions are executed one after the other by the handler's executor (which also presses the keys), so the first key press of an action is
+    # the first one that no previous action has accounted for.
+    def attach(self, handler):
+        action_executed = handler.action_executed
+
+        def measured_action_executed(plan, gesture_info, submit_time):
+            press_count = sum(1 for event in plan.timeline if event.press)
+
+            if press_count:
+                self.latencies.append(self.press_times[self.attributed_count] - gesture_info["captured_at"])
+                self.attributed_count += press_count
+
+            action_executed(plan, gesture_info, submit_time)
+
+        handler.action_executed = measured_action_executed
+
+# Queue that records how long each item waited before being consumed
+class TimedQueue(queue.Queue):
+    def __init__(self):
+        super().__init__()
+
+        self.wait_times = []
+
+    def put(self, item, block=True, timeout=None):
+        super().put((time.perf_counter(), item), block, timeout)
+
+    def get(self, block=True, timeout=None):
+        put_time, item = super().get(block, timeout)
+
+        if item is not None:
+            self.wait_times.append(time.perf_counter() - put_time)
+
+        return item
+
+# Returns a configuration where every gesture of both hands triggers the same single key action
+def build_config(press_release_wait_time, action_cooldown, idle_fps=0.0, max_fps=0.0, max_in_flight=1, inference_width=0):
+    config = copy.deepcopy(config_file.BASE_CONFIG_DICT)
+
+    for hand in config["Actions"]:
+        for gesture in config["Actions"][hand]:
+            config["Actions"][hand][gesture] = ["a"]
+
+    config["Settings"]["PRESS_RELEASE_WAIT_TIME"] = press_release_wait_time
+    config["Settings"]["ACTION_COOLDOWN"] = action_cooldown
+    config["Inference"]["IDLE_FPS"] = idle_fps
+    config["Inference"]["MAX_FPS"] = max_fps
+    config["Inference"]["MAX_IN_FLIGHT"] = max_in_flight
+    config["Capture"]["INFERENCE_WIDTH"] = inference_width
+
+    return config
+
+# Runs the recognizer and handler over a frame source and returns the measured results
+def run(source, config, result_workers=gesture_recognizer.DEFAULT_RESULT_WORKERS, max_gesture_age=gesture_handler.GESTURE_MAX_AGE, drain_timeout=2.0):
+    stop_recognizer = threading.Event()
+    stop_handler = threading.Event()
+    frame_pool = buffer_pool.BufferPool()
+    frame_queue = ring_buffer.RingBuffer(1, frame_pool.release)
+    gesture_queue = TimedQueue()
+    executed_action_queue = ring_buffer.RingBuffer(1)
+
+    recognizer = gesture_recognizer.LiveRecognizer(stop_recognizer, frame_queue, gesture_queue, source, result_workers, frame_pool=frame_pool)
+    recognizer.load_config(config)
+    keyboard = FakeController()
+    handler = gesture_handler.GestureHandler(stop_handler, gesture_queue, executed_action_queue, keyboard, max_gesture_age)
+    handler.load_config(config)
+    keyboard.attach(handler)
+
+    # Time spent in the recognizer's result callback (except for the result of the warm-up inference)
+    callback_times = []
+    handle_result = recognizer.handle_result
+
+    def timed_handle_result(result, output_image, timestamp_ms):
+        if timestamp_ms == gesture_recognizer.WARMUP_TIMESTAMP:
+            handle_result(result, output_image, timestamp_ms)
+            return
+
+        start = time.perf_counter()
+        handle_result(result, output_image, timestamp_ms)
+        callback_times.append(time.perf_counter() - start)
+
+    recognizer.handle_result = timed_handle_result
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    recognizer.start()
+    handler.start()
+
+    # The recognizer stops by itself when the frame source has no more frames
+    recognizer.join()
+    elapsed = time.perf_counter() - start
+    cpu_time = time.process_time() - cpu_start
+
+    # Give the handler some time to consume the remaining gestures before stopping it
+    deadline = time.perf_counter() + drain_timeout
+
+    while not gesture_queue.empty() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    handler.stop()
+    handler.join()
+
+    frames_read = getattr(source, "frame_index", len(callback_times))
+    controller = recognizer.controller
+
+    return {
+        "frames_read": frames_read,
+        "results": len(callback_times),
+        "inference_frames_submitted": controller.submitted_count,
+        "inference_frames_skipped": controller.skipped_count,
+        "inference_frames_dropped": max(controller.submitted_count - len(callback_times), 0),
+        "preview_frames_dropped": frame_queue.dropped_count,
+        "capture_fps": frames_read / elapsed,
+        "result_fps": len(callback_times) / elapsed,
+        "cpu_ms_per_frame": cpu_time * 1000 / max(frames_read, 1),
+        "cpu_utilization": cpu_time / elapsed,
+        "gestures": len(gesture_queue.wait_times),
+        "actions": len(keyboard.latencies),
+        "end_to_end_latency_ms": common.summarize_ms(keyboard.latencies),
+        "callback_time_ms": common.summarize_ms(callback_times),
+        "gesture_queue_wait_ms": common.summarize_ms(gesture_queue.wait_times)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end capture to action latency benchmark.")
+    parser.add_argument("--video", required=True, help="recorded clip (video file or directory of images) to replay")
+    parser.add_argument("--fast", action="store_true", help="replay frames as fast as possible instead of at the clip's frame rate")
+    parser.add_argument("--press-release-wait", type=float, default=0.0, help="PRESS_RELEASE_WAIT_TIME setting used by the handler")
+    parser.add_argument("--cooldown", type=float, default=0.0, help="ACTION_COOLDOWN setting used by the handler")
+    parser.add_argument("--max-gesture-age", type=float, default=gesture_handler.GESTURE_MAX_AGE, help="dispatch deadline used by the handler")
+    parser.add_argument("--idle-fps", type=float, default=0.0, help="inference rate while no hand is detected (0 means unlimited)")
+    parser.add_argument("--max-fps", type=float, default=0.0, help="maximum inference rate (0 means unlimited)")
+    parser.add_argument("--max-in-flight", type=int, default=1, help="frames that can wait for a result at the same time")
+    parser.add_argument("--inference-width", type=int, default=0, help="width frames are downscaled to before inference (0 means never)")
+    parser.add_argument("--result-workers", type=int, default=gesture_recognizer.DEFAULT_RESULT_WORKERS, help="number of result worker threads")
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=common.DEFAULT_REGRESSION_THRESHOLD, help="relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    source = frame_source.from_spec(args.video, realtime=not args.fast)
+    results = run(source, build_config(args.press_release_wait, args.cooldown, args.idle_fps, args.max_fps, args.max_in_flight, args.inference_width), args.result_workers, args.max_gesture_age)
+    report = common.build_report("e2e", results, {"video": args.video, "fast": args.fast, "press_release_wait": args.press_release_wait,
+                                                  "cooldown": args.cooldown, "result_workers": args.result_workers,
+                                                  "max_gesture_age": args.max_gesture_age, "idle_fps": args.idle_fps, "max_fps": args.max_fps,
+                                                  "max_in_flight": args.max_in_flight, "inference_width": args.inference_width})
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report, args.threshold)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
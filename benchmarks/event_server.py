@@ -0,0 +1,172 @@
+import argparse, asyncio, json, multiprocessing, os, sys, tempfile, time
+import event_server, metrics
+from benchmarks import common
+
+# Constants
+STATS_TIMEOUT = 60.0
+
+# Event server load test: starts the event server on a Unix socket (or a local TCP port) and connects hundreds of simulated subscribers to it from a separate
+# process, some of which stop reading. Events are then published at a steady rate, and the time of each publish call (what the gesture handler pays), the
+# delivery latency seen by the subscribers that keep reading and the events dropped for those that don't are reported.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.event_server [--subscribers 500 --slow 50 --events 1000 --rate 100] [--format binary] [--output events.json]
+
+# Reads events from a connection until it is closed (or reset), recording their delivery latency, the number received and the gaps in their sequence
+# numbers. A slow subscriber doesn't read anything until the server is told to close the connections.
+async def subscribe(connect, frame_format, slow, release_slow, stats):
+    reader, writer = await connect()
+    stats["connected"] += 1
+
+    if slow:
+        await release_slow.wait()
+
+    received = 0
+    last_seq = -1
+    latencies = []
+    buffer = b""
+
+    while True:
+        try:
+            data = await reader.read(65536)
+        except OSError:
+            break
+
+        if not data:
+            break
+
+        now = time.time()
+        buffer += data
+
+        if frame_format == event_server.FORMAT_BINARY:
+            events, consumed = event_server.decode_binary(buffer)
+            buffer = buffer[consumed:]
+        else:
+            *lines, buffer = buffer.split(b"\n")
+            events = [json.loads(line) for line in lines]
+
+        for event in events:
+            received += 1
+
+            if not slow:
+                latencies.append(now - event["time"])
+
+            last_seq = event["seq"]
+
+    writer.close()
+
+    stats["slow_received" if slow else "received"].append(received)
+    stats["slow_last_seq" if slow else "last_seq"].append(last_seq)
+    stats["latencies"].extend(latencies)
+
+# Subscriber process: connects every subscriber, reports when they are all connected, lets the slow ones read once the publisher is done and sends the
+# statistics back through the pipe
+def run_subscribers(address, frame_format, subscriber_count, slow_count, connection):
+    async def main():
+        if isinstance(address, str):
+            connect = lambda: asyncio.open_unix_connection(address, limit=1 << 20)
+        else:
+            connect = lambda: asyncio.open_connection("127.0.0.1", address, limit=1 << 20)
+
+        stats = {"connected": 0, "received": [], "last_seq": [], "slow_received": [], "slow_last_seq": [], "latencies": []}
+        release_slow = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        tasks = [asyncio.create_task(subscribe(connect, frame_format, i < slow_count, release_slow, stats)) for i in range(subscriber_count)]
+
+        while stats["connected"] < subscriber_count:
+            await asyncio.sleep(0.01)
+
+        connection.send("connected")
+
+        # Wait for the publisher to be done, then let the slow subscribers drain what is left for them
+        await loop.run_in_executor(None, connection.recv)
+        release_slow.set()
+
+        await asyncio.gather(*tasks)
+
+        connection.send(stats)
+
+    asyncio.run(main())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Event server load test.")
+    parser.add_argument("--subscribers", type=int, default=500, help="number of simulated subscribers")
+    parser.add_argument("--slow", type=int, default=50, help="number of subscribers that stop reading while events are published")
+    parser.add_argument("--events", type=int, default=1000, help="number of events published")
+    parser.add_argument("--rate", type=float, default=100.0, help="events published per second (0 publishes as fast as possible)")
+    parser.add_argument("--format", choices=(event_server.FORMAT_NDJSON, event_server.FORMAT_BINARY), default=event_server.FORMAT_NDJSON)
+    parser.add_argument("--tcp", action="store_true", help="listen on a local TCP port instead of a Unix socket")
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = None if args.tcp else os.path.join(directory, "events.sock")
+        server = event_server.EventServer(0 if args.tcp else None, socket_path, args.format)
+        server.start()
+        server.ready.wait()
+
+        context = multiprocessing.get_context("spawn")
+        connection, child_connection = context.Pipe()
+        subscribers = context.Process(target=run_subscribers, args=(server.port if args.tcp else socket_path, args.format, args.subscribers, args.slow,
+                                                                    child_connection))
+        subscribers.start()
+        connection.recv()
+
+        # The server may not have accepted every connection the subscribers have opened yet
+        while len(server.subscribers) < args.subscribers:
+            time.sleep(0.01)
+
+        dropped_count = metrics.EVENTS_DROPPED.value
+        publish_times = []
+        start = time.perf_counter()
+
+        for i in range(args.events):
+            if args.rate > 0:
+                delay = start + i / args.rate - time.perf_counter()
+
+                if delay > 0:
+                    time.sleep(delay)
+
+            publish_start = time.perf_counter()
+            server.publish({"type": "gesture", "name": "Thumb_Up", "hand": "Right"})
+            publish_times.append(time.perf_counter() - publish_start)
+
+        elapsed = time.perf_counter() - start
+
+        # Give the fast subscribers time to receive the last events, then close every connection so that the slow ones read what is left for them
+        time.sleep(0.5)
+        connection.send("done")
+        server.stop()
+
+        if not connection.poll(STATS_TIMEOUT):
+            subscribers.terminate()
+            print("The subscribers did not report their statistics", file=sys.stderr)
+            return 1
+
+        stats = connection.recv()
+        subscribers.join()
+
+    fast_count = args.subscribers - args.slow
+
+    results = {
+        "publish_us": {key: value * 1000 for key, value in common.summarize_ms(publish_times).items() if key != "count"},
+        "publish_rate": args.events / elapsed,
+        "delivery_latency_ms": common.summarize_ms(stats["latencies"]),
+        "fast_events_received": sum(stats["received"]) / max(fast_count, 1),
+        "fast_events_complete": all(received == args.events for received in stats["received"]),
+        "slow_events_received": sum(stats["slow_received"]) / max(args.slow, 1),
+        "events_dropped": metrics.EVENTS_DROPPED.value - dropped_count
+    }
+
+    report = common.build_report("event_server", results, vars(args))
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
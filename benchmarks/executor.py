@@ -0,0 +1,134 @@
+import argparse, sys, threading, time
+import action_executor, gesture_handler, metrics, ring_buffer
+from benchmarks import common, e2e
+
+# Action executor benchmark: feeds gestures to the gesture handler at a steady rate while their actions (several keys, each held for the press-release wait
+# time) are being executed, and compares how long the gestures wait to be handled when the keys are performed by the handler's own thread, as the handler used
+# to do, and by the action executor. Keys go to a recording output, whose events are checked to follow each action's timeline without interleaving actions.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.executor [--keys 3 --wait 0.1 --interval 0.02 --duration 5] [--output executor.json]
+
+# Stand-in for the action executor that performs each timeline in the thread that submits it, sleeping between its events as the handler used to
+class BlockingExecutor:
+    def __init__(self, output):
+        self.output = output
+
+    def submit(self, timeline, device=action_executor.KEYBOARD, callback=None):
+        start_time = time.perf_counter()
+
+        for event in timeline:
+            delay = start_time + event.offset - time.perf_counter()
+
+            if delay > 0:
+                time.sleep(delay)
+
+            if event.press:
+                self.output.press(event.key)
+            else:
+                self.output.release(event.key)
+
+        if callback is not None:
+            callback()
+
+        return time.perf_counter()
+
+    def is_alive(self):
+        return True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def join(self):
+        pass
+
+# Returns True if the recorded key events are a sequence of whole timelines (every action's keys pressed and released in order, without the keys of another
+# action in between); otherwise, returns False
+def events_in_order(events, timeline):
+    expected = [(event.press, event.key) for event in timeline]
+    recorded = [(pressed, key) for _, pressed, key in events]
+
+    return len(recorded) % len(expected) == 0 and all(recorded[i:i + len(expected)] == expected for i in range(0, len(recorded), len(expected)))
+
+# Feeds gestures to a handler using the given executor and output for the given duration, and returns the measured results
+def run(executor, output, config, interval, duration):
+    stop_handler = threading.Event()
+    gesture_queue = e2e.TimedQueue()
+    executed_action_queue = ring_buffer.RingBuffer(1)
+
+    handler = gesture_handler.GestureHandler(stop_handler, gesture_queue, executed_action_queue, executor=executor)
+    handler.load_config(config)
+    plan = handler.config.action_plans[("Right", "Closed_Fist")]
+
+    expired_count = metrics.GESTURES_EXPIRED.value
+    suppressed_count = metrics.ACTIONS_SUPPRESSED.value
+    executed_count = metrics.ACTIONS_EXECUTED.value
+    max_depth = 0
+    gesture_count = 0
+
+    handler.start()
+    start = time.perf_counter()
+
+    while time.perf_counter() - start < duration:
+        gesture_queue.put({"name": "Closed_Fist", "hand": "Right", "timestamp": gesture_count, "captured_at": time.perf_counter()})
+        gesture_count += 1
+        max_depth = max(max_depth, gesture_queue.qsize())
+
+        time.sleep(interval)
+
+    # Let the last gestures be handled and the last action end before stopping the handler
+    while not gesture_queue.empty():
+        time.sleep(0.001)
+
+    time.sleep(plan.timeline[-1].offset + 0.05)
+
+    handler.stop()
+    handler.join()
+
+    return {
+        "gestures": gesture_count,
+        "actions": metrics.ACTIONS_EXECUTED.value - executed_count,
+        "gestures_suppressed": metrics.ACTIONS_SUPPRESSED.value - suppressed_count,
+        "gestures_expired": metrics.GESTURES_EXPIRED.value - expired_count,
+        "max_queue_depth": max_depth,
+        "gesture_queue_wait_ms": common.summarize_ms(gesture_queue.wait_times),
+        "events_in_order": events_in_order(output.events, plan.timeline)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Action executor benchmark.")
+    parser.add_argument("--keys", type=int, default=3, help="number of keys of the action")
+    parser.add_argument("--wait", type=float, default=0.1, help="press-release wait time")
+    parser.add_argument("--cooldown", type=float, default=0.0, help="action cooldown")
+    parser.add_argument("--interval", type=float, default=0.02, help="time between two gestures")
+    parser.add_argument("--duration", type=float, default=5.0, help="time during which gestures are fed to the handler")
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    args = parser.parse_args(argv)
+
+    config = e2e.build_config(args.wait, args.cooldown)
+    config["Actions"]["Right"]["Closed_Fist"] = [chr(ord("a") + i) for i in range(args.keys)]
+
+    results = {}
+
+    blocking_output = action_executor.RecordingOutput()
+    results["blocking"] = run(BlockingExecutor(blocking_output), blocking_output, config, args.interval, args.duration)
+
+    scheduled_output = action_executor.RecordingOutput()
+    results["scheduled"] = run(action_executor.ActionExecutor({action_executor.KEYBOARD: scheduled_output}), scheduled_output, config, args.interval, args.duration)
+
+    results["queue_wait_p99_speedup"] = results["blocking"]["gesture_queue_wait_ms"]["p99"] / max(results["scheduled"]["gesture_queue_wait_ms"]["p99"], 1e-6)
+
+    report = common.build_report("executor", results, vars(args))
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import argparse, queue, statistics, sys, threading, time
+import buffer_pool, frame_source, gesture_recognizer, process_recognizer, ring_buffer
+from benchmarks import common, e2e
+
+# Isolation benchmark: replays a clip through the gesture recognizer running in the interface's process and in a separate process (frames through shared
+# memory), while a simulated interface holds the GIL for a given time per displayed frame (as a heavy preview or a slow key sequence would), and compares the
+# rate and jitter of the frames delivered to the interface in both modes.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.isolation --video clip.mp4 [--duration 20 --load-ms 15] [--output isolation.json]
+
+# Simulated interface: takes the newest frame each time one is delivered, holding the GIL for load_time seconds (pure Python work), and records the delivery
+# times
+class BusyConsumer(threading.Thread):
+    def __init__(self, frame_queue, frame_pool, load_time):
+        super().__init__(daemon=True)
+
+        self.frame_queue = frame_queue
+        self.frame_pool = frame_pool
+        self.load_time = load_time
+
+        self.delivery_times = []
+        self.frame_ready = threading.Event()
+        self.stopped = False
+
+        frame_queue.add_listener(self.notify)
+
+    def notify(self):
+        self.delivery_times.append(time.perf_counter())
+        self.frame_ready.set()
+
+    def run(self):
+        while not self.stopped:
+            if not self.frame_ready.wait(0.1):
+                continue
+
+            self.frame_ready.clear()
+
+            try:
+                frame = self.frame_queue.get_latest()
+            except queue.Empty:
+                continue
+
+            deadline = time.perf_counter() + self.load_time
+            total = 0
+
+            while time.perf_counter() < deadline:
+                total += sum(range(1000))
+
+            self.frame_pool.release(frame)
+
+# Runs the recognizer in the given mode for the given time and returns the measured results
+def run(video, mode, config, duration, load_time):
+    stop_recognizer = threading.Event()
+    gesture_queue = queue.Queue()
+
+    if mode == "process":
+        recognizer = process_recognizer.ProcessRecognizer(stop_recognizer, gesture_queue, video, loop=True)
+        frame_queue = recognizer.frame_queue
+        frame_pool = recognizer.frame_pool
+    else:
+        source = frame_source.from_spec(video)
+
+        if hasattr(source, "loop"):
+            source.loop = True
+
+        frame_pool = buffer_pool.BufferPool()
+        frame_queue = ring_buffer.RingBuffer(1, frame_pool.release)
+        recognizer = gesture_recognizer.LiveRecognizer(stop_recognizer, frame_queue, gesture_queue, source, frame_pool=frame_pool)
+
+    recognizer.load_config(config)
+    consumer = BusyConsumer(frame_queue, frame_pool, load_time)
+
+    recognizer.start()
+    consumer.start()
+
+    # Measure from the first delivered frame, once the model has been loaded
+    while not consumer.delivery_times and not stop_recognizer.is_set():
+        time.sleep(0.01)
+
+    start_count = len(consumer.delivery_times)
+    time.sleep(duration)
+    deliveries = consumer.delivery_times[start_count:]
+
+    stop_recognizer.set()
+    recognizer.active.set()
+    recognizer.join()
+    consumer.stopped = True
+
+    if recognizer.error is not None:
+        raise RuntimeError(recognizer.error)
+
+    intervals = [later - earlier for earlier, later in zip(deliveries, deliveries[1:])]
+
+    return {
+        "frames_delivered": len(deliveries),
+        "delivery_fps": len(deliveries) / duration,
+        "frame_interval_ms": common.summarize_ms(intervals),
+        "jitter_ms": statistics.pstdev(intervals) * 1000 if len(intervals) > 1 else None
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In-process and process-isolated recognizer comparison.")
+    parser.add_argument("--video", required=True, help="capture device index, or recorded clip (video file or directory of images) replayed in a loop")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds measured in each mode")
+    parser.add_argument("--load-ms", type=float, default=15.0, help="milliseconds the simulated interface holds the GIL for each frame")
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=common.DEFAULT_REGRESSION_THRESHOLD, help="relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    config = e2e.build_config(0.0, 0.0)
+    results = {mode: run(args.video, mode, config, args.duration, args.load_ms / 1000) for mode in ("in_process", "process")}
+
+    report = common.build_report("isolation", results, vars(args))
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report, args.threshold)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
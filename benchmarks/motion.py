@@ -0,0 +1,93 @@
+import argparse, math, sys, time
+import numpy as np
+import motion_gestures, result_log
+from benchmarks import common
+
+# Motion gesture benchmark: runs the motion tracker over synthetic palm trajectories (a swipe in each direction, a circle in each direction and a still,
+# jittery hand), checking that each one is detected as expected, and measures the time of each tracker update. With --log, the tracker is also run over the
+# landmarks of a recorded result log (see --record-results), reporting the motion gestures found in it.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.motion [--fps 30] [--log results.bin] [--output motion.json]
+
+# Returns the synthetic trajectories (lists of palm positions, in normalized coordinates of a square frame) and the gesture expected from each of them
+def synthetic_trajectories(fps, rng):
+    swipe = [i / (fps * 0.3) for i in range(int(fps * 0.3) + 1)]
+    circle = [2 * math.pi * i / fps for i in range(int(fps * 1.2))]
+
+    return {
+        motion_gestures.SWIPE_LEFT: [(0.75 - 0.5 * p, 0.5) for p in swipe],
+        motion_gestures.SWIPE_RIGHT: [(0.25 + 0.5 * p, 0.5) for p in swipe],
+        motion_gestures.SWIPE_UP: [(0.5, 0.75 - 0.5 * p) for p in swipe],
+        motion_gestures.SWIPE_DOWN: [(0.5, 0.25 + 0.5 * p) for p in swipe],
+        motion_gestures.CIRCLE_CLOCKWISE: [(0.5 + 0.15 * math.cos(a), 0.5 + 0.15 * math.sin(a)) for a in circle],
+        motion_gestures.CIRCLE_COUNTERCLOCKWISE: [(0.5 + 0.15 * math.cos(a), 0.5 - 0.15 * math.sin(a)) for a in circle],
+        None: [tuple(0.5 + rng.normal(0, 0.004, 2)) for _ in range(fps * 10)]
+    }
+
+# Runs a new tracker over a trajectory, returning the names of the detected gestures and the time (in seconds) of each update
+def measure(points, fps, noise, rng):
+    tracker = motion_gestures.MotionTracker()
+    names = []
+    durations = []
+
+    for i, (x, y) in enumerate(points):
+        x += rng.normal(0, noise)
+        y += rng.normal(0, noise)
+
+        start = time.perf_counter()
+        events = tracker.update([("Right", x, y)], i / fps, 1.0)
+        durations.append(time.perf_counter() - start)
+
+        names.extend(name for name, _ in events)
+
+    return names, durations
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Motion gesture detection benchmark.")
+    parser.add_argument("--fps", type=int, default=30, help="frame rate of the synthetic trajectories")
+    parser.add_argument("--noise", type=float, default=0.002, help="standard deviation of the noise added to the synthetic positions")
+    parser.add_argument("--log", help="result log whose landmarks are also run through the tracker")
+    parser.add_argument("--aspect-ratio", type=float, default=motion_gestures.DEFAULT_ASPECT_RATIO, help="aspect ratio of the frames of the result log")
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    all_durations = []
+    detections = {}
+
+    for expected, points in synthetic_trajectories(args.fps, rng).items():
+        names, durations = measure(points, args.fps, args.noise, rng)
+        all_durations.extend(durations)
+        detections[expected or "Still"] = {"detected": names, "correct": names == ([expected] if expected else [])}
+
+    results = {
+        "update_ms": common.summarize_ms(all_durations),
+        "detections": detections,
+        "correct": all(detection["correct"] for detection in detections.values())
+    }
+
+    if args.log:
+        records = result_log.load(args.log)
+
+        start = time.perf_counter()
+        events = motion_gestures.detect_records(records, aspect_ratio=args.aspect_ratio, times=result_log.replay_offsets(records))
+        elapsed = time.perf_counter() - start
+
+        results["log"] = {
+            "records": len(records),
+            "record_throughput": len(records) / elapsed if elapsed else 0.0,
+            "gestures": {name: sum(1 for _, event_name, _ in events if event_name == name) for name in motion_gestures.GESTURE_NAMES}
+        }
+
+    report = common.build_report("motion", results, vars(args))
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import argparse, queue, sys, threading, time
+import frame_source, multi_source
+from benchmarks import common, e2e
+
+# Multi-source benchmark: replays several recorded clips at the same time, each one through its own gesture recognizer, and measures the aggregate inference
+# throughput with 1 to N sources, with the recognizers running in threads and in child processes. Clips are replayed as fast as they can be decoded, so the
+# throughput is bound by inference; with processes, it should scale with the number of cores. It also checks, with simulated sources, that the merged gestures
+# leave in capture order (the only check run when no clip is given).
+#
+# Usage (from the repository root):
+#     python -m benchmarks.multi_source [--video a.mp4 b.mp4 c.mp4] [--modes threads processes] [--output multi_source.json]
+
+# Returns the number of frames of a recorded clip
+def frame_count(spec):
+    count = 0
+
+    with frame_source.from_spec(spec, realtime=False) as source:
+        while source.read()[0]:
+            count += 1
+
+    return count
+
+# Simulated source worker, used in place of multi_source.run_source_worker: its spec is a start time and a list of (name, capture delay, delivery delay)
+# gestures, each of which is put into the output queue once its delivery delay (in seconds since the start time) has passed
+def simulated_source_worker(index, spec, config, output_queue, stop_event, realtime=True):
+    start_time, gestures = spec
+
+    for name, capture_delay, delivery_delay in gestures:
+        time.sleep(max(start_time + delivery_delay - time.perf_counter(), 0))
+        output_queue.put((index, "gesture", {"name": name, "hand": "Right", "timestamp": 0, "captured_at": start_time + capture_delay}))
+
+    output_queue.put((index, "end", (None, {})))
+
+# Returns True if the merged gestures leave in capture order when a slower source delivers an earlier gesture after a faster source has delivered a later one,
+# both of them taking longer than the reorder window to arrive
+def check_capture_order(reorder_window=multi_source.REORDER_WINDOW):
+    stop_recognizer = threading.Event()
+    gesture_queue = queue.Queue()
+
+    start_time = time.perf_counter() + 0.05
+    specs = [(start_time, [("Thumb_Up", 0.0, 0.05 + 3 * reorder_window)]), (start_time, [("Victory", reorder_window / 2, 0.05 + 2 * reorder_window)])]
+
+    recognizer = multi_source.MultiSourceRecognizer(stop_recognizer, gesture_queue, specs, reorder_window=reorder_window,
+                                                    source_worker=simulated_source_worker)
+    recognizer.start()
+    recognizer.join()
+
+    names = []
+
+    while (gesture := gesture_queue.get()) is not None:
+        names.append(gesture["name"])
+
+    return names == ["Thumb_Up", "Victory"]
+
+# Runs one recognizer per source until every source has ended and returns the measured results
+def run(source_specs, mode, config):
+    stop_recognizer = threading.Event()
+    gesture_queue = queue.Queue()
+
+    recognizer = multi_source.MultiSourceRecognizer(stop_recognizer, gesture_queue, source_specs, mode, realtime=False)
+    recognizer.load_config(config)
+
+    start = time.perf_counter()
+    recognizer.start()
+    recognizer.join()
+    elapsed = time.perf_counter() - start
+
+    if recognizer.error is not None:
+        raise RuntimeError(recognizer.error)
+
+    stats = [source_stats or {} for source_stats in recognizer.source_stats]
+    frames_read = sum(source_stats.get("frames_read", 0) for source_stats in stats)
+    submitted = sum(source_stats.get("inference_frames_submitted", 0) for source_stats in stats)
+
+    # The model is loaded by each recognizer, so the elapsed time includes loading it; the clips should be long enough for that to be negligible
+    return {
+        "sources": len(source_specs),
+        "elapsed_s": elapsed,
+        "frames_read": frames_read,
+        "inference_frames_submitted": submitted,
+        "capture_fps": frames_read / elapsed,
+        "inference_fps": submitted / elapsed,
+        "gestures": sum(recognizer.received_counts),
+        "gestures_forwarded": recognizer.forwarded_count,
+        "gestures_deduplicated": recognizer.deduplicated_count
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-source recognition throughput benchmark.")
+    parser.add_argument("--video", nargs="+", default=[], help="recorded clips (video files or directories of images), one per source")
+    parser.add_argument("--modes", nargs="+", choices=(multi_source.MODE_THREADS, multi_source.MODE_PROCESSES),
+                        default=[multi_source.MODE_THREADS, multi_source.MODE_PROCESSES])
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=common.DEFAULT_REGRESSION_THRESHOLD, help="relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    config = e2e.build_config(0.0, 0.0)
+    results = {"capture_order": check_capture_order(), "frames": {spec: frame_count(spec) for spec in args.video}}
+
+    for mode in (args.modes if args.video else []):
+        runs = [run(args.video[:count], mode, config) for count in range(1, len(args.video) + 1)]
+        single_fps = runs[0]["inference_fps"]
+
+        results[mode] = {
+            "runs": {str(result["sources"]): result for result in runs},
+            "speedup": runs[-1]["inference_fps"] / single_fps if single_fps else None
+        }
+
+    report = common.build_report("multi_source", results, vars(args))
+    common.write_report(report, args.output)
+
+    if not results["capture_order"]:
+        print("The merged gestures did not leave in capture order", file=sys.stderr)
+        return 1
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report, args.threshold)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
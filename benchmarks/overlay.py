@@ -0,0 +1,79 @@
+import argparse, sys, time, types
+import numpy as np
+import overlay
+from benchmarks import common
+
+# Overlay benchmark: compares the time needed to draw the landmarks of two hands on a frame with MediaPipe's drawing_utils (building a protobuf landmark list
+# per hand, as the recognizer used to do) and with overlay.LandmarkRenderer.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.overlay [--width 1280 --height 720 --iterations 2000] [--output overlay.json]
+
+# Returns a list with the landmarks of a synthetic hand, as objects with x, y and z attributes like the ones returned by MediaPipe
+def synthetic_hand(rng, center_x):
+    points = rng.uniform(-0.15, 0.15, size=(overlay.NUM_LANDMARKS, 3)) + (center_x, 0.5, 0)
+
+    return [types.SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in points]
+
+# Draws the hands the way the recognizer's callback did before the renderer existed
+def draw_with_protobuf(image, hands):
+    import mediapipe as mp
+    from mediapipe.framework.formats import landmark_pb2
+
+    for hand_landmarks in hands:
+        hand_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
+        hand_landmarks_proto.landmark.extend([
+        landmark_pb2.NormalizedLandmark(x=landmark.x, y=landmark.y, z=landmark.z) for landmark in hand_landmarks
+        ])
+        mp.solutions.drawing_utils.draw_landmarks(
+        image,
+        hand_landmarks_proto,
+        mp.solutions.hands.HAND_CONNECTIONS,
+        mp.solutions.drawing_styles.get_default_hand_landmarks_style(),
+        mp.solutions.drawing_styles.get_default_hand_connections_style())
+
+# Returns the time (in seconds) of each call of a drawing function over the same frame
+def measure(draw, image, hands, iterations):
+    durations = []
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        draw(image, hands)
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Landmark overlay drawing benchmark.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    hands = [synthetic_hand(rng, 0.3), synthetic_hand(rng, 0.7)]
+    image = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+    renderer = overlay.LandmarkRenderer()
+
+    results = {
+        "renderer_ms": common.summarize_ms(measure(lambda frame, hands: [renderer.draw(frame, hand) for hand in hands], image, hands, args.iterations))
+    }
+
+    try:
+        results["protobuf_ms"] = common.summarize_ms(measure(draw_with_protobuf, image, hands, args.iterations))
+        results["speedup"] = results["protobuf_ms"]["mean"] / results["renderer_ms"]["mean"]
+    except ImportError:
+        print("MediaPipe is not installed, skipping the protobuf drawing path", file=sys.stderr)
+
+    report = common.build_report("overlay", results, vars(args))
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import argparse, sys, time
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageTk
+import gui, preview
+from benchmarks import common
+
+# Preview benchmark: measures the time the Tkinter thread spends per displayed frame the way GUI.update_image did before the preview renderer existed (loading
+# the fonts, drawing the texts and creating a new PhotoImage on every frame) and with preview.PreviewRenderer. Without a display, the PhotoImage step can't be
+# measured, so both paths stop at the Pillow image.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.preview [--width 1280 --height 720 --scale 1.0 --iterations 500] [--output preview.json]
+
+ACTION_TEXT = "['ctrl', 'c']"
+METRICS_TEXT = "capture 30.0 fps | results 30.0 fps\ninference p50 25.0 ms | display p50 4.0 ms\ndispatch p50 0.1 ms | actions 3 (+0 suppressed)"
+
+# Renders a frame the way GUI.update_image did before the preview renderer existed, returning the PhotoImage (or the Pillow image without a display)
+def legacy_render(image_array, with_tk):
+    image_pil = Image.fromarray(image_array)
+
+    draw = ImageDraw.Draw(image_pil)
+    draw.text((20, 20), ACTION_TEXT, font=ImageFont.truetype(gui.FONT_PATH, 18), fill=(255, 0, 0))
+    draw.multiline_text((20, 50), METRICS_TEXT, font=ImageFont.truetype(gui.FONT_PATH, 12), fill=(255, 255, 0))
+
+    return ImageTk.PhotoImage(image_pil) if with_tk else image_pil
+
+# Renders a frame with a preview renderer, stopping at the Pillow image without a display
+def renderer_render(renderer, image_array, with_tk):
+    if with_tk:
+        return renderer.render(image_array, ACTION_TEXT, METRICS_TEXT)
+
+    image_pil = Image.fromarray(renderer.downscale(image_array))
+    renderer.paste_text(image_pil, preview.ACTION_POSITION, ACTION_TEXT, renderer.action_font, preview.ACTION_COLOR)
+    renderer.paste_text(image_pil, preview.METRICS_POSITION, METRICS_TEXT, renderer.metrics_font, preview.METRICS_COLOR)
+
+    return image_pil
+
+# Returns the time (in seconds) of each call of a render function
+def measure(render, iterations):
+    durations = []
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render()
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preview rendering benchmark (Tkinter thread time per frame).")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--scale", type=float, default=preview.SCALE, help="preview scale factor used by the renderer")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    args = parser.parse_args(argv)
+
+    image = np.random.default_rng(0).integers(0, 256, size=(args.height, args.width, 3), dtype=np.uint8)
+    renderer = preview.PreviewRenderer(gui.FONT_PATH, scale=args.scale)
+
+    # A Tkinter root is needed to create PhotoImages
+    try:
+        root = gui.tk.Tk()
+        root.withdraw()
+        with_tk = True
+    except gui.tk.TclError:
+        print("No display available, skipping the PhotoImage step", file=sys.stderr)
+        with_tk = False
+
+    legacy_durations = measure(lambda: legacy_render(image, with_tk), args.iterations)
+    renderer_durations = measure(lambda: renderer_render(renderer, image, with_tk), args.iterations)
+
+    results = {
+        "legacy_ms": common.summarize_ms(legacy_durations),
+        "renderer_ms": common.summarize_ms(renderer_durations),
+        "speedup": sum(legacy_durations) / sum(renderer_durations)
+    }
+
+    report = common.build_report("preview", results, dict(vars(args), photo_image=with_tk))
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import argparse, os, queue, sys, tempfile, threading, time, types
+import numpy as np
+import custom_gestures, gesture_handler, metrics, motion_gestures, result_log, ring_buffer
+from benchmarks import common, e2e
+
+# Replay benchmark: feeds the gestures of a result log (recorded with --record-results, or synthesized) into the gesture handler as fast as possible, with a
+# fake keyboard and no action cooldown, and measures the handler's throughput, the actions it executes and, when replaying at a given speed, the latency from
+# each gesture's capture time to its key press. It doesn't need MediaPipe, a webcam or a display. It also checks that a recorded custom gesture and a
+# recorded swipe are replayed as such.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.replay [--log results.bin | --records 100000] [--output replay.json]
+
+# Writes a result log of the given number of synthetic records, captured at the given frame rate, where each hand shows a random gesture with the given
+# probability
+def synthesize(path, count, fps=30.0, gesture_probability=0.5, seed=0):
+    random = np.random.default_rng(seed)
+    records = np.zeros(count, result_log.RECORD_DTYPE)
+
+    records["timestamp_ms"] = np.arange(count) * 1000 // fps
+    records["captured_at"] = np.arange(count) / fps
+    records["hand_count"] = random.integers(0, result_log.MAX_HANDS + 1, count)
+
+    hands = records["hands"]
+    hands["hand"] = [1, 2]
+    hands["hand_score"] = 0.9
+    hands["gesture"] = np.where(random.random((count, result_log.MAX_HANDS)) < gesture_probability,
+                                random.integers(1, len(result_log.GESTURE_NAMES), (count, result_log.MAX_HANDS)), 0)
+    hands["gesture_score"] = random.uniform(0.5, 1.0, (count, result_log.MAX_HANDS))
+    hands["landmarks"] = random.random((count, result_log.MAX_HANDS, result_log.LANDMARK_COUNT, 3))
+
+    with open(path, "wb") as file:
+        file.write(result_log.build_header())
+        file.write(records.tobytes())
+
+# Returns a stand-in for a GestureRecognizerResult with a single right hand, whose top built-in gesture is "None", with the given (21, 3) landmarks
+def fake_result(landmarks):
+    return types.SimpleNamespace(handedness=[[types.SimpleNamespace(category_name="Right", score=0.95)]],
+                                 gestures=[[types.SimpleNamespace(category_name="None", score=0.9)]],
+                                 hand_landmarks=[[types.SimpleNamespace(x=x, y=y, z=z) for x, y, z in landmarks.tolist()]])
+
+# Records a hand showing a custom gesture (which the model doesn't know) while it moves to the right into a result log, replays it with that gesture's
+# template, and returns the names of the replayed gestures, which should include the custom gesture and a swipe to the right
+def check_recorded_gestures(directory, fps=30.0, frames=10, step=0.05):
+    random = np.random.default_rng(0)
+    pose = random.uniform(0.0, 0.15, (result_log.LANDMARK_COUNT, 3)).astype(np.float32)
+    path = os.path.join(directory, "custom.bin")
+
+    writer = result_log.ResultLogWriter(path)
+
+    for i in range(frames):
+        landmarks = pose + [0.1 + i * step, 0.4, 0.0]
+        writer.write(fake_result(landmarks), int(i * 1000 / fps), i / fps)
+
+    writer.close()
+
+    gesture_queue = queue.Queue()
+    records = result_log.load(path)
+    replayer = result_log.ResultReplayer(threading.Event(), gesture_queue, records, 0.0)
+    replayer.custom_gestures.set_templates({"Rock": custom_gestures.normalize(pose[None], [False], motion_gestures.DEFAULT_ASPECT_RATIO)})
+    replayer.run()
+
+    names = []
+
+    while (gesture := gesture_queue.get()) is not None:
+        names.append(gesture["name"])
+
+    del records
+
+    return names
+
+# Replays the records into the gesture handler and returns the measured results
+def run(records, config, speed=0.0):
+    stop_recognizer = threading.Event()
+    stop_handler = threading.Event()
+    gesture_queue = e2e.TimedQueue()
+    executed_action_queue = ring_buffer.RingBuffer(1)
+
+    replayer = result_log.ResultReplayer(stop_recognizer, gesture_queue, records, speed)
+    replayer.load_config(config)
+    keyboard = e2e.FakeController()
+    handler = gesture_handler.GestureHandler(stop_handler, gesture_queue, executed_action_queue, keyboard)
+    handler.load_config(config)
+    keyboard.attach(handler)
+
+    suppressed_count = metrics.ACTIONS_SUPPRESSED.value
+    expired_count = metrics.GESTURES_EXPIRED.value
+
+    start = time.perf_counter()
+    handler.start()
+    replayer.start()
+    replayer.join()
+
+    # The replayer has put its None sentinel last, so the handler has consumed every gesture once the queue is empty
+    while not gesture_queue.empty():
+        time.sleep(0.001)
+
+    elapsed = time.perf_counter() - start
+
+    handler.stop()
+    handler.join()
+
+    results = {
+        "records": len(records),
+        "gestures": replayer.gesture_count,
+        "actions": len(keyboard.latencies),
+        "actions_suppressed": metrics.ACTIONS_SUPPRESSED.value - suppressed_count,
+        "gestures_expired": metrics.GESTURES_EXPIRED.value - expired_count,
+        "elapsed_s": elapsed,
+        "gesture_throughput": replayer.gesture_count / elapsed,
+        "action_throughput": len(keyboard.latencies) / elapsed,
+        "record_throughput": len(records) / elapsed,
+        "gesture_queue_wait_ms": common.summarize_ms(gesture_queue.wait_times)
+    }
+
+    # When replaying as fast as possible, the gestures are captured ahead of real time on the replay clock, so their latency isn't meaningful
+    if speed > 0:
+        results["end_to_end_latency_ms"] = common.summarize_ms(keyboard.latencies)
+
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Result log replay throughput benchmark.")
+    parser.add_argument("--log", help="result log to replay (a synthetic one is generated if omitted)")
+    parser.add_argument("--records", type=int, default=100000, help="number of records of the synthetic result log")
+    parser.add_argument("--speed", type=float, default=0.0, help="speed of the replay relative to the recorded one (0 replays as fast as possible)")
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=common.DEFAULT_REGRESSION_THRESHOLD, help="relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.log
+
+        if path is None:
+            path = os.path.join(directory, "results.bin")
+            synthesize(path, args.records)
+
+        load_start = time.perf_counter()
+        records = result_log.load(path)
+        load_time = time.perf_counter() - load_start
+
+        # Every gesture triggers a single key action, with no cooldown, so that actions are only suppressed while another one is being executed
+        results = run(records, e2e.build_config(0.0, 0.0), args.speed)
+        results["load_ms"] = load_time * 1000
+        results["log_bytes"] = os.path.getsize(path)
+
+        # Release the memory map before the temporary directory is removed
+        del records
+
+        replayed_names = check_recorded_gestures(directory)
+        results["recorded_gestures_replayed"] = "Rock" in replayed_names and motion_gestures.SWIPE_RIGHT in replayed_names
+
+    report = common.build_report("replay", results, vars(args))
+    common.write_report(report, args.output)
+
+    if not results["recorded_gestures_replayed"]:
+        print(f"A recorded custom gesture and swipe were replayed as {replayed_names}", file=sys.stderr)
+        return 1
+
+    # A replay where the handler suppresses every gesture only measures the suppression path
+    if results["gestures"] and not results["actions"]:
+        print(f"None of the {results['gestures']} replayed gestures were executed", file=sys.stderr)
+        return 1
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report, args.threshold)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import argparse, sys
+import frame_source
+from benchmarks import common, e2e
+
+# Inference resolution benchmark: replays the same clip once per inference width (0 meaning the full frame) as fast as it can be decoded, and reports the
+# frame rates and the CPU time spent per frame, showing the trade-off between the resolution the hand model receives and the cost of the pipeline.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.resolution --video clip.mp4 [--widths 0 1280 960 640 320] [--output resolution.json]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inference resolution trade-off benchmark.")
+    parser.add_argument("--video", required=True, help="recorded clip (video file or directory of images) to replay")
+    parser.add_argument("--widths", type=int, nargs="+", default=[0, 1280, 960, 640, 480, 320], help="inference widths to measure (0 means the full frame)")
+    parser.add_argument("--realtime", action="store_true", help="replay frames at the clip's frame rate instead of as fast as possible")
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=common.DEFAULT_REGRESSION_THRESHOLD, help="relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+
+    for width in args.widths:
+        source = frame_source.from_spec(args.video, realtime=args.realtime)
+        run = e2e.run(source, e2e.build_config(0.0, 0.0, inference_width=width))
+
+        results[f"width_{width}"] = {
+            "capture_fps": run["capture_fps"],
+            "result_fps": run["result_fps"],
+            "cpu_ms_per_frame": run["cpu_ms_per_frame"],
+            "cpu_utilization": run["cpu_utilization"],
+            "gestures": run["gestures"],
+            "end_to_end_latency_ms": run["end_to_end_latency_ms"]
+        }
+
+    report = common.build_report("resolution", results, {"video": args.video, "widths": args.widths, "realtime": args.realtime})
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report, args.threshold)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
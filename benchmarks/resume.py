@@ -0,0 +1,82 @@
+import argparse, queue, sys, threading, time
+import buffer_pool, frame_source, gesture_recognizer, ring_buffer
+from benchmarks import common, e2e
+
+# Resume benchmark: replays a clip (or reads a capture device) through the gesture recognizer, pauses and resumes it repeatedly, and measures the time between
+# each resume request and the first frame read after it, with the frame source kept open while paused and released while paused. The model is only loaded
+# once, before the first cycle.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.resume --video clip.mp4 [--cycles 20 --pause 0.5] [--output resume.json]
+
+# Pauses and resumes the recognizer the given number of times, returning the resume durations (in seconds)
+def measure(recognizer, cycles, pause_time, release_source):
+    durations = []
+
+    for _ in range(cycles):
+        recognizer.pause(release_source)
+        time.sleep(pause_time)
+
+        recognizer.last_resume_duration = None
+        recognizer.resume()
+
+        deadline = time.perf_counter() + 5.0
+
+        while recognizer.last_resume_duration is None and time.perf_counter() < deadline:
+            time.sleep(0.001)
+
+        if recognizer.last_resume_duration is not None:
+            durations.append(recognizer.last_resume_duration)
+
+        time.sleep(pause_time)
+
+    return durations
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pause/resume latency benchmark.")
+    parser.add_argument("--video", required=True, help="capture device index, or recorded clip (video file or directory of images) replayed in a loop")
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds spent paused (and running) in each cycle")
+    parser.add_argument("--output", help="path of the JSON report (stdout if omitted)")
+    parser.add_argument("--baseline", help="JSON report of a previous run to check for regressions")
+    args = parser.parse_args(argv)
+
+    source = frame_source.from_spec(args.video)
+
+    if hasattr(source, "loop"):
+        source.loop = True
+
+    stop_recognizer = threading.Event()
+    frame_pool = buffer_pool.BufferPool()
+    recognizer = gesture_recognizer.LiveRecognizer(stop_recognizer, ring_buffer.RingBuffer(1, frame_pool.release), queue.Queue(), source, frame_pool=frame_pool)
+    recognizer.load_config(e2e.build_config(0.0, 0.0))
+
+    load_start = time.perf_counter()
+    recognizer.start()
+
+    while recognizer.frame_queue.qsize() == 0 and not stop_recognizer.is_set():
+        time.sleep(0.001)
+
+    first_frame_time = time.perf_counter() - load_start
+
+    results = {
+        "first_frame_ms": first_frame_time * 1000,
+        "frame_interval_ms": 1000 / (getattr(source, "fps", 0) or frame_source.DEFAULT_FPS),
+        "resume_open_ms": common.summarize_ms(measure(recognizer, args.cycles, args.pause, False)),
+        "resume_released_ms": common.summarize_ms(measure(recognizer, args.cycles, args.pause, True))
+    }
+
+    stop_recognizer.set()
+    recognizer.active.set()
+    recognizer.join()
+
+    report = common.build_report("resume", results, vars(args))
+    common.write_report(report, args.output)
+
+    if args.baseline:
+        return common.report_regressions(args.baseline, report)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import threading, collections
+import numpy as np
+
+# Constants
+DEFAULT_POOL_SIZE = 8
+
+# Pool of preallocated image buffers, used so that the per-frame image pipeline (color conversion, downscaling and drawing) writes into the same few arrays
+# instead of allocating new ones for every frame. A buffer is acquired for a given shape, handed from thread to thread along with the frame it holds, and
+# released by the last one that uses it. Only buffers acquired from the pool are taken back, and each of them only once, so releasing an array twice or
+# releasing an array that doesn't belong to the pool is harmless. When every buffer is in use, a new one is allocated; at most max_free buffers of each shape
+# are kept.
+class BufferPool:
+    def __init__(self, max_free: int = DEFAULT_POOL_SIZE, dtype=np.uint8):
+        self.max_free = max_free
+        self.dtype = dtype
+
+        # Buffers that are not in use, indexed by shape
+        self.free = collections.defaultdict(list)
+
+        # Buffers that have been acquired and not released yet, indexed by id
+        self.in_use = {}
+
+        # Number of buffers allocated and number of acquisitions served with a free buffer
+        self.allocated_count = 0
+        self.reused_count = 0
+
+        self.lock = threading.Lock()
+
+    # Returns a buffer with the given shape, whose content is undefined
+    def acquire(self, shape):
+        shape = tuple(shape)
+
+        with self.lock:
+            free = self.free.get(shape)
+
+            if free:
+                buffer = free.pop()
+                self.reused_count += 1
+            else:
+                buffer = np.empty(shape, self.dtype)
+                self.allocated_count += 1
+
+            self.in_use[id(buffer)] = buffer
+
+            return buffer
+
+    # Gives a buffer back to the pool, so that it can be returned by a later acquisition
+    def release(self, buffer):
+        if buffer is None:
+            return
+
+        with self.lock:
+            if self.in_use.pop(id(buffer), None) is None:
+                return
+
+            free = self.free[buffer.shape]
+
+            if len(free) < self.max_free:
+                free.append(buffer)
+
+    # Returns the number of buffers that are not in use
+    def free_count(self):
+        with self.lock:
+            return sum(len(free) for free in self.free.values())
@@ -1,7 +1,8 @@
-import os, json
+import os, stat, json, copy, tempfile, threading
 
 # Constants
 CONFIG_FILE_PATH = "config/config.json"
+WRITE_DELAY = 0.2
 BASE_CONFIG_DICT = {
         "Actions": {
             "Left": {
@@ -11,7 +12,13 @@ BASE_CONFIG_DICT = {
                 "Thumb_Down": [],
                 "Thumb_Up": [],
                 "Victory": [],
-                "ILoveYou": []
+                "ILoveYou": [],
+                "Swipe_Left": [],
+                "Swipe_Right": [],
+                "Swipe_Up": [],
+                "Swipe_Down": [],
+                "Circle_Clockwise": [],
+                "Circle_Counterclockwise": []
             },
             "Right": {
                 "Closed_Fist": [],
@@ -20,166 +27,416 @@ BASE_CONFIG_DICT = {
                 "Thumb_Down": [],
                 "Thumb_Up": [],
                 "Victory": [],
-                "ILoveYou": []
+                "ILoveYou": [],
+                "Swipe_Left": [],
+                "Swipe_Right": [],
+                "Swipe_Up": [],
+                "Swipe_Down": [],
+                "Circle_Clockwise": [],
+                "Circle_Counterclockwise": []
             }
         },
         "Settings": {
             "COMBINATION_MODE": False,
             "PRESS_RELEASE_WAIT_TIME": 0.1,
             "ACTION_COOLDOWN": 1.0
+        },
+        "Inference": {
+            "IDLE_FPS": 2.0,
+            "MAX_FPS": 0.0,
+            "MAX_IN_FLIGHT": 1
+        },
+        "Capture": {
+            "WIDTH": 0,
+            "HEIGHT": 0,
+            "FPS": 0,
+            "FOURCC": "",
+            "BUFFER_SIZE": 0,
+            "INFERENCE_WIDTH": 640,
+            "RELEASE_WHILE_PAUSED": False
+        },
+        "Preview": {
+            "DISPLAY_FPS": 30.0,
+            "SCALE": 1.0
+        },
+        "CustomGestures": {
+            "MAX_DISTANCE": 0.35
+        },
+        "Motion": {
+            "ENABLED": True,
+            "SWIPE_DISTANCE": 0.3,
+            "SWIPE_STRAIGHTNESS": 0.8,
+            "CIRCLE_TURN": 300.0,
+            "CIRCLE_MIN_PATH": 0.4
         }
     }
+NON_NEGATIVE_KEYS = {
+        "Settings": ("PRESS_RELEASE_WAIT_TIME", "ACTION_COOLDOWN"),
+        "Inference": ("IDLE_FPS", "MAX_FPS", "MAX_IN_FLIGHT"),
+        "Capture": ("WIDTH", "HEIGHT", "FPS", "BUFFER_SIZE", "INFERENCE_WIDTH"),
+        "Preview": ("DISPLAY_FPS",),
+        "CustomGestures": ("MAX_DISTANCE",),
+        "Motion": ("SWIPE_DISTANCE", "SWIPE_STRAIGHTNESS", "CIRCLE_TURN", "CIRCLE_MIN_PATH")
+    }
+
+# Functions called without arguments every time this process writes the configuration file
+listeners = []
 
 # Custom exception class for handling configuration file validation errors
 class ValidationError(Exception):
     pass
 
-# Returns True if the configuration file exists, can be opened and its structure is correct; otherwise, returns False
-def check():
-    try:
-        with open(CONFIG_FILE_PATH, 'r') as file:
-            config = json.load(file)
-            
-            # Check if first-level keys are correct in the configuration file
-            if BASE_CONFIG_DICT.keys() != config.keys():
-                raise ValidationError
-            
-            # Iterate over first-level keys
-            for key in BASE_CONFIG_DICT.keys():
-                # Check if second-level keys inside the current first-level key are correct in the configuration file
-                if BASE_CONFIG_DICT[key].keys() != config[key].keys():
+# Registers a function that will be called every time this process writes the configuration file
+def add_listener(listener):
+    listeners.append(listener)
+
+# Calls every registered listener
+def notify_listeners():
+    for listener in listeners:
+        listener()
+
+# Raises ValidationError if the structure of a configuration dictionary is not correct
+def validate(config):
+    # Check if first-level keys are correct in the configuration
+    if not isinstance(config, dict) or BASE_CONFIG_DICT.keys() != config.keys():
+        raise ValidationError
+    
+    # Iterate over first-level keys
+    for key in BASE_CONFIG_DICT.keys():
+        # Check if second-level keys inside the current first-level key are correct in the configuration
+        if not isinstance(config[key], dict) or BASE_CONFIG_DICT[key].keys() != config[key].keys():
+            raise ValidationError
+        
+        # Iterate over second-level keys inside the current first-level key
+        for subkey in BASE_CONFIG_DICT[key].keys():
+            # When second-level key value type is not dictionary
+            if not isinstance(BASE_CONFIG_DICT[key][subkey], dict):
+                # Check if current second-level key value type is correct in the configuration
+                if type(BASE_CONFIG_DICT[key][subkey]) != type(config[key][subkey]):
                     raise ValidationError
                 
-                # Iterate over second-level keys inside the current first-level key
-                for subkey in BASE_CONFIG_DICT[key].keys():
-                    # When second-level key value type is not dictionary
-                    if not isinstance(BASE_CONFIG_DICT[key][subkey], dict):
-                        # Check if current second-level key value type is correct in the configuration file
-                        if type(BASE_CONFIG_DICT[key][subkey]) != type(config[key][subkey]):
-                            raise ValidationError
-                        
-                        # Check that certain numeric values from keys under Settings are positive
-                        if key == "Settings" and (subkey == "PRESS_RELEASE_WAIT_TIME" or subkey == "ACTION_COOLDOWN"):
-                            if config[key][subkey] < 0:
-                                raise ValidationError
-                    else:
-                        # Check if third-level keys inside the current second-level key are correct in the configuration file
-                        if BASE_CONFIG_DICT[key][subkey].keys() != config[key][subkey].keys():
-                            raise ValidationError
-                        
-                        # Iterate over third-level keys inside the current second-level key
-                        for third_lvl_key in BASE_CONFIG_DICT[key][subkey].keys():
-                            # Check if current third-level key value type is correct in the configuration file
-                            if type(BASE_CONFIG_DICT[key][subkey][third_lvl_key]) != type(config[key][subkey][third_lvl_key]):
-                                raise ValidationError
-                            
-                            # Check that the items inside each action list are of String type
-                            if key == "Actions":
-                                for item in config[key][subkey][third_lvl_key]:
-                                    if not isinstance(item, str):
-                                        raise ValidationError
-            
-            return True
-    except (FileNotFoundError, OSError, json.JSONDecodeError, AttributeError, ValidationError):
+                # Check that certain numeric values are positive
+                if subkey in NON_NEGATIVE_KEYS.get(key, ()) and config[key][subkey] < 0:
+                    raise ValidationError
+
+                # Check that the pixel format is either empty (the device's default) or a four character code
+                if key == "Capture" and subkey == "FOURCC" and len(config[key][subkey]) not in (0, 4):
+                    raise ValidationError
+
+                # Check that the preview's scale factor is positive
+                if key == "Preview" and subkey == "SCALE" and config[key][subkey] <= 0:
+                    raise ValidationError
+            else:
+                # Check if third-level keys inside the current second-level key are correct in the configuration (the actions of each hand can also include
+                # custom gestures)
+                if not isinstance(config[key][subkey], dict) or not BASE_CONFIG_DICT[key][subkey].keys() <= config[key][subkey].keys():
+                    raise ValidationError
+                
+                # Iterate over third-level keys inside the current second-level key
+                for third_lvl_key in config[key][subkey].keys():
+                    # Check if current third-level key value type is correct in the configuration
+                    if type(BASE_CONFIG_DICT[key][subkey].get(third_lvl_key, [])) != type(config[key][subkey][third_lvl_key]):
+                        raise ValidationError
+                    
+                    # Check that the items inside each action list are of String type
+                    if key == "Actions":
+                        validate_action(config[key][subkey][third_lvl_key])
+
+# Raises ValidationError if an action is not a list of strings
+def validate_action(action):
+    if not isinstance(action, list):
+        raise ValidationError
+
+    for item in action:
+        if not isinstance(item, str):
+            raise ValidationError
+
+# Raises ValidationError if a settings dictionary doesn't have the same keys and value types as the default one, or has negative time values
+def validate_settings(settings):
+    if not isinstance(settings, dict) or BASE_CONFIG_DICT["Settings"].keys() != settings.keys():
+        raise ValidationError
+    
+    for key in BASE_CONFIG_DICT["Settings"].keys():
+        if type(BASE_CONFIG_DICT["Settings"][key]) != type(settings[key]):
+            raise ValidationError
+        
+        if key in NON_NEGATIVE_KEYS["Settings"] and settings[key] < 0:
+            raise ValidationError
+
+# Adds the sections and keys of the default configuration that are missing from a configuration dictionary (e.g. one written by an older version of the
+# application), and returns True if any has been added
+def migrate(config, defaults=BASE_CONFIG_DICT):
+    if not isinstance(config, dict):
         return False
 
+    changed = False
+
+    for key, default in defaults.items():
+        if key not in config:
+            config[key] = copy.deepcopy(default)
+            changed = True
+        elif isinstance(default, dict) and migrate(config[key], default):
+            changed = True
+
+    return changed
+
+# In-memory configuration store. The configuration file is parsed and validated once; reads are served from memory, and edits are applied to memory and then
+# persisted by a single write after WRITE_DELAY seconds, so that a burst of edits results in one write. The file is written to a temporary file that then
+# replaces it, so a crash in the middle of a write never leaves a corrupted configuration file behind.
+class ConfigStore:
+    def __init__(self, path: str = CONFIG_FILE_PATH, write_delay: float = WRITE_DELAY):
+        self.path = path
+        self.write_delay = write_delay
+
+        # Validated configuration dictionary, or None if it hasn't been loaded yet or the file is not valid
+        self.config = None
+
+        # Whether the configuration in memory has edits that haven't been written yet, along with the timer that will write them
+        self.dirty = False
+        self.write_timer = None
+
+        # Whether the last write failed
+        self.write_failed = False
+
+        self.lock = threading.RLock()
+
+    # Reads, migrates and validates the configuration file, replacing the configuration in memory (after writing any pending edit), and returns True if the
+    # file is valid; otherwise, returns False and forgets the configuration in memory
+    def load(self):
+        with self.lock:
+            self.flush()
+
+            try:
+                with open(self.path, 'r') as file:
+                    config = json.load(file)
+
+                migrated = migrate(config)
+                validate(config)
+            except (OSError, json.JSONDecodeError, ValidationError):
+                self.config = None
+                return False
+
+            self.config = config
+
+            # Persist the keys added by the migration
+            if migrated:
+                self.schedule_write()
+
+            return True
+
+    # Loads the configuration file if it hasn't been loaded yet, and returns True if the configuration is available in memory; otherwise, returns False
+    def ensure_loaded(self):
+        with self.lock:
+            return self.config is not None or self.load()
+
+    # Replaces the configuration with the default one and writes it immediately, returning True if the write has been done, or False otherwise
+    def reset(self):
+        with self.lock:
+            self.config = copy.deepcopy(BASE_CONFIG_DICT)
+            self.dirty = True
+
+            return self.flush()
+
+    # Returns a copy of the whole configuration, or None if it's not available
+    def get_configuration(self):
+        with self.lock:
+            if not self.ensure_loaded():
+                return None
+
+            return copy.deepcopy(self.config)
+
+    # Returns a copy of the action for a particular hand gesture, or None if it's not available
+    def get_action(self, hand, gesture):
+        with self.lock:
+            if not self.ensure_loaded():
+                return None
+
+            action = self.config["Actions"].get(hand, {}).get(gesture)
+
+            return list(action) if action is not None else None
+
+    # Returns a copy of the settings, or None if they are not available
+    def get_settings(self):
+        with self.lock:
+            if not self.ensure_loaded():
+                return None
+
+            return dict(self.config["Settings"])
+
+    # Sets the action for a particular hand gesture, creating the default configuration first if there isn't a valid one, and returns True if the action is
+    # valid and will be written; otherwise, returns False
+    def set_action(self, hand, gesture, action):
+        try:
+            validate_action(action)
+        except ValidationError:
+            return False
+
+        with self.lock:
+            if not self.ensure_loaded() and not self.reset():
+                return False
+
+            if gesture not in self.config["Actions"].get(hand, {}):
+                return False
+
+            self.config["Actions"][hand][gesture] = list(action)
+            self.schedule_write()
+
+            return not self.write_failed
+
+    # Adds a custom gesture without action to both hands, creating the default configuration first if there isn't a valid one, and returns True if it will be
+    # written; otherwise, returns False. Gestures that already exist keep their actions.
+    def add_gesture(self, gesture):
+        with self.lock:
+            if not self.ensure_loaded() and not self.reset():
+                return False
+
+            for gestures in self.config["Actions"].values():
+                gestures.setdefault(gesture, [])
+
+            self.schedule_write()
+
+            return not self.write_failed
+
+    # Removes a custom gesture (built-in gestures cannot be removed) from both hands, and returns True if it will be written; otherwise, returns False
+    def remove_gesture(self, gesture):
+        with self.lock:
+            if not self.ensure_loaded():
+                return False
+
+            for hand, gestures in self.config["Actions"].items():
+                if gesture not in BASE_CONFIG_DICT["Actions"][hand]:
+                    gestures.pop(gesture, None)
+
+            self.schedule_write()
+
+            return not self.write_failed
+
+    # Sets the settings, creating the default configuration first if there isn't a valid one, and returns True if the settings are valid and will be written;
+    # otherwise, returns False
+    def set_settings(self, settings):
+        try:
+            validate_settings(settings)
+        except ValidationError:
+            return False
+
+        with self.lock:
+            if not self.ensure_loaded() and not self.reset():
+                return False
+
+            self.config["Settings"] = dict(settings)
+            self.schedule_write()
+
+            return not self.write_failed
+
+    # Marks the configuration as edited and starts the timer that will write it, unless it's already running
+    def schedule_write(self):
+        with self.lock:
+            self.dirty = True
+
+            if self.write_timer is None:
+                self.write_timer = threading.Timer(self.write_delay, self.flush)
+                self.write_timer.daemon = True
+                self.write_timer.start()
+
+    # Writes the configuration to the file if it has pending edits, and returns True if the file is up to date; otherwise, returns False. The listeners are
+    # notified after every write.
+    def flush(self):
+        with self.lock:
+            if self.write_timer is not None:
+                self.write_timer.cancel()
+                self.write_timer = None
+
+            if not self.dirty:
+                return True
+
+            try:
+                self.write(self.config)
+            except OSError:
+                self.write_failed = True
+                return False
+
+            self.dirty = False
+            self.write_failed = False
+
+        notify_listeners()
+
+        return True
+
+    # Writes a configuration dictionary to a temporary file in the same directory as the configuration file, and then replaces the configuration file with it.
+    # The temporary file is created readable by its owner only, so it is given the permissions of the file it replaces.
+    def write(self, config):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".config-", suffix=".json")
+
+        try:
+            with os.fdopen(file_descriptor, 'w') as file:
+                json.dump(config, file, indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+
+            if os.path.exists(self.path):
+                os.chmod(temp_path, stat.S_IMODE(os.stat(self.path).st_mode))
+
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+            raise
+
+# Configuration store used by the whole application
+STORE = ConfigStore()
+
+# Returns True if the configuration file exists, can be opened and its structure is correct; otherwise, returns False. The file is (re)loaded into the store.
+def check():
+    return STORE.load()
+
 # Creates the configuration JSON file and returns True if the write has been done, or False otherwise
 def create():
-    try:
-        os.makedirs(os.path.dirname(CONFIG_FILE_PATH), exist_ok=True)
-        
-        with open(CONFIG_FILE_PATH, 'w') as file:
-            json.dump(BASE_CONFIG_DICT, file, indent=4)
-            
-            return True
-    except OSError:
-        return False
+    return STORE.reset()
 
 # Returns an array containing the action for a particular hand gesture or, if an error happens, an empty array
 def retrieve_action(hand, gesture):
-    try:
-        with open(CONFIG_FILE_PATH, 'r') as file:
-            config = json.load(file)
-            
-            action = config["Actions"][hand][gesture]
-            
-            if not isinstance(action, list):
-                raise ValidationError
-            
-            for item in action:
-                if not isinstance(item, str):
-                    raise ValidationError
-                
-            return action
-    except (FileNotFoundError, OSError, json.JSONDecodeError, KeyError, ValidationError):
-        return []
+    action = STORE.get_action(hand, gesture)
+
+    return action if action is not None else []
     
 # Returns a dictionary containing the application settings or, if an error happens, a dictionary containing the default settings
 def retrieve_settings():
-    try:
-        with open(CONFIG_FILE_PATH, 'r') as file:
-            config = json.load(file)
-            
-            settings = config["Settings"]
-
-            if BASE_CONFIG_DICT["Settings"].keys() != settings.keys():
-                raise ValidationError
-            
-            for key in BASE_CONFIG_DICT["Settings"].keys():
-                if type(BASE_CONFIG_DICT["Settings"][key]) != type(settings[key]):
-                    raise ValidationError
-                
-                if (key == "PRESS_RELEASE_WAIT_TIME" or key == "ACTION_COOLDOWN") and settings[key] < 0:
-                    raise ValidationError
-            
-            return settings
-    except (FileNotFoundError, OSError, json.JSONDecodeError, KeyError, ValidationError):
-        return BASE_CONFIG_DICT["Settings"]
+    settings = STORE.get_settings()
+
+    return settings if settings is not None else dict(BASE_CONFIG_DICT["Settings"])
     
 # Returns a dictionary containing the whole application configuration or False if an error happens
 def retrieve_configuration():
-    try:
-        with open(CONFIG_FILE_PATH, 'r') as file:
-            config = json.load(file)
-            
-            return config
-    except (FileNotFoundError, OSError, json.JSONDecodeError):
-        return False
+    config = STORE.get_configuration()
+
+    return config if config is not None else False
     
-# Saves the action for a particular hand gesture, checking if the configuration file needs to be created before doing so, and returns True if the new action has
-# been correctly written, or False otherwise
+# Saves the action for a particular hand gesture, creating the configuration file if necessary, and returns True if the new action has been accepted, or False
+# otherwise. The file is written shortly after, along with any other edit made in the meantime.
 def save_action(hand, gesture, action):
-    if not check() and not create():
-        return False
-        
-    try:
-        with open(CONFIG_FILE_PATH, 'r+') as file:
-            config = json.load(file)
-            config["Actions"][hand][gesture] = action
-            
-            file.seek(0)
-            json.dump(config, file, indent=4)
-            file.truncate()
-
-            return True
-    except (FileNotFoundError, OSError, json.JSONDecodeError, KeyError):
-        return False
+    return STORE.set_action(hand, gesture, action)
     
-# Saves the application settings, checking if the configuration file needs to be created before doing so, and returns True if the new action has been correctly
-# written, or False otherwise
+# Adds a custom gesture to the actions of both hands, creating the configuration file if necessary, and returns True if it has been accepted, or False otherwise
+def add_gesture(gesture):
+    return STORE.add_gesture(gesture)
+
+# Removes a custom gesture from the actions of both hands, and returns True if it has been accepted, or False otherwise
+def remove_gesture(gesture):
+    return STORE.remove_gesture(gesture)
+
+# Returns the names of the custom gestures in the configuration (those that are not built-in gestures), in the order they were added
+def custom_gestures(config):
+    return [gesture for gesture in config["Actions"]["Left"] if gesture not in BASE_CONFIG_DICT["Actions"]["Left"]]
+
+# Saves the application settings, creating the configuration file if necessary, and returns True if the new settings have been accepted, or False otherwise.
+# The file is written shortly after, along with any other edit made in the meantime.
 def save_settings(settings):
-    if not check() and not create():
-        return False
-        
-    try:
-        with open(CONFIG_FILE_PATH, 'r+') as file:
-            config = json.load(file)
-            config["Settings"] = settings
-            
-            file.seek(0)
-            json.dump(config, file, indent=4)
-            file.truncate()
+    return STORE.set_settings(settings)
 
-            return True
-    except (FileNotFoundError, OSError, json.JSONDecodeError, KeyError):
-        return False
\ No newline at end of file
+# Writes any pending edit to the configuration file immediately, returning True if the file is up to date; otherwise, returns False
+def flush():
+    return STORE.flush()
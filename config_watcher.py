@@ -0,0 +1,89 @@
+import threading, os, time, config_file, gesture_handler, metrics
+
+# Constants
+CHECK_INTERVAL = 1.0
+
+# Configuration watcher class. It reloads the configuration file into a running gesture handler whenever the file changes, without stopping the recognition:
+# the handler's configuration is replaced in a single assignment and the gestures waiting in its queue are kept. Changes written by this process (through the
+# config_file module) wake the watcher up immediately; changes written by other processes are noticed by comparing the file's modification time and size,
+# which are read once every CHECK_INTERVAL seconds.
+class ConfigWatcher(threading.Thread):
+    def __init__(self, stop_event: threading.Event, handler: gesture_handler.GestureHandler, check_interval: float = CHECK_INTERVAL, recognizer=None):
+        super().__init__(daemon=True)
+
+        # Event that, when set, will be used to stop this thread
+        self.stop_event = stop_event
+
+        # Gesture handler the configuration is reloaded into
+        self.handler = handler
+
+        # Gesture recognizer whose inference settings are reloaded as well, if any
+        self.recognizer = recognizer
+
+        self.check_interval = check_interval
+
+        # Event set when this process has written the configuration file, waking this thread up
+        self.file_written = threading.Event()
+
+        # Modification time and size of the configuration file when it was last loaded
+        self.file_signature = self.read_signature()
+
+        # Number of reloads applied and failed, and description of the last failure
+        self.reload_count = 0
+        self.failure_count = 0
+        self.last_error = None
+
+        config_file.add_listener(self.file_written.set)
+
+    # Returns the modification time and size of the configuration file, or None if it cannot be accessed
+    def read_signature(self):
+        try:
+            stat = os.stat(config_file.STORE.path)
+
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            written = self.file_written.wait(self.check_interval)
+            self.file_written.clear()
+
+            if self.stop_event.is_set():
+                break
+
+            signature = self.read_signature()
+
+            if written or (signature is not None and signature != self.file_signature):
+                self.file_signature = signature
+                self.reload()
+
+    # Validates the configuration file and loads it into the handler, returning True if it has been done; otherwise, the handler keeps its current configuration
+    def reload(self):
+        reload_start = time.perf_counter()
+
+        config = config_file.retrieve_configuration() if config_file.check() else False
+
+        if not config:
+            self.failure_count += 1
+            self.last_error = "The configuration file is missing or not valid"
+            metrics.CONFIG_RELOAD_FAILURES.inc()
+
+            return False
+
+        if self.recognizer is not None:
+            self.recognizer.load_config(config)
+
+        invalid_keys = self.handler.load_config(config)
+        self.last_error = f"Invalid keys ignored: {invalid_keys}" if invalid_keys else None
+        self.reload_count += 1
+
+        metrics.CONFIG_RELOADS.inc()
+        metrics.CONFIG_RELOAD_DURATION.observe(time.perf_counter() - reload_start)
+
+        return True
+
+    # Stops the thread, waking it up immediately
+    def stop(self):
+        self.stop_event.set()
+        self.file_written.set()
@@ -0,0 +1,159 @@
+import os, re, stat, json, time, tempfile, numpy as np, metrics
+
+# Constants
+TEMPLATES_PATH = "config/custom_gestures.json"
+TEMPLATES_VERSION = 1
+LANDMARK_COUNT = 21
+WRIST = 0
+MAX_DISTANCE = 0.35
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_]{1,24}$")
+
+# Custom exception class for handling template files that cannot be read or written
+class TemplateError(Exception):
+    pass
+
+# Returns the landmarks of the detected hands as a (hands, 21, 3) float32 array, from MediaPipe's landmark lists (or from an array, which is returned as is)
+def landmark_array(hand_landmarks):
+    if isinstance(hand_landmarks, np.ndarray):
+        return hand_landmarks.astype(np.float32, copy=False).reshape(-1, LANDMARK_COUNT, 3)
+
+    return np.array([[(landmark.x, landmark.y, landmark.z) for landmark in landmarks] for landmarks in hand_landmarks], np.float32).reshape(-1, LANDMARK_COUNT, 3)
+
+# Returns the feature vectors of a batch of hands: the x and y coordinates of their landmarks, relative to the wrist, with left hands mirrored (so that a
+# template recorded with either hand matches both), stretched by the frame's aspect ratio (landmarks are normalized to the frame's width and height) and
+# divided by the hand's size (the distance from the wrist to its farthest landmark), so that they don't depend on where the hand is or how far it is from
+# the camera. The result is a (hands, 42) float32 array.
+def normalize(landmarks, left_hands, aspect_ratio=1.0):
+    points = landmarks[:, :, :2] - landmarks[:, WRIST:WRIST + 1, :2]
+    points[:, :, 0] *= np.where(left_hands, -aspect_ratio, aspect_ratio)[:, None]
+
+    size = np.sqrt((points ** 2).sum(axis=2).max(axis=1))
+    points /= np.maximum(size, 1e-6)[:, None, None]
+
+    return points.reshape(len(points), -1)
+
+# Returns the templates stored in a template file, as a dictionary of (samples, 42) float32 arrays indexed by gesture name; a missing file has no templates
+def load_templates(path=TEMPLATES_PATH):
+    try:
+        with open(path, 'r') as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        raise TemplateError(f"Custom gesture templates could not be read: {e}")
+
+    if not isinstance(data, dict) or data.get("version") != TEMPLATES_VERSION or not isinstance(data.get("gestures"), dict):
+        raise TemplateError("Custom gesture templates file is not valid")
+
+    templates = {}
+
+    for name, samples in data["gestures"].items():
+        samples = np.array(samples, np.float32)
+
+        if samples.ndim != 2 or samples.shape[1] != LANDMARK_COUNT * 2:
+            raise TemplateError(f"Custom gesture {name} has invalid templates")
+
+        templates[name] = samples
+
+    return templates
+
+# Writes templates to a temporary file in the same directory as the template file, and then replaces the template file with it (keeping its permissions, as
+# the temporary file is created readable by its owner only)
+def save_templates(templates, path=TEMPLATES_PATH):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".custom-gestures-", suffix=".json")
+    data = {"version": TEMPLATES_VERSION, "gestures": {name: samples.tolist() for name, samples in templates.items()}}
+
+    try:
+        with os.fdopen(file_descriptor, 'w') as file:
+            json.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        if os.path.exists(path):
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+
+        os.replace(temp_path, path)
+    except OSError as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+        raise TemplateError(f"Custom gesture templates could not be written: {e}")
+
+# Adds recorded samples (feature vectors) to the templates of a custom gesture, creating it if necessary, and saves the template file
+def add_templates(name, samples, path=TEMPLATES_PATH):
+    templates = load_templates(path)
+    samples = np.asarray(samples, np.float32).reshape(-1, LANDMARK_COUNT * 2)
+
+    templates[name] = np.concatenate((templates[name], samples)) if name in templates else samples
+    save_templates(templates, path)
+
+# Removes a custom gesture from the template file
+def remove_templates(name, path=TEMPLATES_PATH):
+    templates = load_templates(path)
+
+    if templates.pop(name, None) is not None:
+        save_templates(templates, path)
+
+# Custom gesture classifier class. Every template of every custom gesture is kept in a single matrix, so that all the hands of a result are classified at once
+# with a batched squared distance computation (|a|² + |t|² - 2 a·t) and an argmin: each hand is given the gesture of its nearest template, if that template is
+# within max_distance.
+class CustomGestureClassifier:
+    def __init__(self, templates: dict = None, max_distance: float = MAX_DISTANCE):
+        self.max_distance = max_distance
+
+        # Template matrix, squared norm of each template, gesture name of each template and names of the gestures; replaced as a whole by set_templates so
+        # that classification never sees a mix of old and new templates
+        self.model = (np.empty((0, LANDMARK_COUNT * 2), np.float32), np.empty(0, np.float32), np.empty(0, np.int32), ())
+
+        if templates:
+            self.set_templates(templates)
+
+    # Replaces the templates with those of a dictionary of (samples, 42) arrays indexed by gesture name
+    def set_templates(self, templates):
+        names = tuple(templates)
+        matrix = np.concatenate([templates[name] for name in names]).astype(np.float32) if names else np.empty((0, LANDMARK_COUNT * 2), np.float32)
+        labels = np.repeat(np.arange(len(names), dtype=np.int32), [len(templates[name]) for name in names])
+
+        self.model = (matrix, (matrix ** 2).sum(axis=1), labels, names)
+
+    # Returns the names of the custom gestures
+    def names(self):
+        return self.model[3]
+
+    # Loads the classifier's part of the application configuration from a dictionary, along with the templates of the template file (the classifier keeps
+    # its current templates if the file cannot be read)
+    def load_config(self, config, path=TEMPLATES_PATH):
+        self.max_distance = config["CustomGestures"]["MAX_DISTANCE"]
+
+        try:
+            self.set_templates(load_templates(path))
+        except TemplateError:
+            pass
+
+    # Classifies the given hands ((hands, 21, 3) landmarks and whether each one is a left hand), returning a list with the name of the gesture of each hand
+    # (None when no template is close enough) and recording the time spent in the metrics
+    def classify(self, landmarks, left_hands, aspect_ratio=1.0):
+        classify_start = time.perf_counter()
+        matrix, norms, labels, names = self.model
+
+        if not len(matrix) or not len(landmarks):
+            return [None] * len(landmarks)
+
+        features = normalize(landmarks, np.asarray(left_hands, bool), aspect_ratio)
+        distances = (features ** 2).sum(axis=1)[:, None] + norms[None, :] - 2 * features @ matrix.T
+
+        nearest = distances.argmin(axis=1)
+        nearest_distances = np.sqrt(np.maximum(distances[np.arange(len(features)), nearest], 0))
+
+        gestures = [names[labels[template]] if distance <= self.max_distance else None for template, distance in zip(nearest, nearest_distances)]
+
+        metrics.CUSTOM_GESTURE_DURATION.observe(time.perf_counter() - classify_start)
+
+        return gestures
+
+# Returns True if a name can be used for a custom gesture (letters, digits and underscores, not the name of a built-in gesture); otherwise, returns False
+def valid_name(name, builtin_names=()):
+    return bool(NAME_PATTERN.match(name)) and name not in builtin_names and name != "None"
@@ -0,0 +1,249 @@
+import asyncio, collections, json, os, socket, struct, threading, time, metrics
+
+# Constants
+FORMAT_NDJSON = "ndjson"
+FORMAT_BINARY = "binary"
+CLIENT_QUEUE_SIZE = 256
+WRITE_BUFFER_LIMIT = 64 * 1024
+READ_SIZE = 1024
+
+# Event types and hands of the binary framing
+EVENT_TYPES = ("gesture", "action")
+HAND_NAMES = ("", "Left", "Right")
+
+# Header of each binary frame: payload length, event type and hand indices, sequence number and wall clock time of the event. The payload of a gesture is its
+# name, and the payload of an action is the name of the gesture that triggered it followed by its keys, all of them separated by NUL characters.
+FRAME_HEADER = struct.Struct("<HBBId")
+
+# Returns an event as a line of JSON
+def encode_ndjson(event):
+    return json.dumps(event, separators=(",", ":")).encode() + b"\n"
+
+# Returns an event as a binary frame
+def encode_binary(event):
+    if event["type"] == "action":
+        payload = "\0".join([event["gesture"]] + event["keys"]).encode()
+    else:
+        payload = event["name"].encode()
+
+    hand = HAND_NAMES.index(event["hand"]) if event["hand"] in HAND_NAMES else 0
+
+    return FRAME_HEADER.pack(len(payload), EVENT_TYPES.index(event["type"]), hand, event["seq"], event["time"]) + payload
+
+# Decodes the complete binary frames at the start of a buffer, returning the list of events and the number of bytes they take up (clients keep the rest for
+# the next read)
+def decode_binary(buffer):
+    events = []
+    offset = 0
+
+    while len(buffer) - offset >= FRAME_HEADER.size:
+        length, event_type, hand, seq, event_time = FRAME_HEADER.unpack_from(buffer, offset)
+        end = offset + FRAME_HEADER.size + length
+
+        if end > len(buffer):
+            break
+
+        fields = bytes(buffer[offset + FRAME_HEADER.size:end]).decode().split("\0")
+        event = {"seq": seq, "type": EVENT_TYPES[event_type], "time": event_time, "hand": HAND_NAMES[hand]}
+
+        if event["type"] == "action":
+            event["gesture"] = fields[0]
+            event["keys"] = fields[1:]
+        else:
+            event["name"] = fields[0]
+
+        events.append(event)
+        offset = end
+
+    return events, offset
+
+ENCODERS = {FORMAT_NDJSON: encode_ndjson, FORMAT_BINARY: encode_binary}
+
+# Connection of a subscriber, with a bounded queue of encoded events. The events queued during a flush are written in a single write, straight to the transport
+# while it has room for them; once the client falls behind and the transport's buffer goes over WRITE_BUFFER_LIMIT, events stay in the queue until a drain
+# task sees the buffer empty out. When the queue is full, the oldest event is dropped; clients notice the gap in the sequence numbers.
+class Subscriber:
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int):
+        self.writer = writer
+        self.queue_size = queue_size
+        self.queue = collections.deque()
+        self.dropped_count = 0
+
+        # Task waiting for the transport's buffer to empty out (None while the transport has room), and whether the connection has been lost
+        self.drain_task = None
+        self.closed = False
+
+    # Adds an encoded event to the queue, dropping the oldest one if it is full
+    def put(self, data):
+        if len(self.queue) >= self.queue_size:
+            self.queue.popleft()
+            self.dropped_count += 1
+            metrics.EVENTS_DROPPED.inc()
+
+        self.queue.append(data)
+
+    # Writes the queued events in a single write, unless the client is behind
+    def send(self):
+        if not self.queue or self.drain_task is not None or self.closed:
+            return
+
+        self.writer.write(b"".join(self.queue))
+        self.queue.clear()
+
+        if self.writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+            self.drain_task = asyncio.ensure_future(self.drain())
+
+    # Waits for the transport to accept more data, and then sends the events queued meanwhile
+    async def drain(self):
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            self.closed = True
+            return
+
+        self.drain_task = None
+        self.send()
+
+# Event server thread, which publishes the gestures taken by the gesture handler and the actions it executes to every client connected to a local TCP port or
+# a Unix socket, as newline-delimited JSON or binary frames. It runs its own asyncio loop: publishing only appends the event to a list and wakes the loop up
+# if it isn't already, and each event is encoded once for every client. A slow client never slows down the publisher or the other clients; it only loses the
+# oldest events of its queue.
+class EventServer(threading.Thread):
+    def __init__(self, port: int = None, socket_path: str = None, frame_format: str = FORMAT_NDJSON, client_queue_size: int = CLIENT_QUEUE_SIZE):
+        super().__init__(daemon=True)
+
+        # The listening socket is bound here, so that an unavailable port or socket path is reported when the server is created
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.bind(socket_path)
+            self.socket.listen(socket.SOMAXCONN)
+        else:
+            self.socket = socket.create_server(("127.0.0.1", port or 0), backlog=socket.SOMAXCONN)
+
+        self.socket_path = socket_path
+        self.port = None if socket_path else self.socket.getsockname()[1]
+
+        self.encode = ENCODERS[frame_format]
+        self.client_queue_size = client_queue_size
+
+        # Events published and not handed to the subscribers yet, whether the loop has been asked to hand them over, and sequence number of the next event
+        self.pending_events = collections.deque()
+        self.flush_scheduled = False
+        self.sequence = 0
+
+        # Connected clients and the tasks serving them, loop run by this thread, asyncio Event that stops the server, Event set once the server accepts
+        # connections, and whether the server has been stopped (events published afterwards are dropped)
+        self.subscribers = set()
+        self.client_tasks = set()
+        self.loop = None
+        self.stopped = None
+        self.ready = threading.Event()
+        self.closed = False
+
+        metrics.REGISTRY.gauge("gesture_maestro_event_subscribers", "Clients connected to the event server.", None, lambda: len(self.subscribers))
+
+    # Publishes an event (a dictionary with a type, "gesture" or "action", and its fields) to every subscriber; it can be called from any thread and never blocks
+    def publish(self, event):
+        if self.closed:
+            return
+
+        event["time"] = time.time()
+        self.pending_events.append(event)
+        metrics.EVENTS_PUBLISHED.inc()
+
+        # The flag is cleared by the loop before it takes the pending events, so an event appended meanwhile always gets a flush of its own
+        if not self.flush_scheduled and self.loop is not None:
+            self.flush_scheduled = True
+
+            # The loop may have just been closed by stop()
+            try:
+                self.loop.call_soon_threadsafe(self.flush)
+            except RuntimeError:
+                self.flush_scheduled = False
+
+    # Hands the pending events over to every subscriber (run by the loop)
+    def flush(self):
+        self.flush_scheduled = False
+
+        while self.pending_events:
+            event = self.pending_events.popleft()
+            event["seq"] = self.sequence
+            self.sequence += 1
+
+            data = self.encode(event)
+
+            for subscriber in self.subscribers:
+                subscriber.put(data)
+
+        for subscriber in self.subscribers:
+            subscriber.send()
+
+    # Serves a client until it disconnects: events are written by flush, while this coroutine waits for the end of the connection (clients aren't expected to
+    # send anything)
+    async def handle_client(self, reader, writer):
+        writer.transport.set_write_buffer_limits(WRITE_BUFFER_LIMIT)
+        subscriber = Subscriber(writer, self.client_queue_size)
+        self.subscribers.add(subscriber)
+        self.client_tasks.add(asyncio.current_task())
+
+        try:
+            while not subscriber.closed and await reader.read(READ_SIZE):
+                pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            subscriber.closed = True
+            self.subscribers.discard(subscriber)
+            self.client_tasks.discard(asyncio.current_task())
+
+            if subscriber.drain_task is not None:
+                subscriber.drain_task.cancel()
+
+            writer.close()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+
+        if self.socket_path:
+            server = await asyncio.start_unix_server(self.handle_client, sock=self.socket, backlog=socket.SOMAXCONN)
+        else:
+            server = await asyncio.start_server(self.handle_client, sock=self.socket, backlog=socket.SOMAXCONN)
+
+        self.ready.set()
+
+        # Hand over the events published before the loop was running
+        self.flush()
+
+        async with server:
+            await self.stopped.wait()
+
+            # Closing the connections ends the tasks serving them, which are waited for so that they aren't cancelled
+            for subscriber in list(self.subscribers):
+                subscriber.writer.close()
+
+            await asyncio.gather(*self.client_tasks, return_exceptions=True)
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    # Stops the server, disconnecting every client
+    def stop(self):
+        self.closed = True
+
+        # The loop is already closed if the server has stopped on its own
+        if self.loop is not None and self.stopped is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.stopped.set)
+            except RuntimeError:
+                pass
+
+            self.join()
+
+        self.socket.close()
+
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
@@ -0,0 +1,253 @@
+import cv2, os, time
+
+# Constants
+DEFAULT_FPS = 30.0
+IMAGE_EXTENSIONS = (".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp")
+
+# Custom exception class for handling frame sources that cannot be opened
+class FrameSourceError(Exception):
+    pass
+
+# Base frame source class. A frame source is opened once, read frame by frame and released when it is not needed anymore; every frame is returned along with
+# its timestamp in milliseconds, which must increase strictly from one frame to the next, as required by MediaPipe's live stream mode.
+class FrameSource:
+    def __init__(self):
+        # Timestamp of the last frame returned, used to guarantee that timestamps always increase
+        self.last_timestamp_ms = -1
+
+    # Opens the underlying device or file, raising FrameSourceError if it cannot be done
+    def open(self):
+        raise NotImplementedError
+
+    # Returns a (ret, frame, timestamp_ms) tuple, where ret is False when no more frames can be read. When an array with the frame's shape is given, the frame
+    # may be decoded into it instead of into a new one.
+    def read(self, out=None):
+        raise NotImplementedError
+
+    # Releases the underlying device or file
+    def release(self):
+        pass
+
+    # Grabs the next frame without decoding it, keeping the source warm (and its buffered frames fresh) while frames are not needed; the last grabbed frame is
+    # returned by the next read. Returns False if the source doesn't need it (only live capture devices do), in which case nothing is grabbed.
+    def grab(self):
+        return False
+
+    # Makes a source that returns frames at their recorded rate continue from the current frame after a pause, instead of catching up with the time paused
+    def reset_clock(self):
+        pass
+
+    # Applies the capture settings of the application configuration (the "Capture" section) the next time the source is opened. Only live capture devices
+    # use them; recorded frames are returned as they were recorded.
+    def configure(self, capture):
+        pass
+
+    # Returns a timestamp that is strictly greater than the previous one returned by this source
+    def next_timestamp(self, timestamp_ms):
+        timestamp_ms = max(int(timestamp_ms), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+
+        return timestamp_ms
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+# Frame source that reads from a live capture device, timestamping each frame with the time.perf_counter clock (the one used for every time in the
+# pipeline) when it is read. The resolution, frame rate, pixel format and driver buffer size are requested when the device is opened; a value of 0 (or an
+# empty pixel format) keeps the device's default, and the device may pick the closest mode it supports.
+class CameraSource(FrameSource):
+    def __init__(self, device_index: int = 0, width: int = 0, height: int = 0, fps: int = 0, fourcc: str = "", buffer_size: int = 0):
+        super().__init__()
+
+        # Index of the capture device that will be opened
+        self.device_index = device_index
+
+        # Requested capture properties
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+
+        self.cam = None
+
+        # Timestamp of the frame grabbed and not read yet, if any
+        self.grabbed_timestamp_ms = None
+
+    def configure(self, capture):
+        self.width = capture["WIDTH"]
+        self.height = capture["HEIGHT"]
+        self.fps = capture["FPS"]
+        self.fourcc = capture["FOURCC"]
+        self.buffer_size = capture["BUFFER_SIZE"]
+
+    def open(self):
+        self.cam = cv2.VideoCapture(self.device_index)
+
+        if not self.cam.isOpened():
+            raise FrameSourceError(f"Capture device {self.device_index} could not be opened")
+
+        # The pixel format is set first, as it limits the resolutions and frame rates available
+        if self.fourcc:
+            self.cam.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+
+        for prop, value in ((cv2.CAP_PROP_FRAME_WIDTH, self.width), (cv2.CAP_PROP_FRAME_HEIGHT, self.height), (cv2.CAP_PROP_FPS, self.fps),
+                            (cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)):
+            if value:
+                self.cam.set(prop, value)
+
+    def read(self, out=None):
+        if self.grabbed_timestamp_ms is not None:
+            timestamp_ms = self.grabbed_timestamp_ms
+            self.grabbed_timestamp_ms = None
+            ret, frame = self.cam.retrieve(out)
+
+            return ret, frame, self.next_timestamp(timestamp_ms)
+
+        ret, frame = self.cam.read(out)
+
+        return ret, frame, self.next_timestamp(time.perf_counter() * 1000)
+
+    def grab(self):
+        if self.cam is None or not self.cam.grab():
+            return False
+
+        self.grabbed_timestamp_ms = time.perf_counter() * 1000
+
+        return True
+
+    def release(self):
+        self.grabbed_timestamp_ms = None
+
+        if self.cam is not None:
+            self.cam.release()
+            self.cam = None
+
+# Frame source that replays a recorded video file. Timestamps are derived from the frame index and the file's frame rate, so they are the same on every run.
+# When realtime is True, frames are returned at the file's frame rate; otherwise, they are returned as fast as they can be decoded.
+class VideoFileSource(FrameSource):
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        super().__init__()
+
+        self.path = path
+        self.realtime = realtime
+
+        # When True, the video starts again from the beginning after its last frame instead of ending the stream
+        self.loop = loop
+
+        self.cam = None
+        self.fps = DEFAULT_FPS
+        self.frame_index = 0
+        self.start_time = 0
+
+    def open(self):
+        if not os.path.isfile(self.path):
+            raise FrameSourceError(f"Video file {self.path} does not exist")
+
+        self.cam = cv2.VideoCapture(self.path)
+
+        if not self.cam.isOpened():
+            raise FrameSourceError(f"Video file {self.path} could not be opened")
+
+        fps = self.cam.get(cv2.CAP_PROP_FPS)
+
+        if fps and fps > 0:
+            self.fps = fps
+
+        self.frame_index = 0
+        self.start_time = time.perf_counter()
+
+    def read(self, out=None):
+        ret, frame = self.cam.read(out)
+
+        if not ret and self.loop and self.frame_index > 0:
+            self.cam.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cam.read(out)
+
+        if not ret:
+            return False, None, self.last_timestamp_ms
+
+        timestamp_ms = self.next_timestamp(self.frame_index * 1000 / self.fps)
+
+        if self.realtime:
+            wait_time = self.start_time + self.frame_index / self.fps - time.perf_counter()
+
+            if wait_time > 0:
+                time.sleep(wait_time)
+
+        self.frame_index += 1
+
+        return True, frame, timestamp_ms
+
+    def reset_clock(self):
+        self.start_time = time.perf_counter() - self.frame_index / self.fps
+
+    def release(self):
+        if self.cam is not None:
+            self.cam.release()
+            self.cam = None
+
+# Frame source that replays a directory of still images in file name order, as if they had been captured at the given frame rate
+class ImageDirectorySource(FrameSource):
+    def __init__(self, path: str, fps: float = DEFAULT_FPS, realtime: bool = False, loop: bool = False):
+        super().__init__()
+
+        self.path = path
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+
+        self.image_paths = []
+        self.frame_index = 0
+        self.start_time = 0
+
+    def open(self):
+        if not os.path.isdir(self.path):
+            raise FrameSourceError(f"Image directory {self.path} does not exist")
+
+        self.image_paths = sorted(os.path.join(self.path, name) for name in os.listdir(self.path) if name.lower().endswith(IMAGE_EXTENSIONS))
+
+        if not self.image_paths:
+            raise FrameSourceError(f"Image directory {self.path} does not contain any image")
+
+        self.frame_index = 0
+        self.start_time = time.perf_counter()
+
+    def read(self, out=None):
+        if self.frame_index >= len(self.image_paths) and not self.loop:
+            return False, None, self.last_timestamp_ms
+
+        frame = cv2.imread(self.image_paths[self.frame_index % len(self.image_paths)])
+
+        if frame is None:
+            return False, None, self.last_timestamp_ms
+
+        timestamp_ms = self.next_timestamp(self.frame_index * 1000 / self.fps)
+
+        if self.realtime:
+            wait_time = self.start_time + self.frame_index / self.fps - time.perf_counter()
+
+            if wait_time > 0:
+                time.sleep(wait_time)
+
+        self.frame_index += 1
+
+        return True, frame, timestamp_ms
+
+    def reset_clock(self):
+        self.start_time = time.perf_counter() - self.frame_index / self.fps
+
+# Returns the frame source matching a source specification: an integer is a capture device index, a directory is replayed as still images and any other path
+# is opened as a video file
+def from_spec(spec: str, realtime: bool = True):
+    if str(spec).isdigit():
+        return CameraSource(int(spec))
+
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, realtime=realtime)
+
+    return VideoFileSource(spec, realtime=realtime)
@@ -1,119 +1,182 @@
-import threading, queue, time
-from pynput.keyboard import Key, Controller
+import threading, queue, time, collections, ring_buffer, metrics, action_executor
+from pynput.keyboard import Key, KeyCode, Controller
+
+# Constants
+GESTURE_MAX_AGE = 0.5
+STOP_CHECK_INTERVAL = 1.0
+MODIFIER_LIST = ("ctrl", "alt", "shift", "cmd")
+
+# Immutable action plan compiled from the configuration of a hand gesture: the action as configured (the list of key names), the resolved pynput keys in the
+# order they are pressed (and released), whether it is executed as a combination, the time to wait between press and release, and the timeline of key events
+# the action executor performs
+ActionPlan = collections.namedtuple("ActionPlan", ["action", "keys", "combination", "wait_time", "timeline"])
+
+# Immutable snapshot of the handler's configuration, replaced as a whole when the configuration is loaded so that a gesture is never handled with a mix of
+# old and new settings: the action plans indexed by (hand, gesture), the action cooldown and the keys that could not be resolved
+HandlerConfig = collections.namedtuple("HandlerConfig", ["action_plans", "action_cooldown", "invalid_keys"])
+
+# Returns the pynput key matching a key name (a single character or the name of a special key), or None if there is no such key
+def resolve_key(key_name):
+    if not isinstance(key_name, str) or not key_name:
+        return None
+
+    if len(key_name) == 1:
+        return KeyCode.from_char(key_name)
+
+    return getattr(Key, key_name, None)
+
+# Returns True if the provided action is a combination (first key is a modifier); otherwise, returns False
+def action_is_combination(action):
+    action_first_key = action[0]
+
+    for modifier in MODIFIER_LIST:
+        if modifier in action_first_key:
+            return True
+    
+    return False
+
+# Compiles the actions of the configuration into a dictionary of action plans indexed by (hand, gesture), leaving out gestures without action. Returns the
+# dictionary along with a list of (hand, gesture, key name) tuples for every key that could not be resolved; those keys are left out of their plan.
+def compile_actions(actions, combination_mode, press_release_wait_time):
+    action_plans = {}
+    invalid_keys = []
+
+    for hand, gestures in actions.items():
+        for gesture, action in gestures.items():
+            if not action:
+                continue
+
+            keys = []
+
+            for key_name in action:
+                key = resolve_key(key_name)
+
+                if key is None:
+                    invalid_keys.append((hand, gesture, key_name))
+                else:
+                    keys.append(key)
+
+            combination = combination_mode and action_is_combination(action)
+            timeline = action_executor.build_timeline(keys, combination, press_release_wait_time)
+
+            action_plans[(hand, gesture)] = ActionPlan(tuple(action), tuple(keys), combination, press_release_wait_time, timeline)
+
+    return action_plans, invalid_keys
 
 # Gesture handler class
 class GestureHandler(threading.Thread):
-    def __init__(self, stop_recognizer: threading.Event, gesture_queue: queue.Queue, executed_action_queue: queue.Queue):
+    def __init__(self, stop_recognizer: threading.Event, gesture_queue: queue.Queue, executed_action_queue: ring_buffer.RingBuffer,
+                 keyboard: Controller = None, max_gesture_age: float = GESTURE_MAX_AGE, executor: action_executor.ActionExecutor = None):
         super().__init__()
         
         # Event that, when set, will be used to stop this thread, as it means that the recognizer is not working anymore
         self.stop_recognizer = stop_recognizer
 
-        # Queue where the gesture recognizer's callback method will put the recognized gestures
+        # Queue where the gesture recognizer's callback method will put the recognized gestures. A None item doesn't carry a gesture; it is only used to wake
+        # this thread up so that it checks the stop Event right away.
         self.gesture_queue = gesture_queue
 
-        # Queue where this gesture handler will put the executed actions
+        # Maximum time (in seconds) between the capture of a frame and the dispatch of its gestures; older gestures are discarded instead of being acted upon
+        self.max_gesture_age = max_gesture_age
+
+        # Bounded buffer where this gesture handler will put the executed actions
         self.executed_action_queue = executed_action_queue
 
-        # Create a pynput controller for the keyboard
-        self.keyboard = Controller()
+        # Executor that performs the key events of the actions on its own thread, so that this thread keeps handling gestures while keys are held down. Unless
+        # one is provided (e.g. with a recording output for tests and benchmarks), it synthesizes the keys with a pynput controller for the keyboard, or with
+        # another object with the same press and release methods. The executor is started and stopped along with this thread.
+        self.executor = executor if executor is not None else action_executor.ActionExecutor({action_executor.KEYBOARD: action_executor.KeyboardOutput(keyboard)})
         
-        # Variables used for storing the application configuration; they need to be set using the load_config method before executing the thread
-        self.actions = None
-        self.combination_mode = None
-        self.press_release_wait_time = None
-        self.action_cooldown = None
+        # Functions called with an event dictionary for every gesture taken from the gesture queue and every executed action (e.g. to publish them to the event
+        # server), from this thread and from the executor's thread respectively
+        self.listeners = []
+
+        # Application configuration; it needs to be set using the load_config method before executing the thread, and can be replaced at any time afterwards
+        self.config = HandlerConfig({}, 0, [])
 
-        # Timestamp that marks the end of the last executed action plus the chosen action cooldown (in milliseconds)
-        self.resume_timestamp = 0
+        # Time that marks the end of the last executed action plus the chosen action cooldown (in seconds, on the time.perf_counter clock used for the capture
+        # time of every gesture)
+        self.resume_time = 0
 
-    # When the thread is started, the gesture handler is initialized
+    # When the thread is started, the gesture handler waits for gestures and submits their actions to the executor until the stop Event is set
     def run(self):
+        if not self.executor.is_alive():
+            self.executor.start()
+
         while not self.stop_recognizer.is_set():
             try:
-                gesture_info = self.gesture_queue.get(False)
-                
-                if gesture_info["timestamp"] >= self.resume_timestamp:
-                    gesture_hand = gesture_info["hand"]
-                    gesture_name = gesture_info["name"]
-                    
-                    action = self.actions[gesture_hand][gesture_name]
-
-                    if action:
-                        if self.combination_mode and self.action_is_combination(action):
-                            self.execute_combination(action)
-                        else:
-                            self.execute_action(action)
-
-                        self.executed_action_queue.put(action)
-                        
-                        self.resume_timestamp = int(time.time() * 1000) + int(self.action_cooldown * 1000)
+                # Block until a gesture arrives; the timeout is only a fallback in case the stop Event is set without waking this thread up
+                gesture_info = self.gesture_queue.get(timeout=STOP_CHECK_INTERVAL)
             except queue.Empty:
-                time.sleep(0.1)
+                continue
 
-    # Returns True if the provided action is a combination (first key is a modifier); otherwise, returns False
-    def action_is_combination(self, action):
-        action_first_key = action[0]
-        modifier_list = ["ctrl", "alt", "shift", "cmd"]
+            if gesture_info is not None:
+                self.dispatch(gesture_info)
 
-        for modifier in modifier_list:
-            if modifier in action_first_key:
-                return True
-        
-        return False
-    
-    # Executes an action key by key, not as a combination of them
-    def execute_action(self, action):
-        for key in action:
-            try:
-                self.keyboard.press(key)
-                time.sleep(self.press_release_wait_time)
-                self.keyboard.release(key)
-            except ValueError:
-                try:
-                    key = getattr(Key, key)
-                    
-                    self.keyboard.press(key)
-                    time.sleep(self.press_release_wait_time)
-                    self.keyboard.release(key)
-                except AttributeError:
-                    pass
-            except Controller.InvalidKeyException:
-                pass
-
-    # Executes an action as a combination of keys
-    def execute_combination(self, action):
-        for key in action:
-            try:
-                self.keyboard.press(key)
-            except ValueError:
-                try:
-                    key = getattr(Key, key)
-                    
-                    self.keyboard.press(key)
-                except AttributeError:
-                    pass
-            except Controller.InvalidKeyException:
-                pass
-
-        time.sleep(self.press_release_wait_time)
-
-        for key in action:
-            try:
-                self.keyboard.release(key)
-            except ValueError:
-                try:
-                    key = getattr(Key, key)
-                    
-                    self.keyboard.release(key)
-                except AttributeError:
-                    pass
-            except Controller.InvalidKeyException:
-                pass
-    
-    # Loads the application configuration from a dictionary into the corresponding variables
+        self.executor.stop()
+        self.executor.join()
+
+    # Sets the stop Event and wakes the thread up so that it stops immediately
+    def stop(self):
+        self.stop_recognizer.set()
+        self.gesture_queue.put(None)
+
+    # Registers a function that will be called with an event dictionary for every gesture taken from the gesture queue and every executed action
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    # Calls every registered listener with an event
+    def notify_listeners(self, event):
+        for listener in self.listeners:
+            listener(dict(event))
+
+    # Submits the action of a gesture to the executor, unless the gesture is too old or was captured before the previous action ended plus its cooldown
+    def dispatch(self, gesture_info):
+        if self.listeners:
+            self.notify_listeners({"type": "gesture", "name": gesture_info["name"], "hand": gesture_info["hand"]})
+
+        gesture_age = time.perf_counter() - gesture_info["captured_at"]
+
+        # Gestures replayed as fast as possible are captured ahead of real time, on the replay clock (see result_log.py), so that their spacing still applies
+        # to the cooldown; they have no dispatch latency to record and can't be too old
+        if gesture_age >= 0:
+            metrics.DISPATCH_DURATION.observe(gesture_age)
+
+            if gesture_age > self.max_gesture_age:
+                metrics.GESTURES_EXPIRED.inc()
+                return
+
+        config = self.config
+        plan = config.action_plans.get((gesture_info["hand"], gesture_info["name"]))
+
+        if plan is None:
+            return
+
+        if gesture_info["captured_at"] >= self.resume_time:
+            submit_time = time.perf_counter()
+            end_time = self.executor.submit(plan.timeline, callback=lambda: self.action_executed(plan, gesture_info, submit_time))
+
+            self.resume_time = end_time + config.action_cooldown
+        else:
+            metrics.ACTIONS_SUPPRESSED.inc()
+
+    # Records an action once the executor has performed its last key event (called by the executor's thread)
+    def action_executed(self, plan, gesture_info, submit_time):
+        metrics.ACTION_DURATION.observe(time.perf_counter() - submit_time)
+        metrics.ACTIONS_EXECUTED.inc()
+
+        self.executed_action_queue.put(list(plan.action))
+
+        if self.listeners:
+            self.notify_listeners({"type": "action", "keys": list(plan.action), "gesture": gesture_info["name"], "hand": gesture_info["hand"]})
+
+    # Loads the application configuration from a dictionary, compiling the actions into action plans, and returns the list of (hand, gesture, key name) tuples
+    # for every key that could not be resolved. It can be called while the thread is running: the new configuration replaces the previous one in a single
+    # assignment, and an action already submitted to the executor finishes with the plan it started with.
     def load_config(self, config):
-        self.actions = config["Actions"]
-        self.combination_mode = config["Settings"]["COMBINATION_MODE"]
-        self.press_release_wait_time = config["Settings"]["PRESS_RELEASE_WAIT_TIME"]
-        self.action_cooldown = config["Settings"]["ACTION_COOLDOWN"]
\ No newline at end of file
+        settings = config["Settings"]
+        action_plans, invalid_keys = compile_actions(config["Actions"], settings["COMBINATION_MODE"], settings["PRESS_RELEASE_WAIT_TIME"])
+
+        self.config = HandlerConfig(action_plans, settings["ACTION_COOLDOWN"], invalid_keys)
+
+        return invalid_keys
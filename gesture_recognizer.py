@@ -1,103 +1,453 @@
-import mediapipe as mp
-import cv2, time, threading, queue
-from mediapipe.framework.formats import landmark_pb2
-
-# Alias
-BaseOptions = mp.tasks.BaseOptions
-GestureRecognizer = mp.tasks.vision.GestureRecognizer
-GestureRecognizerOptions = mp.tasks.vision.GestureRecognizerOptions
-GestureRecognizerResult = mp.tasks.vision.GestureRecognizerResult
-VisionRunningMode = mp.tasks.vision.RunningMode
+import cv2, time, threading, queue, importlib, numpy as np, ring_buffer, frame_source, metrics, overlay, rate_controller, buffer_pool, startup, custom_gestures, motion_gestures
 
 # Constants
 MODEL_PATH = "model/gesture_recognizer.task"
 GESTURE_SCORE_THRESHOLD = 0.6
+DEFAULT_RESULT_WORKERS = 1
+WARMUP_TIMESTAMP = 0
+WARMUP_SIZE = (256, 256, 3)
+WARMUP_TIMEOUT = 10.0
+PAUSE_CHECK_INTERVAL = 0.25
+
+# MediaPipe module, imported by import_mediapipe the first time the model is loaded, as importing it takes longer than starting the rest of the application
+mp = None
+
+# Imports MediaPipe if it hasn't been imported yet and returns it
+def import_mediapipe():
+    global mp
+
+    if mp is None:
+        mp = importlib.import_module("mediapipe")
+        startup.mark("mediapipe imported")
+
+    return mp
 
 # Live gesture recognizer class
 class LiveRecognizer(threading.Thread):
-    def __init__(self, stop_recognizer: threading.Event, frame_queue: queue.Queue, gesture_queue: queue.Queue):
+    def __init__(self, stop_recognizer: threading.Event, frame_queue: ring_buffer.RingBuffer, gesture_queue: queue.Queue,
+                 source: frame_source.FrameSource = None, result_workers: int = DEFAULT_RESULT_WORKERS,
+                 controller: rate_controller.InferenceRateController = None, frame_pool: buffer_pool.BufferPool = None):
         super().__init__()
         
         # Event that, when set, will be used to stop this thread
         self.stop_recognizer = stop_recognizer
 
-        # Queue where this gesture recognizer's callback method will put each processed frame
+        # Bounded buffer where this gesture recognizer's callback method will put each processed frame. When it is None (no preview is displayed), frames are
+        # neither drawn on nor rendered.
         self.frame_queue = frame_queue
+
+        # Pool of the RGB frame buffers, which are released by the frame queue's consumer (or by the frame queue itself, when it discards them), and buffer
+        # the capture device decodes each frame into
+        self.frame_pool = frame_pool if frame_pool is not None else buffer_pool.BufferPool()
+        self.capture_buffer = None
         
         # Queue where this gesture recognizer's callback method will put the recognized gestures
         self.gesture_queue = gesture_queue
 
-    # When the thread is started, the gesture recognizer is initialized
+        # Source of the frames sent to the gesture recognizer (the default camera if none is provided)
+        self.source = source if source is not None else frame_source.CameraSource(0)
+
+        # Controller that decides which frames are sent to the gesture recognizer; its settings are updated in place by the load_config method
+        self.controller = controller if controller is not None else rate_controller.InferenceRateController()
+
+        # Renderer used to draw the hand landmarks on each frame, landmarks of the last result, drawn on the frames that are not sent to the recognizer, and
+        # handedness of the last result (used along with its landmarks to record custom gestures)
+        self.renderer = overlay.LandmarkRenderer()
+        self.last_hand_landmarks = []
+        self.last_handedness = []
+
+        # Classifier of the custom gestures recorded by the user, checked before the built-in gestures of each hand, and aspect ratio of the frames (used to
+        # normalize the landmarks)
+        self.custom_gestures = custom_gestures.CustomGestureClassifier()
+        self.frame_aspect_ratio = 1.0
+
+        # Tracker of the trajectory of each hand, which detects motion gestures (swipes and circles) across results
+        self.motion = motion_gestures.MotionTracker()
+
+        # Queue where the callback method hands off each result to the result workers, which extract the gestures and render the frame, so that the callback
+        # (executed by MediaPipe, which can't deliver the next result until it returns) does as little work as possible
+        self.result_queue = queue.Queue()
+
+        # Number of result worker threads, and timestamp of the newest frame put in the frame queue, used to discard frames rendered out of order by them
+        self.result_workers = result_workers
+        self.last_rendered_timestamp = -1
+        self.render_lock = threading.Lock()
+
+        # Width (in pixels) above which frames are downscaled before being sent to the gesture recognizer (0 means never); it can be changed using the
+        # load_config method
+        self.inference_width = 0
+
+        # Description of the error that stopped the recognizer, if any
+        self.error = None
+
+        # MediaPipe gesture recognizer, created by load_model, the thread that executes load_model in the background when preload is used, and Event set once
+        # the recognizer has delivered the result of its warm-up inference
+        self.recognizer = None
+        self.preload_thread = None
+        self.warmed_up = threading.Event()
+
+        # Event cleared while recognition is paused, whether the frame source is released while paused, whether it is open, and whether it must be reopened
+        # (to apply new capture settings) before reading the next frame
+        self.active = threading.Event()
+        self.active.set()
+        self.release_while_paused = False
+        self.source_open = False
+        self.restart_requested = False
+
+        # Time (time.perf_counter value) at which recognition was last asked to resume, until the first frame after it is read, and time (in seconds) between
+        # the last resume request and that frame
+        self.resume_requested_at = None
+        self.last_resume_duration = None
+
+        # Writer of the result log every recognition result is recorded into (see result_log.py), if any
+        self.result_log = None
+
+        # Capture device settings currently applied to the frame source
+        self.device_settings = None
+
+        # Time (time.perf_counter value) at which each frame sent to the gesture recognizer was read, along with the full resolution RGB frame (the
+        # recognizer may receive a downscaled copy, and the landmarks are drawn on this one), indexed by the frame's timestamp
+        self.pending_frames = {}
+
+    # Starts loading the model in the background, so that it is ready (and warmed up) by the time the thread is started
+    def preload(self):
+        if self.preload_thread is None:
+            self.preload_thread = threading.Thread(target=self.load_model, daemon=True)
+            self.preload_thread.start()
+
+    # Imports MediaPipe, creates the gesture recognizer and performs a warm-up inference on a blank image, waiting for its result (the first inference is much
+    # slower than the following ones). Returns True if the recognizer is ready; otherwise, stores the error and returns False.
+    def load_model(self):
+        if self.recognizer is not None:
+            return True
+
+        try:
+            mp = import_mediapipe()
+
+            options = mp.tasks.vision.GestureRecognizerOptions(
+                base_options = mp.tasks.BaseOptions(model_asset_path=MODEL_PATH),
+                running_mode = mp.tasks.vision.RunningMode.LIVE_STREAM,
+                num_hands = 2,
+                min_hand_detection_confidence = 0.7,
+                min_hand_presence_confidence = 0.7,
+                result_callback = self.handle_result)
+
+            recognizer = mp.tasks.vision.GestureRecognizer.create_from_options(options)
+            startup.mark("model loaded")
+
+            recognizer.recognize_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=np.zeros(WARMUP_SIZE, np.uint8)), WARMUP_TIMESTAMP)
+            self.warmed_up.wait(WARMUP_TIMEOUT)
+        except Exception as e:
+            self.error = f"The gesture recognition model could not be loaded: {e}"
+            return False
+
+        self.recognizer = recognizer
+        return True
+
+    # When the thread is started, the gesture recognizer is initialized (unless it has been preloaded) and fed with the frames of the frame source
     def run(self):
-        options = GestureRecognizerOptions(
-            base_options = BaseOptions(model_asset_path=MODEL_PATH),
-            running_mode = VisionRunningMode.LIVE_STREAM,
-            num_hands = 2,
-            min_hand_detection_confidence = 0.7,
-            min_hand_presence_confidence = 0.7,
-            result_callback = self.handle_result)
-        with GestureRecognizer.create_from_options(options) as recognizer:
-            # Open the default camera
-            cam = cv2.VideoCapture(0)
-            
+        if self.preload_thread is not None:
+            self.preload_thread.join()
+
+        if not self.load_model():
+            # Stop the recognizer when the model cannot be loaded
+            self.stop_recognizer.set()
+            return
+
+        # Frames must have greater timestamps than the warm-up inference
+        self.source.last_timestamp_ms = max(self.source.last_timestamp_ms, WARMUP_TIMESTAMP)
+
+        if not self.open_source():
+            self.recognizer.close()
+            return
+
+        # Start the result workers
+        workers = [threading.Thread(target=self.process_results, daemon=True) for _ in range(self.result_workers)]
+
+        for worker in workers:
+            worker.start()
+
+        with self.recognizer as recognizer:
             while not self.stop_recognizer.is_set():
-                ret, frame = cam.read()
+                if not self.active.is_set():
+                    self.wait_while_paused()
+                    continue
+
+                # Reopen the frame source if it has been released while paused or new capture settings must be applied
+                if self.restart_requested:
+                    self.restart_requested = False
+                    self.source.release()
+                    self.source_open = False
+
+                if not self.source_open and not self.open_source():
+                    break
+
+                # Retrieve the next frame along with its timestamp in milliseconds
+                read_start = time.perf_counter()
+                ret, bgr_frame, frame_timestamp_ms = self.source.read(self.capture_buffer)
+                metrics.CAPTURE_DURATION.observe(time.perf_counter() - read_start)
                 
                 if ret:
-                    # Retrieve the frame's timestamp in milliseconds
-                    frame_timestamp_ms = int(time.time() * 1000)
-                    
-                    # Convert the frame received from OpenCV to a MediaPipe’s Image object
-                    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame)
-
-                    # Send live image data to perform gesture recognition
-                    recognizer.recognize_async(mp_image, frame_timestamp_ms)
+                    metrics.FRAMES_CAPTURED.inc()
+                    captured_at = time.perf_counter()
+
+                    if self.resume_requested_at is not None:
+                        self.last_resume_duration = captured_at - self.resume_requested_at
+                        self.resume_requested_at = None
+                        metrics.RESUME_DURATION.observe(self.last_resume_duration)
+
+                    # Decode the next frame into the same buffer
+                    self.capture_buffer = bgr_frame
+
+                    if self.controller.should_submit(captured_at):
+                        # Change the frame's color space (BGR, used by OpenCV) to RGB, used by both MediaPipe and the interface, into a pooled buffer
+                        frame = self.convert_frame(bgr_frame)
+                        self.pending_frames[frame_timestamp_ms] = (captured_at, frame)
+
+                        # Convert the frame (or its downscaled copy) to a MediaPipe’s Image object, which copies its data
+                        inference_frame = self.downscale(frame)
+                        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=inference_frame)
+
+                        if inference_frame is not frame:
+                            self.frame_pool.release(inference_frame)
+
+                        # Send live image data to perform gesture recognition
+                        recognizer.recognize_async(mp_image, frame_timestamp_ms)
+                        self.controller.submitted(frame_timestamp_ms, captured_at)
+                    else:
+                        metrics.FRAMES_NOT_INFERRED.inc()
+
+                        # Hand the frame off to the result workers without a result, so that the preview keeps its frame rate, unless they are busy or there is no
+                        # preview; in that case, the frame isn't even converted
+                        if self.frame_queue is not None and self.result_queue.empty():
+                            self.result_queue.put((None, self.convert_frame(bgr_frame), frame_timestamp_ms, captured_at))
                 else:
-                    # Stop the recognizer when the capture device is not working properly
+                    # Stop the recognizer when the frame source is not working properly or has no more frames
                     self.stop_recognizer.set()
 
-            # Release the capture object
-            cam.release()
+            # Release the frame source
+            self.source.release()
+            self.source_open = False
+
+        # Stop the result workers once every pending result has been processed (no more results can be delivered after the recognizer has been closed)
+        for _ in workers:
+            self.result_queue.put(None)
+
+        for worker in workers:
+            worker.join()
+
+        # Wake up the consumers of the gesture queue, so that they notice that the recognizer has stopped
+        self.gesture_queue.put(None)
+
+    # Returns a BGR frame converted to RGB, in a pooled buffer
+    def convert_frame(self, bgr_frame):
+        return cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2RGB, dst=self.frame_pool.acquire(bgr_frame.shape))
+
+    # Returns the frame that is sent to the gesture recognizer: a copy downscaled to the inference width (in a pooled buffer), or the frame itself if it isn't
+    # wider
+    def downscale(self, frame):
+        height, width = frame.shape[:2]
+        inference_width = self.inference_width
+
+        if not inference_width or width <= inference_width:
+            return frame
+
+        inference_height = max(round(height * inference_width / width), 1)
+        inference_frame = self.frame_pool.acquire((inference_height, inference_width) + frame.shape[2:])
+
+        return cv2.resize(frame, (inference_width, inference_height), dst=inference_frame, interpolation=cv2.INTER_AREA)
+
+    # Opens the frame source, returning True if it has been done; otherwise, stores the error, stops the recognizer and returns False
+    def open_source(self):
+        try:
+            self.source.open()
+        except frame_source.FrameSourceError as e:
+            self.error = str(e)
+            self.stop_recognizer.set()
+            return False
+
+        self.source_open = True
+        return True
+
+    # Waits until recognition is resumed or the recognizer is stopped. Meanwhile, the frame source is either released or, if it is a live capture device, kept
+    # warm by grabbing (without decoding) its frames, so that the first frame read after resuming is a fresh one and is available right away.
+    def wait_while_paused(self):
+        if self.release_while_paused and self.source_open:
+            self.source.release()
+            self.source_open = False
+
+        while not self.active.is_set() and not self.stop_recognizer.is_set():
+            if not self.source_open or not self.source.grab():
+                self.active.wait(PAUSE_CHECK_INTERVAL)
+
+        self.source.reset_clock()
+
+    # Pauses recognition without closing the gesture recognizer, releasing the frame source while paused if requested (by default, as set in the configuration)
+    def pause(self, release_source=None):
+        if release_source is not None:
+            self.release_while_paused = release_source
+
+        self.active.clear()
+
+    # Resumes recognition after a pause
+    def resume(self):
+        if self.active.is_set():
+            return
+
+        self.controller.reset()
+        self.resume_requested_at = time.perf_counter()
+        self.active.set()
+
+    # Reopens the frame source before reading the next frame (e.g. to apply new capture settings), keeping the gesture recognizer loaded
+    def restart(self):
+        self.restart_requested = True
+
+    # Returns True if recognition is paused; otherwise, returns False
+    def is_paused(self):
+        return not self.active.is_set()
+
+    # Callback method for the gesture recognizer (which receives a GestureRecognizerResult and a MediaPipe image), hands off the result for each frame to the
+    # result workers
+    def handle_result(self, result, output_image, timestamp_ms: int):
+        callback_start = time.perf_counter()
+
+        # The result of the warm-up inference (which may arrive after load_model has stopped waiting for it) is only used to know that the recognizer is ready
+        if timestamp_ms == WARMUP_TIMESTAMP:
+            self.warmed_up.set()
+            startup.mark("model warmed up")
+            return
+
+        startup.mark("first result")
+
+        # Retrieve the time at which the frame was read, which is the one used for the recognized gestures, and the full resolution frame (the landmarks are
+        # normalized, so they can be drawn on it even if the recognizer received a downscaled copy). If the frame is unknown, its inference duration isn't
+        # recorded, and the time the result arrived (the latest the frame can have been read) and a writable copy of the received image are used instead.
+        pending_frame = self.pop_pending_frame(timestamp_ms)
+
+        if pending_frame is not None:
+            captured_at, frame = pending_frame
+            metrics.INFERENCE_DURATION.observe(callback_start - captured_at)
+        else:
+            captured_at, frame = callback_start, output_image.numpy_view().copy()
+
+        self.controller.completed(timestamp_ms, bool(result.hand_landmarks), callback_start)
+
+        self.result_queue.put((result, frame, timestamp_ms, captured_at))
+
+        metrics.RESULTS.inc()
+        metrics.CALLBACK_DURATION.observe(time.perf_counter() - callback_start)
+
+    # Result worker loop: takes the results handed off by the callback method, emitting their gestures first and then rendering their frame. When newer results
+    # are already waiting, the frame isn't rendered, as it would be replaced right away in the frame queue. Frames that haven't been sent to the recognizer are
+    # handed off without a result; they are only rendered.
+    def process_results(self):
+        while True:
+            item = self.result_queue.get()
+
+            if item is None:
+                break
+
+            result, frame, timestamp_ms, captured_at = item
+
+            if result is not None:
+                self.last_hand_landmarks = result.hand_landmarks
+                self.last_handedness = [handedness[0].category_name for handedness in result.handedness]
+                self.frame_aspect_ratio = frame.shape[1] / frame.shape[0]
+                self.emit_gestures(result, timestamp_ms, captured_at)
+
+                if self.result_log is not None:
+                    self.result_log.write(result, timestamp_ms, captured_at)
+
+            if self.frame_queue is not None and self.result_queue.empty():
+                render_start = time.perf_counter()
+                self.render_frame(result, frame, timestamp_ms)
+                metrics.RENDER_DURATION.observe(time.perf_counter() - render_start)
+            else:
+                self.frame_pool.release(frame)
+
+                if self.frame_queue is not None:
+                    metrics.FRAMES_NOT_RENDERED.inc()
+
+    # Adds the gestures recognized in a result to the gesture queue. When custom gestures have been recorded, every hand is classified against them first, and
+    # a hand showing a custom gesture doesn't emit its built-in one. The motion gestures completed by the hands' trajectories are added after them.
+    def emit_gestures(self, result, timestamp_ms, captured_at):
+        custom_names = [None] * len(result.gestures)
+
+        if self.custom_gestures.names() and result.hand_landmarks:
+            custom_names = self.custom_gestures.classify(custom_gestures.landmark_array(result.hand_landmarks),
+                                                         [handedness[0].category_name == "Left" for handedness in result.handedness], self.frame_aspect_ratio)
 
-    # Callback method for the gesture recognizer, handles the result for each frame
-    def handle_result(self, result: GestureRecognizerResult, output_image: mp.Image, timestamp_ms: int):
-        # Get an unwritable NumPy ndarray from the MediaPipe image received
-        image_array = output_image.numpy_view()
-        
-        # Change the image's color space (BGR, used by MediaPipe) to RGB
-        image_array = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
-
-        hand_landmarks_list = result.hand_landmarks
-
-        # Loop through the detected hands to visualize
-        for idx in range(len(hand_landmarks_list)):
-            hand_landmarks = hand_landmarks_list[idx]
-
-            # Draw the hand landmarks
-            hand_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
-            hand_landmarks_proto.landmark.extend([
-            landmark_pb2.NormalizedLandmark(x=landmark.x, y=landmark.y, z=landmark.z) for landmark in hand_landmarks
-            ])
-            mp.solutions.drawing_utils.draw_landmarks(
-            image_array,
-            hand_landmarks_proto,
-            mp.solutions.hands.HAND_CONNECTIONS,
-            mp.solutions.drawing_styles.get_default_hand_landmarks_style(),
-            mp.solutions.drawing_styles.get_default_hand_connections_style())
-
-        # Add the frame to the frame queue
-        self.frame_queue.put(image_array)
-        
-        # Add recognized gestures to the gesture queue
         for i in range(len(result.gestures)):
             gesture = result.gestures[i][0]
             hand = result.handedness[i][0]
 
-            if gesture.category_name != "None" and gesture.score >= GESTURE_SCORE_THRESHOLD:
-                gesture_dict = {
-                    "name": gesture.category_name,
-                    "hand": hand.category_name,
-                    "timestamp": timestamp_ms
-                }
-                
-                self.gesture_queue.put(gesture_dict)
\ No newline at end of file
+            if custom_names[i] is not None:
+                name = custom_names[i]
+                metrics.CUSTOM_GESTURES.inc()
+            elif gesture.category_name != "None" and gesture.score >= GESTURE_SCORE_THRESHOLD:
+                name = gesture.category_name
+            else:
+                continue
+
+            gesture_dict = {
+                "name": name,
+                "hand": hand.category_name,
+                "timestamp": timestamp_ms,
+                "captured_at": captured_at
+            }
+            
+            self.gesture_queue.put(gesture_dict)
+            metrics.GESTURES.inc()
+
+        if self.motion.enabled and result.hand_landmarks:
+            for name, hand in self.motion.update(motion_gestures.result_hands(result), captured_at, self.frame_aspect_ratio):
+                self.gesture_queue.put({"name": name, "hand": hand, "timestamp": timestamp_ms, "captured_at": captured_at})
+                metrics.GESTURES.inc()
+
+    # Draws the hand landmarks of a result on its RGB frame, in place, and adds the frame to the frame queue
+    def render_frame(self, result, frame, timestamp_ms):
+        # Draw the landmarks of every detected hand (those of the last result if this frame has none)
+        for hand_landmarks in (result.hand_landmarks if result is not None else self.last_hand_landmarks):
+            self.renderer.draw(frame, hand_landmarks)
+
+        # Add the frame to the frame queue, unless another worker has already added a newer one
+        with self.render_lock:
+            if timestamp_ms > self.last_rendered_timestamp:
+                self.last_rendered_timestamp = timestamp_ms
+                self.frame_queue.put(frame)
+                return
+
+        self.frame_pool.release(frame)
+        metrics.FRAMES_NOT_RENDERED.inc()
+
+    # Returns the time at which the frame with the given timestamp was read and the frame itself (None if the frame is unknown), releasing the frames stored
+    # before it (those MediaPipe has dropped)
+    def pop_pending_frame(self, timestamp_ms):
+        for frame_timestamp_ms in list(self.pending_frames):
+            if frame_timestamp_ms >= timestamp_ms:
+                break
+
+            self.frame_pool.release(self.pending_frames.pop(frame_timestamp_ms)[1])
+
+        return self.pending_frames.pop(timestamp_ms, None)
+
+    # Loads the recognizer's part of the application configuration from a dictionary. The inference settings take effect right away; when the capture device
+    # settings change while the recognizer is running, the frame source is reopened to apply them.
+    def load_config(self, config):
+        inference = config["Inference"]
+        capture = config["Capture"]
+
+        self.controller.configure(inference["IDLE_FPS"], inference["MAX_FPS"], inference["MAX_IN_FLIGHT"])
+        self.custom_gestures.load_config(config)
+        self.motion.load_config(config)
+        self.inference_width = capture["INFERENCE_WIDTH"]
+        self.release_while_paused = capture["RELEASE_WHILE_PAUSED"]
+
+        device_settings = (capture["WIDTH"], capture["HEIGHT"], capture["FPS"], capture["FOURCC"], capture["BUFFER_SIZE"])
+
+        if self.device_settings is not None and device_settings != self.device_settings:
+            if self.source_open and isinstance(self.source, frame_source.CameraSource):
+                self.restart()
+
+        self.device_settings = device_settings
+        self.source.configure(capture)
@@ -1,48 +1,141 @@
 import tkinter as tk
-import time, threading, queue, gesture_recognizer, gesture_handler, config_file
+import time, threading, queue, gesture_recognizer, gesture_handler, config_file, config_watcher, ring_buffer, metrics, preview, startup, recognizer_service
+import custom_gestures, motion_gestures
 from tkinter import ttk, messagebox
-from PIL import Image, ImageDraw, ImageFont, ImageTk
 from pynput.keyboard import Key, Listener
 
 # Constants
 ICON_PATH = "assets/icon.ico"
 FONT_PATH = "assets/Roboto-Medium.ttf"
+METRICS_OVERLAY_REFRESH_TIME = 1.0
+FALLBACK_POLL_INTERVAL = 250
+POLL_INTERVAL = 10
+CUSTOM_GESTURE_ROW_HEIGHT = 31
+MOTION_GESTURE_LABELS = {
+        "Swipe_Left": "Swipe left ⬅",
+        "Swipe_Right": "Swipe right ➡",
+        "Swipe_Up": "Swipe up ⬆",
+        "Swipe_Down": "Swipe down ⬇",
+        "Circle_Clockwise": "Circle ⟳",
+        "Circle_Counterclockwise": "Circle ⟲"
+    }
+RECORD_TIME = 1500
+RECORD_SAMPLE_INTERVAL = 50
 
 # Custom exception class for handling unexpected negative values
 class NegativeValueError(Exception):
     pass
 
+# Event notifier thread, which wakes the Tkinter thread up by generating virtual events on a widget. Generating an event from another thread waits until the
+# Tkinter thread accepts it, so the threads that notify only mark the event as pending and hand it over to this thread, without waiting. An event that is
+# already pending isn't generated again until the Tkinter thread has handled it.
+class EventNotifier(threading.Thread):
+    def __init__(self, widget: tk.Misc):
+        super().__init__(daemon=True)
+
+        self.widget = widget
+
+        # Virtual events generated and not handled yet (added by the notifying threads and removed by the Tkinter thread, under the lock), and queue of the
+        # events to generate
+        self.pending_events = set()
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()
+
+        # Whether the Tcl interpreter accepts events from other threads; if it doesn't, the interface falls back to polling the buffers
+        self.working = True
+
+    # Returns a function that, called from any thread, requests the given virtual event unless one is already pending
+    def create_notifier(self, sequence):
+        def notify():
+            with self.lock:
+                if not self.working or sequence in self.pending_events:
+                    return
+
+                self.pending_events.add(sequence)
+
+            self.requests.put(sequence)
+
+        return notify
+
+    # Marks a virtual event as handled, so that the next one can be generated (called by the Tkinter thread before handling it)
+    def handled(self, sequence):
+        with self.lock:
+            self.pending_events.discard(sequence)
+
+    # Stops the thread once the events already requested have been generated
+    def stop(self):
+        self.requests.put(None)
+
+    def run(self):
+        while True:
+            sequence = self.requests.get()
+
+            if sequence is None:
+                break
+
+            try:
+                self.widget.event_generate(sequence, when="tail")
+            except (RuntimeError, tk.TclError):
+                with self.lock:
+                    self.working = False
+                    self.pending_events.clear()
+
+                break
+
 # Graphical User Interface class
 class GUI(tk.Tk):
-    def __init__(self, stop_recognizer: threading.Event, frame_queue: queue.Queue, executed_action_queue: queue.Queue, recognizer_thread: gesture_recognizer.LiveRecognizer,
-                 handler_thread: gesture_handler.GestureHandler):
+    def __init__(self, stop_recognizer: threading.Event, frame_queue: ring_buffer.RingBuffer, executed_action_queue: ring_buffer.RingBuffer, recognizer_thread: gesture_recognizer.LiveRecognizer,
+                 handler_thread: gesture_handler.GestureHandler, show_metrics: bool = False):
         super().__init__()
 
         # Event that, when set before tkinter's thread end, means that the capture device is not working properly
         self.stop_recognizer = stop_recognizer
         
-        # Queue where the frames processed by the gesture recognizer will be put
+        # Bounded buffer where the frames processed by the gesture recognizer will be put
         self.frame_queue = frame_queue
 
-        # Queue where the actions executed by the gesture handler will be put
+        # Bounded buffer where the actions executed by the gesture handler will be put
         self.executed_action_queue = executed_action_queue
 
-        # Gesture recognizer and handler threads that will be started when the launch button is pressed
+        # Gesture recognizer and handler threads that will be started when the launch button is pressed, and service used to start, pause and resume them
         self.recognizer_thread = recognizer_thread
         self.handler_thread = handler_thread
+        self.service = recognizer_service.RecognizerService(recognizer_thread, handler_thread)
+
+        # Thread that reloads the configuration into the gesture handler when it changes, started along with the gesture recognizer and handler threads
+        self.config_watcher = None
 
         # Tkinter frames that will be used for changing the interface
         self.main_frame = tk.Frame(self)
         self.loading_frame = tk.Frame(self)
 
-        # Label widget for displaying images
+        # Label widget for displaying images, and renderer of the images it displays
         self.display_label = tk.Label(self)
+        self.preview = preview.PreviewRenderer(FONT_PATH)
         
         # String that will store the last executed action
         self.last_action = ""
+
+        # Whether the pipeline metrics are drawn over the displayed frames, and the text currently drawn along with the time it was generated
+        self.show_metrics = show_metrics
+        self.metrics_text = ""
+        self.metrics_text_time = 0
+
+        # Thread through which the worker threads wake the Tkinter thread up with virtual events (when it can't, the buffers are polled every POLL_INTERVAL
+        # milliseconds), and whether a frame display has been scheduled to respect the preview's display frame rate
+        self.event_notifier = EventNotifier(self)
+        self.display_scheduled = False
         
         self.setup_main_window()
 
+        # Load the gesture recognition model in the background once the main window is ready
+        self.after_idle(self.on_window_ready)
+
+    # Starts loading the gesture recognition model in the background, so that launching it doesn't have to wait for it
+    def on_window_ready(self):
+        startup.mark("window ready")
+        self.recognizer_thread.preload()
+
     # Sets up the application's main window
     def setup_main_window(self):
         self.title("Gesture Maestro")
@@ -89,8 +182,12 @@ class GUI(tk.Tk):
         settings_window.title("Settings")
         settings_window.resizable(False, False)
 
-        win_width = 265
-        win_height = 360
+        # Make room for the custom gestures, which have a button to delete them
+        config = config_file.retrieve_configuration()
+        custom_names = config_file.custom_gestures(config) if config else []
+
+        win_width = 300 if custom_names else 265
+        win_height = 390 + CUSTOM_GESTURE_ROW_HEIGHT * (len(motion_gestures.GESTURE_NAMES) + len(custom_names))
         settings_window.geometry(f"{win_width}x{win_height}")
         
         self.center_window(settings_window, win_width, win_height)
@@ -104,12 +201,12 @@ class GUI(tk.Tk):
         # Give focus to settings window
         settings_window.focus_set()
 
-        self.setup_settings_content(settings_window)
+        self.setup_settings_content(settings_window, custom_names)
         
         settings_window.iconbitmap(ICON_PATH)
 
     # Sets up the content inside the settings Tkinter window
-    def setup_settings_content(self, settings_window):
+    def setup_settings_content(self, settings_window, custom_names):
         # ACTIONS
         actions_frame = tk.Frame(settings_window)
         actions_frame.pack(expand=True)
@@ -184,6 +281,35 @@ class GUI(tk.Tk):
         love_right_btn = tk.Button(actions_frame, text="Right hand", command=lambda:self.setup_edit_action_window(settings_window, "Right", "ILoveYou"))
         love_right_btn.grid(row=6, column=2, padx=5, pady=2.5)
 
+        # Motion gestures
+        for row, name in enumerate(motion_gestures.GESTURE_NAMES, start=7):
+            motion_label = tk.Label(actions_frame, text=MOTION_GESTURE_LABELS[name])
+            motion_label.grid(row=row, column=0, padx=5, pady=2.5)
+
+            motion_left_btn = tk.Button(actions_frame, text="Left hand", command=lambda name=name:self.setup_edit_action_window(settings_window, "Left", name))
+            motion_left_btn.grid(row=row, column=1, padx=5, pady=2.5)
+
+            motion_right_btn = tk.Button(actions_frame, text="Right hand", command=lambda name=name:self.setup_edit_action_window(settings_window, "Right", name))
+            motion_right_btn.grid(row=row, column=2, padx=5, pady=2.5)
+
+        # Custom gestures, which can be deleted
+        for row, name in enumerate(custom_names, start=7 + len(motion_gestures.GESTURE_NAMES)):
+            custom_label = tk.Label(actions_frame, text=name.replace("_", " "))
+            custom_label.grid(row=row, column=0, padx=5, pady=2.5)
+
+            custom_left_btn = tk.Button(actions_frame, text="Left hand", command=lambda name=name:self.setup_edit_action_window(settings_window, "Left", name))
+            custom_left_btn.grid(row=row, column=1, padx=5, pady=2.5)
+
+            custom_right_btn = tk.Button(actions_frame, text="Right hand", command=lambda name=name:self.setup_edit_action_window(settings_window, "Right", name))
+            custom_right_btn.grid(row=row, column=2, padx=5, pady=2.5)
+
+            custom_delete_btn = tk.Button(actions_frame, text="✕", command=lambda name=name:self.delete_custom_gesture(name, settings_window))
+            custom_delete_btn.grid(row=row, column=3, padx=(0, 5), pady=2.5)
+
+        # Custom gesture recording
+        record_btn = tk.Button(settings_window, text="Record custom gesture", command=lambda:self.setup_record_gesture_window(settings_window))
+        record_btn.pack(expand=True)
+
         # OTHER SETTINGS
         other_settings_frame = tk.Frame(settings_window)
         other_settings_frame.pack(expand=True)
@@ -256,6 +382,115 @@ class GUI(tk.Tk):
         except NegativeValueError:
             messagebox.showerror("Error", "Time values cannot be negative.")
 
+    # Closes the settings window and opens it again, so that it shows the current custom gestures
+    def reopen_settings_window(self, settings_window):
+        settings_window.destroy()
+        self.setup_settings_window()
+
+    # Deletes a custom gesture, along with its templates and actions, after asking the user for confirmation
+    def delete_custom_gesture(self, name, settings_window):
+        if not messagebox.askyesno("Delete custom gesture", f"Delete the custom gesture {name} and its actions?", parent=settings_window):
+            return
+
+        try:
+            custom_gestures.remove_templates(name)
+        except custom_gestures.TemplateError as e:
+            messagebox.showerror("Error", str(e), parent=settings_window)
+            return
+
+        if not config_file.remove_gesture(name):
+            messagebox.showerror("Error", "An error occurred while saving the configuration file.", parent=settings_window)
+
+        self.reopen_settings_window(settings_window)
+
+    # Sets up the window used to record a custom gesture: the user names it, shows it to the camera and presses the record button
+    def setup_record_gesture_window(self, settings_window):
+        if not self.service.started:
+            messagebox.showinfo("Record custom gesture", "Launch the model first, then right-click the camera preview to open the settings and record the "
+                                "gesture in front of the camera.", parent=settings_window)
+            return
+
+        record_window = tk.Toplevel(settings_window)
+
+        record_window.title("Record custom gesture")
+        record_window.resizable(False, False)
+
+        win_width = 360
+        win_height = 130
+        record_window.geometry(f"{win_width}x{win_height}")
+
+        self.center_window(record_window, win_width, win_height)
+
+        # Create relationship between record window and settings window, and block interaction with the settings window while the record window is opened
+        record_window.transient(settings_window)
+        record_window.grab_set()
+        record_window.focus_set()
+
+        record_frame = tk.Frame(record_window)
+        record_frame.pack(expand=True)
+
+        name_label = tk.Label(record_frame, text="Name")
+        name_label.grid(row=0, column=0, padx=5, pady=2.5)
+
+        name_entry = tk.Entry(record_frame, width=24)
+        name_entry.grid(row=0, column=1, padx=5, pady=2.5)
+
+        hint_label = tk.Label(record_frame, text="Show the gesture to the camera with one hand and press Record.\nRecording a gesture again adds new samples to it.")
+        hint_label.grid(row=1, column=0, columnspan=2, pady=5)
+
+        record_button = tk.Button(record_frame, text="Record",
+                                  command=lambda:self.start_gesture_recording(name_entry.get().strip(), record_window, settings_window, hint_label, record_button))
+        record_button.grid(row=2, column=0, columnspan=2, pady=2.5)
+
+        record_window.iconbitmap(ICON_PATH)
+
+    # Starts sampling the landmarks of the hand shown to the camera for RECORD_TIME milliseconds, if the custom gesture's name is valid
+    def start_gesture_recording(self, name, record_window, settings_window, hint_label, record_button):
+        if not custom_gestures.valid_name(name, config_file.BASE_CONFIG_DICT["Actions"]["Left"]):
+            messagebox.showerror("Error", "The name must have up to 24 letters, digits or underscores, and cannot be the name of a built-in gesture.",
+                                 parent=record_window)
+            return
+
+        hint_label.config(text="Recording... Keep showing the gesture to the camera.")
+        record_button.config(state="disabled")
+
+        self.after(RECORD_SAMPLE_INTERVAL, self.sample_custom_gesture, name, [], None, time.perf_counter() + RECORD_TIME / 1000, record_window, settings_window)
+
+    # Adds the normalized landmarks of the first hand of the last result to the samples (once per result) until the recording time is over, then saves them
+    # as templates of the custom gesture
+    def sample_custom_gesture(self, name, samples, last_landmarks, end_time, record_window, settings_window):
+        if not record_window.winfo_exists():
+            return
+
+        landmarks = self.recognizer_thread.last_hand_landmarks
+
+        if landmarks is not last_landmarks and len(landmarks) and self.recognizer_thread.last_handedness:
+            left_hand = self.recognizer_thread.last_handedness[0] == "Left"
+            samples.append(custom_gestures.normalize(custom_gestures.landmark_array(landmarks)[:1], [left_hand], self.recognizer_thread.frame_aspect_ratio)[0])
+
+        if time.perf_counter() < end_time:
+            self.after(RECORD_SAMPLE_INTERVAL, self.sample_custom_gesture, name, samples, landmarks, end_time, record_window, settings_window)
+            return
+
+        record_window.destroy()
+
+        if not samples:
+            messagebox.showerror("Error", "No hand was detected while recording. Make sure the detection is running and your hand is visible.",
+                                 parent=settings_window)
+            return
+
+        # Save the templates before adding the gesture to the configuration, whose reload makes the recognizer load them
+        try:
+            custom_gestures.add_templates(name, samples)
+        except custom_gestures.TemplateError as e:
+            messagebox.showerror("Error", str(e), parent=settings_window)
+            return
+
+        if not config_file.add_gesture(name):
+            messagebox.showerror("Error", "An error occurred while saving the configuration file.", parent=settings_window)
+
+        self.reopen_settings_window(settings_window)
+
     # Sets up the application's edit gesture action window
     def setup_edit_action_window(self, parent, hand, gesture):
         edit_action_window = tk.Toplevel(parent)
@@ -300,16 +535,29 @@ class GUI(tk.Tk):
         edit_button = tk.Button(edit_action_frame, text="Edit action", command=lambda:self.setup_action_capture(hand, gesture, edit_action_window, hint_label, edit_button))
         edit_button.pack(pady=5)
 
-    # Starts a thread that executes the capture_action method and changes the edit action window button to indicate the user that the key capture has started
+    # Starts a thread that executes the capture_action method and changes the edit action window button to indicate the user that the key capture has started.
+    # Closing the edit action window stops the capture.
     def setup_action_capture(self, hand, gesture, edit_action_window, hint_label, edit_button):
-        capture_thread = threading.Thread(target=self.capture_action, args=(hand, gesture, edit_action_window, hint_label, edit_button))
+        listener = self.create_capture_listener()
+        listener.start()
+
+        window_closed = threading.Event()
+
+        def on_destroy(event):
+            if event.widget is edit_action_window:
+                window_closed.set()
+                listener.stop()
+
+        capture_thread = threading.Thread(target=self.capture_action, args=(hand, gesture, listener, window_closed, edit_action_window, hint_label, edit_button))
         capture_thread.start()
+
+        edit_action_window.bind("<Destroy>", on_destroy, add="+")
         
         edit_button.config(text="Capturing...", state="disabled")
-    
-    # Starts a pynput keyboard listener that runs until 3 keys have been pressed, Esc has been pressed or the edit action window is closed, storing the name of
-    # the pressed keys (the action) in a list
-    def capture_action(self, hand, gesture, edit_action_window, hint_label, edit_button):
+
+    # Creates a pynput keyboard listener that runs until 3 keys have been pressed or Esc has been pressed, storing the name of the pressed keys (the action) in
+    # its captured_keys list
+    def create_capture_listener(self):
         captured_keys = []
 
         # Method executed by the listener when a key is pressed
@@ -331,15 +579,17 @@ class GUI(tk.Tk):
                 return False
             
         listener = Listener(on_press=on_press, on_release=on_release)
-        listener.start()
+        listener.captured_keys = captured_keys
 
-        while listener.is_alive() and edit_action_window.winfo_exists():
-            time.sleep(0.1)
+        return listener
 
-        if not edit_action_window.winfo_exists():
-            listener.stop()
-        else:
-            self.after(0, self.update_after_action_capture, hand, gesture, captured_keys, edit_action_window, hint_label, edit_button)
+    # Waits for a keyboard listener to stop (because of the captured keys, or because the edit action window has been closed) and, if the window is still open,
+    # shows the captured action in it
+    def capture_action(self, hand, gesture, listener, window_closed, edit_action_window, hint_label, edit_button):
+        listener.join()
+
+        if not window_closed.is_set():
+            self.after(0, self.update_after_action_capture, hand, gesture, listener.captured_keys, edit_action_window, hint_label, edit_button)
 
     # Updates the edit action window widgets to notify the user that the key capture has finished, and changes the button command for the save_action method
     def update_after_action_capture(self, hand, gesture, action, edit_action_window, hint_label, edit_button):
@@ -372,15 +622,33 @@ class GUI(tk.Tk):
             config = config_file.retrieve_configuration()
 
             if config:
-                # Load the current application configuration into the gesture handler
-                self.handler_thread.load_config(config)
-                
-                # Start the gesture recognizer and handler threads
-                self.recognizer_thread.start()
-                self.handler_thread.start()
+                # Load the current application configuration into the gesture recognizer and the preview renderer
+                self.recognizer_thread.load_config(config)
+                self.preview.load_config(config)
+
+                # Load the current application configuration into the gesture handler, warning the user about the keys that can't be pressed
+                invalid_keys = self.handler_thread.load_config(config)
+
+                if invalid_keys:
+                    messagebox.showwarning("Warning", "The following keys are not valid and will be ignored:\n" +
+                                           "\n".join(f"{hand} hand {gesture}: {key}" for hand, gesture, key in invalid_keys))
                 
-                # Execute update_image in the Tkinter thread after 10ms
-                self.after(10, self.update_image)
+                # Start the gesture recognizer and handler threads, as well as the configuration watcher, so that the changes saved from the settings window are
+                # applied without relaunching the model
+                self.service.start()
+
+                self.config_watcher = config_watcher.ConfigWatcher(self.stop_recognizer, self.handler_thread, recognizer=self.recognizer_thread)
+                self.config_watcher.start()
+
+                # Update the displayed frame and last executed action whenever the buffers receive a new one, and poll them as a fallback
+                self.bind("<<FrameReady>>", lambda event: self.handle_event("<<FrameReady>>", self.update_image))
+                self.bind("<<ActionExecuted>>", lambda event: self.handle_event("<<ActionExecuted>>", self.update_last_action))
+
+                self.event_notifier.start()
+                self.frame_queue.add_listener(self.event_notifier.create_notifier("<<FrameReady>>"))
+                self.executed_action_queue.add_listener(self.event_notifier.create_notifier("<<ActionExecuted>>"))
+
+                self.after(POLL_INTERVAL, self.poll_updates)
             else:
                 configuration_file_error()
 
@@ -396,28 +664,69 @@ class GUI(tk.Tk):
 
         window.geometry(f"+{x_pos}+{y_pos}")
 
-    # Updates the image currently on display by changing it for the next processed frame in the queue
-    def update_image(self):
+    # Pauses the detection if it is running, or resumes it if it is paused, showing its state in the window's title. The model stays loaded while paused.
+    def toggle_detection(self):
+        if self.service.toggle():
+            self.title("Gesture Maestro (paused - click to resume)")
+        else:
+            self.title("Gesture Maestro")
+
+    # Handles a virtual event generated by the event notifier, allowing the next one to be generated before calling the update method
+    def handle_event(self, sequence, update):
+        self.event_notifier.handled(sequence)
+        update()
+
+    # Checks whether the gesture recognizer has stopped and updates the displayed frame and last executed action, every FALLBACK_POLL_INTERVAL milliseconds
+    # while the interface is woken up by virtual events, or every POLL_INTERVAL milliseconds otherwise
+    def poll_updates(self):
         if self.stop_recognizer.is_set():
-            messagebox.showerror("Error", "Gesture recognizer error: Ensure your capture device is connected and functioning correctly.")
+            messagebox.showerror("Error", "Gesture recognizer error: " + (self.recognizer_thread.error or "Ensure your capture device is connected and functioning correctly."))
             self.destroy()
-        
+            return
+
+        self.update_image()
+        self.update_last_action()
+
+        self.after(FALLBACK_POLL_INTERVAL if self.event_notifier.working else POLL_INTERVAL, self.poll_updates)
+
+    # Executes update_image once the next frame is due according to the preview's display frame rate
+    def display_when_due(self):
+        self.display_scheduled = False
+        self.update_image()
+
+    # Updates the image currently on display by changing it for the newest processed frame in the buffer, skipping any older frame that has not been displayed.
+    # While the next frame is not due according to the preview's display frame rate, the frames are left in the buffer and the update is scheduled for when it
+    # is due.
+    def update_image(self):
         try:
-            image_array = self.frame_queue.get(False)
-            
-            # Convert the NumPy array to a Pillow image
-            image_pil = Image.fromarray(image_array)
+            display_start = time.perf_counter()
 
-            # Draw the last executed action on the image
-            draw = ImageDraw.Draw(image_pil)
-            draw.text((20, 20), self.last_action, font=ImageFont.truetype(FONT_PATH, 18), fill=(255, 0, 0))
+            if not self.preview.is_due(display_start):
+                if not self.display_scheduled and self.frame_queue.qsize():
+                    self.display_scheduled = True
+                    self.after(max(round(self.preview.time_until_due(display_start) * 1000), 1), self.display_when_due)
 
-            # Convert the Pillow image to a Tkinter compatible format
-            image_tk = ImageTk.PhotoImage(image_pil)
-            
-            # Display the captured frame, changing the Label's image while keeping a reference to that image so that the garbage collector doesn't remove it
-            self.display_label.config(image=image_tk)
-            self.display_label.image = image_tk
+                raise queue.Empty
+
+            image_array = self.frame_queue.get_latest()
+
+            # Refresh the pipeline metrics text periodically
+            if self.show_metrics and display_start - self.metrics_text_time >= METRICS_OVERLAY_REFRESH_TIME:
+                self.metrics_text = "\n".join(metrics.overlay_lines(self.recognizer_thread.controller))
+                self.metrics_text_time = display_start
+
+            # Render the frame along with the last executed action and the metrics, then give the array back to the recognizer's buffer pool (the renderer
+            # has copied it)
+            new_photo = self.preview.render(image_array, self.last_action, self.metrics_text if self.show_metrics else None)
+            self.recognizer_thread.frame_pool.release(image_array)
+
+            # Display the rendered frame, setting the Label's image only when the renderer has created a new one (the Label's reference keeps it from being
+            # removed by the garbage collector)
+            image_tk = self.preview.photo
+
+            if new_photo:
+                self.display_label.config(image=image_tk)
+                self.display_label.image = image_tk
             
             # Remove the loading frame and pack the label used for displaying images inside the main window, if this is the first time that an image is taken from
             # the queue. After that, use the image's resolution as the window's size and center it again.
@@ -431,19 +740,23 @@ class GUI(tk.Tk):
                 
                 self.center_window(self, img_width, img_height)
 
-                # Execute update_last_action in the Tkinter thread after 10ms
-                self.after(10, self.update_last_action)
+                # Clicking the displayed frame pauses or resumes the detection, and right-clicking it opens the settings window
+                self.display_label.bind("<Button-1>", lambda event: self.toggle_detection())
+                self.display_label.bind("<Button-3>", lambda event: self.setup_settings_window())
+
+                startup.mark("first frame displayed")
+                print(startup.report(), flush=True)
+                metrics.register_startup_stages()
+
+            metrics.DISPLAY_DURATION.observe(time.perf_counter() - display_start)
+            metrics.FRAMES_DISPLAYED.inc()
         except queue.Empty:
             pass
-            
-        self.after(10, self.update_image)
 
-    # Updates the last executed action variable
+    # Updates the last executed action variable with the newest action in the buffer
     def update_last_action(self):
         try:
-            action = self.executed_action_queue.get(False)
+            action = self.executed_action_queue.get_latest()
             self.last_action = str(action)
         except queue.Empty:
-            pass
-
-        self.after(10, self.update_last_action)
\ No newline at end of file
+            pass
\ No newline at end of file
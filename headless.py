@@ -0,0 +1,189 @@
+import os, sys, time, queue, signal, resource, threading
+import gesture_recognizer, gesture_handler, config_file, config_watcher, frame_source, ring_buffer, metrics, startup, recognizer_service, multi_source, result_log
+import event_server
+
+# Constants
+EXECUTED_ACTION_BUFFER_SIZE = 64
+REPORT_INTERVAL = 60.0
+
+# Returns the resident set size of this process in bytes, read from /proc when available (Linux) or, otherwise, the peak resident set size
+def resident_memory():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+# Returns the line reporting the memory and CPU usage of this process since the given start times
+def usage_report(start_time, cpu_start_time):
+    elapsed = time.perf_counter() - start_time
+    cpu_time = time.process_time() - cpu_start_time
+
+    return f"rss {resident_memory() / 2 ** 20:.1f} MiB | cpu {cpu_time:.1f} s ({cpu_time / max(elapsed, 1e-6) * 100:.1f}% over {elapsed:.0f} s)"
+
+# Runs the gesture recognizer and handler without an interface: no frame is drawn on or rendered, the executed actions are written to stdout and the memory
+# and CPU usage are reported every report_interval seconds (0 means only when stopping). SIGINT and SIGTERM stop the application cleanly, and SIGUSR1 pauses or
+# resumes the detection (where available, with a single source). With several sources, each one gets its own recognizer, running in a thread or in a child
+# process as set by source_workers, and their gestures are merged into a single stream. Returns the exit status: 0 when stopped by a signal or at the end of
+# the recorded sources, 1 when a recognizer has failed or the configuration file cannot be used. The results of a single source can be recorded into a result
+# log, and a result log can be replayed (at replay_speed times its recorded rate, or as fast as possible if 0) instead of running any recognizer. The gestures
+# and executed actions are published to the clients of the event server, if one is provided.
+def run(source_specs=("0",), report_interval: float = REPORT_INTERVAL, metrics_server: metrics.MetricsServer = None,
+        source_workers: str = multi_source.MODE_THREADS, result_log_path: str = None, replay_path: str = None, replay_speed: float = 1.0,
+        events: event_server.EventServer = None):
+    if isinstance(source_specs, str):
+        source_specs = [source_specs]
+
+    start_time = time.perf_counter()
+    cpu_start_time = time.process_time()
+
+    # Load the application configuration, creating the configuration file if necessary
+    if not config_file.check() and not config_file.create():
+        print("Configuration file could not be accessed. Check your permissions.", file=sys.stderr)
+        return 1
+
+    config = config_file.retrieve_configuration()
+
+    if not config:
+        print("Configuration file could not be read.", file=sys.stderr)
+        return 1
+
+    # Create the queue where the gesture recognizer will put the recognized gestures, and the bounded buffer where the gesture handler will put the executed
+    # actions; there is no frame queue, as frames are not displayed
+    gesture_queue = queue.Queue()
+    executed_action_queue = ring_buffer.RingBuffer(EXECUTED_ACTION_BUFFER_SIZE)
+
+    metrics.register_queue("gesture_queue", gesture_queue)
+    metrics.register_queue("executed_action_queue", executed_action_queue)
+    metrics.REGISTRY.gauge("gesture_maestro_process_resident_memory_bytes", "Resident set size of the process.", None, resident_memory)
+    metrics.REGISTRY.gauge("gesture_maestro_process_cpu_seconds", "CPU time used by the process.", None, time.process_time)
+
+    stop_recognizer = threading.Event()
+    result_log_writer = None
+
+    if replay_path is not None:
+        try:
+            recognizer_thread = result_log.ResultReplayer(stop_recognizer, gesture_queue, result_log.load(replay_path), replay_speed)
+        except (OSError, result_log.ResultLogError) as e:
+            print(f"Result log could not be replayed: {e}", file=sys.stderr)
+            return 1
+
+        source_specs = [replay_path]
+    elif len(source_specs) > 1:
+        recognizer_thread = multi_source.MultiSourceRecognizer(stop_recognizer, gesture_queue, source_specs, source_workers)
+    else:
+        recognizer_thread = gesture_recognizer.LiveRecognizer(stop_recognizer, None, gesture_queue, frame_source.from_spec(source_specs[0]))
+        metrics.register_rate_controller(recognizer_thread)
+
+    if result_log_path is not None:
+        if not isinstance(recognizer_thread, gesture_recognizer.LiveRecognizer):
+            print("Results can only be recorded from a single live source.", file=sys.stderr)
+            return 1
+
+        try:
+            result_log_writer = recognizer_thread.result_log = result_log.ResultLogWriter(result_log_path)
+        except (OSError, result_log.ResultLogError) as e:
+            print(f"Result log could not be opened: {e}", file=sys.stderr)
+            return 1
+
+    handler_thread = gesture_handler.GestureHandler(stop_recognizer, gesture_queue, executed_action_queue)
+
+    if events is not None:
+        handler_thread.add_listener(events.publish)
+
+    recognizer_thread.load_config(config)
+
+    invalid_keys = handler_thread.load_config(config)
+
+    for hand, gesture, key in invalid_keys:
+        print(f"Invalid key ignored: {hand} hand {gesture}: {key}", file=sys.stderr)
+
+    # The multi-source recognizer and the replayer can neither be paused nor reconfigured while running, so they are started directly and only the handler
+    # follows the configuration file
+    service = None
+
+    if isinstance(recognizer_thread, gesture_recognizer.LiveRecognizer):
+        service = recognizer_service.RecognizerService(recognizer_thread, handler_thread)
+        watcher = config_watcher.ConfigWatcher(stop_recognizer, handler_thread, recognizer=recognizer_thread)
+    else:
+        watcher = config_watcher.ConfigWatcher(stop_recognizer, handler_thread)
+
+    # Stop every thread when SIGINT or SIGTERM is received, and pause or resume the detection when SIGUSR1 is received
+    def handle_signal(signum, frame):
+        stop_recognizer.set()
+
+    def handle_toggle_signal(signum, frame):
+        print("Detection paused" if service.toggle() else "Detection resumed", flush=True)
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    if service is not None and hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, handle_toggle_signal)
+
+    if service is not None:
+        service.start()
+    else:
+        recognizer_thread.start()
+        handler_thread.start()
+
+    watcher.start()
+
+    print(f"Gesture Maestro running headless (source {', '.join(source_specs)})", flush=True)
+
+    # Write each executed action to stdout until the recognizer stops, reporting the memory and CPU usage periodically
+    last_report_time = time.perf_counter()
+
+    startup_reported = False
+
+    while not stop_recognizer.is_set():
+        if not startup_reported and "first result" in startup.stages:
+            print(startup.report(), flush=True)
+            metrics.register_startup_stages()
+            startup_reported = True
+
+        try:
+            action = executed_action_queue.get(timeout=1.0)
+            print(f"{time.strftime('%H:%M:%S')} action {action}", flush=True)
+        except queue.Empty:
+            pass
+
+        if report_interval and time.perf_counter() - last_report_time >= report_interval:
+            last_report_time = time.perf_counter()
+            print(usage_report(start_time, cpu_start_time), flush=True)
+
+    # Stop the threads, waiting for the recognizer to release the frame source
+    if service is not None:
+        service.stop()
+    else:
+        handler_thread.stop()
+
+    watcher.stop()
+    recognizer_thread.join()
+    handler_thread.join()
+
+    if result_log_writer is not None:
+        result_log_writer.close()
+
+    # Write the remaining executed actions
+    while not executed_action_queue.empty():
+        print(f"{time.strftime('%H:%M:%S')} action {executed_action_queue.get_nowait()}", flush=True)
+
+    config_file.flush()
+
+    if metrics_server is not None:
+        metrics_server.stop()
+
+    if events is not None:
+        events.stop()
+
+    print(usage_report(start_time, cpu_start_time), flush=True)
+
+    if recognizer_thread.error is not None:
+        print(f"Gesture recognizer error: {recognizer_thread.error}", file=sys.stderr)
+        return 1
+
+    return 0
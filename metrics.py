@@ -0,0 +1,319 @@
+import threading, time, bisect, collections, os, socketserver, startup
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Constants
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+RATE_WINDOW = 5
+RECENT_SAMPLES = 256
+METRICS_PATH = "/metrics"
+
+# Base class for every metric: a name, a help text and an optional set of labels identifying the series inside its family
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: dict = None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels or {}
+        self.lock = threading.Lock()
+
+    # Returns the labels of the series formatted for the Prometheus text format, including the extra ones provided
+    def format_labels(self, extra=None):
+        labels = dict(self.labels, **(extra or {}))
+
+        if not labels:
+            return ""
+
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+    # Returns the lines of the Prometheus text format for this series
+    def samples(self):
+        raise NotImplementedError
+
+# Monotonically increasing counter that also keeps per-second counts of the last seconds, so its current rate can be retrieved cheaply
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: dict = None):
+        super().__init__(name, help_text, labels)
+
+        self.value = 0
+
+        # Counts of the last RATE_WINDOW seconds, along with the second the newest count belongs to
+        self.window = collections.deque([0] * RATE_WINDOW, maxlen=RATE_WINDOW)
+        self.window_second = int(time.monotonic())
+
+    def inc(self, amount=1):
+        second = int(time.monotonic())
+
+        with self.lock:
+            self.value += amount
+
+            if second != self.window_second:
+                self.advance(second)
+
+            self.window[-1] += amount
+
+    # Moves the per-second window forward until its newest count belongs to the given second
+    def advance(self, second):
+        for _ in range(min(second - self.window_second, RATE_WINDOW)):
+            self.window.append(0)
+
+        self.window_second = max(second, self.window_second)
+
+    # Returns the average number of increments per second over the last complete seconds of the window
+    def rate(self):
+        with self.lock:
+            self.advance(int(time.monotonic()))
+
+            return sum(list(self.window)[:-1]) / (RATE_WINDOW - 1)
+
+    def samples(self):
+        return [f"{self.name}{self.format_labels()} {self.value}"]
+
+# Metric holding a single value that can go up and down. Instead of being set, the value can be computed by a function when it is read, which makes it free to
+# keep for values like queue depths.
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: dict = None, function=None):
+        super().__init__(name, help_text, labels)
+
+        self.value = 0
+        self.function = function
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        if self.function is not None:
+            return self.function()
+
+        return self.value
+
+    def samples(self):
+        return [f"{self.name}{self.format_labels()} {self.get()}"]
+
+# Histogram of durations (in seconds) with cumulative buckets, as well as the most recent samples, used to compute percentiles for the overlay
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: dict = None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = collections.deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self.lock:
+            self.bucket_counts[index] += 1
+            self.count += 1
+            self.total += value
+            self.recent.append(value)
+
+    # Returns the given percentile (0-100) of the recent samples, or 0 if there are none
+    def recent_percentile(self, pct):
+        with self.lock:
+            recent = sorted(self.recent)
+
+        if not recent:
+            return 0
+
+        return recent[min(int(len(recent) * pct / 100), len(recent) - 1)]
+
+    def samples(self):
+        with self.lock:
+            bucket_counts = list(self.bucket_counts)
+            count = self.count
+            total = self.total
+
+        lines = []
+        cumulative = 0
+
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{self.format_labels({'le': le})} {cumulative}")
+
+        lines.append(f"{self.name}_sum{self.format_labels()} {total}")
+        lines.append(f"{self.name}_count{self.format_labels()} {count}")
+
+        return lines
+
+# Collection of metrics, grouped by name into families that can contain several series with different labels
+class Registry:
+    def __init__(self):
+        self.families = {}
+        self.lock = threading.Lock()
+
+    # Returns the series of the given class, name and labels, creating it if it does not exist yet
+    def get_or_create(self, metric_class, name, help_text, labels=None, **kwargs):
+        key = tuple(sorted((labels or {}).items()))
+
+        with self.lock:
+            family = self.families.setdefault(name, {})
+
+            if key not in family:
+                family[key] = metric_class(name, help_text, labels, **kwargs)
+
+            return family[key]
+
+    def counter(self, name, help_text, labels=None):
+        return self.get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=None, function=None):
+        gauge = self.get_or_create(Gauge, name, help_text, labels)
+
+        if function is not None:
+            gauge.function = function
+
+        return gauge
+
+    def histogram(self, name, help_text, labels=None, buckets=DEFAULT_BUCKETS):
+        return self.get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    # Returns every metric in the Prometheus text exposition format
+    def render(self):
+        with self.lock:
+            families = [(name, list(family.values())) for name, family in self.families.items()]
+
+        lines = []
+
+        for name, series in families:
+            lines.append(f"# HELP {name} {series[0].help_text}")
+            lines.append(f"# TYPE {name} {series[0].type_name}")
+
+            for metric in series:
+                lines.extend(metric.samples())
+
+        return "\n".join(lines) + "\n"
+
+# Registry used by the whole application
+REGISTRY = Registry()
+
+# Metrics shared by the recognizer, the handler and the interface
+FRAMES_CAPTURED = REGISTRY.counter("gesture_maestro_frames_captured_total", "Frames read from the frame source.")
+RESULTS = REGISTRY.counter("gesture_maestro_results_total", "Results delivered by the gesture recognizer's callback.")
+GESTURES = REGISTRY.counter("gesture_maestro_gestures_total", "Gestures recognized above the score threshold.")
+GESTURES_EXPIRED = REGISTRY.counter("gesture_maestro_gestures_expired_total", "Gestures discarded because they were older than the dispatch deadline.")
+ACTIONS_EXECUTED = REGISTRY.counter("gesture_maestro_actions_executed_total", "Actions executed by the gesture handler.")
+ACTIONS_SUPPRESSED = REGISTRY.counter("gesture_maestro_actions_suppressed_total", "Gestures ignored because of the action cooldown.")
+FRAMES_NOT_INFERRED = REGISTRY.counter("gesture_maestro_frames_not_inferred_total", "Frames not sent to the gesture recognizer by the rate controller.")
+FRAMES_NOT_RENDERED = REGISTRY.counter("gesture_maestro_frames_not_rendered_total", "Results whose frame was skipped because a newer one was available.")
+FRAMES_DISPLAYED = REGISTRY.counter("gesture_maestro_frames_displayed_total", "Frames displayed by the interface.")
+
+STAGE_DURATION_NAME = "gesture_maestro_stage_duration_seconds"
+STAGE_DURATION_HELP = "Duration of each pipeline stage."
+CAPTURE_DURATION = REGISTRY.histogram(STAGE_DURATION_NAME, STAGE_DURATION_HELP, {"stage": "capture"})
+INFERENCE_DURATION = REGISTRY.histogram(STAGE_DURATION_NAME, STAGE_DURATION_HELP, {"stage": "inference"})
+CALLBACK_DURATION = REGISTRY.histogram(STAGE_DURATION_NAME, STAGE_DURATION_HELP, {"stage": "callback"})
+DISPATCH_DURATION = REGISTRY.histogram(STAGE_DURATION_NAME, STAGE_DURATION_HELP, {"stage": "dispatch"})
+RENDER_DURATION = REGISTRY.histogram(STAGE_DURATION_NAME, STAGE_DURATION_HELP, {"stage": "render"})
+ACTION_DURATION = REGISTRY.histogram(STAGE_DURATION_NAME, STAGE_DURATION_HELP, {"stage": "action"})
+KEY_EVENT_LATENESS = REGISTRY.histogram("gesture_maestro_key_event_lateness_seconds", "Delay between the time a key press or release is scheduled for and "
+                                        "the time it is performed.", buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05))
+DISPLAY_DURATION = REGISTRY.histogram(STAGE_DURATION_NAME, STAGE_DURATION_HELP, {"stage": "display"})
+
+CONFIG_RELOADS = REGISTRY.counter("gesture_maestro_config_reloads_total", "Configuration reloads applied to the running pipeline.", {"result": "success"})
+CONFIG_RELOAD_FAILURES = REGISTRY.counter("gesture_maestro_config_reloads_total", "Configuration reloads applied to the running pipeline.", {"result": "failure"})
+CONFIG_RELOAD_DURATION = REGISTRY.histogram("gesture_maestro_config_reload_duration_seconds", "Time needed to validate and apply a configuration reload.")
+
+CUSTOM_GESTURES = REGISTRY.counter("gesture_maestro_custom_gestures_total", "Hands classified as a custom gesture.")
+CUSTOM_GESTURE_DURATION = REGISTRY.histogram("gesture_maestro_custom_gesture_classification_seconds", "Time needed to classify the hands of a result against "
+                                             "the custom gesture templates.", buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01))
+
+MOTION_GESTURES = REGISTRY.counter("gesture_maestro_motion_gestures_total", "Swipes and circles detected in the hand trajectories.")
+
+EVENTS_PUBLISHED = REGISTRY.counter("gesture_maestro_events_published_total", "Gesture and action events published to the event server.")
+EVENTS_DROPPED = REGISTRY.counter("gesture_maestro_events_dropped_total", "Events dropped from the queue of an event server client that fell behind.")
+
+RESUME_DURATION = REGISTRY.histogram("gesture_maestro_resume_duration_seconds", "Time between a resume request and the first frame read after it.")
+
+# Registers a gauge reporting the number of items currently waiting in a queue or buffer
+def register_queue(name, queue_object):
+    REGISTRY.gauge("gesture_maestro_queue_depth", "Items waiting in each queue.", {"queue": name}, queue_object.qsize)
+
+    if hasattr(queue_object, "dropped_count"):
+        REGISTRY.gauge("gesture_maestro_queue_dropped", "Items discarded by each bounded buffer.", {"queue": name}, lambda: queue_object.dropped_count)
+
+# Registers the gauges reporting the mode and effective frame rate of an inference rate controller
+def register_rate_controller(controller_owner):
+    REGISTRY.gauge("gesture_maestro_inference_idle", "Whether the inference rate controller is in the idle mode.", None,
+                   lambda: int(controller_owner.controller.mode == "idle"))
+    REGISTRY.gauge("gesture_maestro_inference_fps", "Rate at which frames are sent to the gesture recognizer.", None,
+                   lambda: round(controller_owner.controller.effective_fps(), 2))
+
+# Registers a gauge for each startup stage reached so far, reporting the time (in seconds since the application started) at which it was reached
+def register_startup_stages():
+    for stage, seconds in startup.stages.items():
+        REGISTRY.gauge("gesture_maestro_startup_stage_seconds", "Time since the application started at which each startup stage was reached.",
+                       {"stage": stage}).set(round(seconds, 3))
+
+# Returns the lines of text shown by the interface's metrics overlay, including the state of the given inference rate controller if any
+def overlay_lines(controller=None):
+    lines = [
+        f"capture {FRAMES_CAPTURED.rate():.1f} fps | results {RESULTS.rate():.1f} fps | display {FRAMES_DISPLAYED.rate():.1f} fps",
+        f"inference p50 {INFERENCE_DURATION.recent_percentile(50) * 1000:.1f} ms | callback p50 {CALLBACK_DURATION.recent_percentile(50) * 1000:.1f} ms"
+        f" | render p50 {RENDER_DURATION.recent_percentile(50) * 1000:.1f} ms",
+        f"dispatch p50 {DISPATCH_DURATION.recent_percentile(50) * 1000:.1f} ms | actions {ACTIONS_EXECUTED.value} (+{ACTIONS_SUPPRESSED.value} suppressed)"
+    ]
+
+    if controller is not None:
+        lines.append(f"inference {controller.mode} {controller.effective_fps():.1f} fps")
+
+    return lines
+
+# HTTP request handler serving the registry in the Prometheus text format
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+
+        body = REGISTRY.render().encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Unix socket clients don't have an address, and requests shouldn't be logged to the console anyway
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        return str(self.client_address)
+
+# HTTP server listening on a Unix socket instead of a TCP port
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+        super().server_bind()
+
+# Metrics server thread, listening on a local TCP port or on a Unix socket
+class MetricsServer(threading.Thread):
+    def __init__(self, port: int = None, socket_path: str = None):
+        super().__init__(daemon=True)
+
+        if socket_path:
+            self.server = UnixHTTPServer(socket_path, MetricsRequestHandler)
+        else:
+            self.server = ThreadingHTTPServer(("127.0.0.1", port), MetricsRequestHandler)
+            self.server.daemon_threads = True
+
+    def run(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,244 @@
+import math, threading, metrics
+
+# Constants
+TRACKED_LANDMARK = 9
+CAPACITY = 128
+MAX_GAP = 0.25
+MIN_STEP = 0.01
+DIRECTION_RATIO = 1.5
+DEFAULT_ASPECT_RATIO = 4 / 3
+SWIPE_DISTANCE = 0.3
+SWIPE_DURATION = 0.4
+SWIPE_STRAIGHTNESS = 0.8
+CIRCLE_TURN = 300.0
+CIRCLE_DURATION = 1.5
+CIRCLE_MIN_PATH = 0.4
+CIRCLE_CONSISTENCY = 0.5
+
+# Names of the motion gestures, as put in the gesture queue and in the Actions section of the configuration file. Directions are those seen in the preview
+# (the frames are given to the recognizer as the camera captures them, which is also what MediaPipe's handedness labels assume).
+SWIPE_LEFT = "Swipe_Left"
+SWIPE_RIGHT = "Swipe_Right"
+SWIPE_UP = "Swipe_Up"
+SWIPE_DOWN = "Swipe_Down"
+CIRCLE_CLOCKWISE = "Circle_Clockwise"
+CIRCLE_COUNTERCLOCKWISE = "Circle_Counterclockwise"
+GESTURE_NAMES = (SWIPE_LEFT, SWIPE_RIGHT, SWIPE_UP, SWIPE_DOWN, CIRCLE_CLOCKWISE, CIRCLE_COUNTERCLOCKWISE)
+
+# Trajectory of a hand: a fixed-size ring of its positions (x scaled by the frame's aspect ratio, so that both coordinates are in frame heights), the length
+# of the step that reached each position and the angle the hand turned by at it. A step is only counted once the hand has moved MIN_STEP away from the
+# position of the last counted one, so that the jitter of a still hand adds neither path nor turns. Two sliding windows, one SWIPE_DURATION and one
+# CIRCLE_DURATION seconds long, keep the running sums of those steps and angles: adding a position and evicting the ones that leave a window only add and
+# subtract their own terms, so each update costs the same however many positions are kept.
+class Trajectory:
+    def __init__(self, capacity: int = CAPACITY):
+        self.capacity = capacity
+
+        # Positions, times, step lengths and turn angles (in radians, positive when turning clockwise on screen) of the ring
+        self.xs = [0.0] * capacity
+        self.ys = [0.0] * capacity
+        self.times = [0.0] * capacity
+        self.steps = [0.0] * capacity
+        self.turns = [0.0] * capacity
+
+        self.reset()
+
+    # Forgets every position
+    def reset(self):
+        # Number of positions added since the last reset (the newest one is at (head - 1) % capacity) and first position of each window
+        self.head = 0
+        self.swipe_tail = 0
+        self.circle_tail = 0
+
+        # Path length of the swipe window, and path length, total turn and total absolute turn of the circle window
+        self.swipe_path = 0.0
+        self.circle_path = 0.0
+        self.circle_turn = 0.0
+        self.circle_abs_turn = 0.0
+
+        # Position the next step is measured from, and direction of the last counted step, which the next one's turn is measured from
+        self.anchor_x = 0.0
+        self.anchor_y = 0.0
+        self.last_dx = 0.0
+        self.last_dy = 0.0
+
+    # Forgets every position but the newest one, so that a gesture that has just been detected isn't detected again
+    def restart(self):
+        if self.head:
+            newest = (self.head - 1) % self.capacity
+            x, y, t = self.xs[newest], self.ys[newest], self.times[newest]
+
+            self.reset()
+            self.add(x, y, t)
+
+    # Adds the position of the hand at time t (in seconds). A position older than the newest one is ignored, and one that comes after a gap of more than
+    # MAX_GAP seconds (the hand was lost) starts a new trajectory.
+    def add(self, x, y, t):
+        step = turn = 0.0
+        capacity = self.capacity
+
+        if self.head:
+            newest = (self.head - 1) % capacity
+
+            if t <= self.times[newest]:
+                return
+
+            if t - self.times[newest] > MAX_GAP:
+                self.reset()
+            else:
+                dx = x - self.anchor_x
+                dy = y - self.anchor_y
+                step = math.hypot(dx, dy)
+
+                if step >= MIN_STEP:
+                    if self.last_dx or self.last_dy:
+                        turn = math.atan2(self.last_dx * dy - self.last_dy * dx, self.last_dx * dx + self.last_dy * dy)
+
+                    self.anchor_x = x
+                    self.anchor_y = y
+                    self.last_dx = dx
+                    self.last_dy = dy
+                else:
+                    step = 0.0
+
+        if not self.head:
+            self.anchor_x = x
+            self.anchor_y = y
+
+        index = self.head % capacity
+        self.xs[index] = x
+        self.ys[index] = y
+        self.times[index] = t
+        self.steps[index] = step
+        self.turns[index] = turn
+        self.head += 1
+
+        self.swipe_path += step
+        self.circle_path += step
+        self.circle_turn += turn
+        self.circle_abs_turn += abs(turn)
+
+        # Evict the positions that have left each window (or been overwritten in the ring); a window's sums cover the steps after its first position
+        while self.head - self.swipe_tail > capacity or t - self.times[self.swipe_tail % capacity] > SWIPE_DURATION:
+            self.swipe_tail += 1
+            self.swipe_path -= self.steps[self.swipe_tail % capacity]
+
+        while self.head - self.circle_tail > capacity or t - self.times[self.circle_tail % capacity] > CIRCLE_DURATION:
+            self.circle_tail += 1
+            self.circle_path -= self.steps[self.circle_tail % capacity]
+            self.circle_turn -= self.turns[self.circle_tail % capacity]
+            self.circle_abs_turn -= abs(self.turns[self.circle_tail % capacity])
+
+    # Returns the displacement (x, y) of the hand over the swipe window, its mean velocity (x, y, in frame heights per second) and the window's path length
+    def swipe_features(self):
+        if self.head - self.swipe_tail < 2:
+            return 0.0, 0.0, 0.0, 0.0, 0.0
+
+        first = self.swipe_tail % self.capacity
+        newest = (self.head - 1) % self.capacity
+
+        dx = self.xs[newest] - self.xs[first]
+        dy = self.ys[newest] - self.ys[first]
+        duration = self.times[newest] - self.times[first]
+
+        return dx, dy, dx / duration, dy / duration, self.swipe_path
+
+# Motion gesture tracker class. It follows the palm (the base of the middle finger) of each hand across results and detects swipes (a fast, straight
+# movement in one of the four directions) and circles (a movement that keeps turning the same way, by CIRCLE_TURN degrees), each of them once.
+class MotionTracker:
+    def __init__(self):
+        self.enabled = True
+        self.swipe_distance = SWIPE_DISTANCE
+        self.swipe_straightness = SWIPE_STRAIGHTNESS
+        self.circle_turn = math.radians(CIRCLE_TURN)
+        self.circle_min_path = CIRCLE_MIN_PATH
+
+        # Trajectory of each hand, indexed by handedness, and lock that serializes the updates of the result workers
+        self.trajectories = {"Left": Trajectory(), "Right": Trajectory()}
+        self.lock = threading.Lock()
+
+    # Loads the tracker's part of the application configuration from a dictionary
+    def load_config(self, config):
+        motion = config["Motion"]
+
+        self.enabled = motion["ENABLED"]
+        self.swipe_distance = motion["SWIPE_DISTANCE"]
+        self.swipe_straightness = motion["SWIPE_STRAIGHTNESS"]
+        self.circle_turn = math.radians(motion["CIRCLE_TURN"])
+        self.circle_min_path = motion["CIRCLE_MIN_PATH"]
+
+    # Adds the palm positions of the hands of a result ((hand, x, y) tuples, with MediaPipe's normalized coordinates) captured at time t, and returns the
+    # (gesture name, hand) pairs of the motions they complete. A hand missing from a few results keeps its trajectory (see MAX_GAP).
+    def update(self, hands, t, aspect_ratio=DEFAULT_ASPECT_RATIO):
+        events = []
+
+        with self.lock:
+            detected = set()
+
+            for hand, x, y in hands:
+                trajectory = self.trajectories.get(hand)
+
+                if trajectory is None or hand in detected:
+                    continue
+
+                detected.add(hand)
+                trajectory.add(x * aspect_ratio, y, t)
+
+                name = self.detect(trajectory)
+
+                if name is not None:
+                    trajectory.restart()
+                    events.append((name, hand))
+
+        if events:
+            metrics.MOTION_GESTURES.inc(len(events))
+
+        return events
+
+    # Returns the name of the motion gesture a trajectory has just completed, or None
+    def detect(self, trajectory):
+        dx, dy, _, _, path = trajectory.swipe_features()
+        distance = math.hypot(dx, dy)
+
+        if distance >= self.swipe_distance and distance >= self.swipe_straightness * path:
+            if abs(dx) >= DIRECTION_RATIO * abs(dy):
+                return SWIPE_RIGHT if dx > 0 else SWIPE_LEFT
+
+            if abs(dy) >= DIRECTION_RATIO * abs(dx):
+                return SWIPE_DOWN if dy > 0 else SWIPE_UP
+
+        # A circle turns the same way all along, unlike a jittery or shaking hand, whose turns mostly cancel each other out
+        circle_turn = abs(trajectory.circle_turn)
+
+        if circle_turn >= self.circle_turn and trajectory.circle_path >= self.circle_min_path and circle_turn >= CIRCLE_CONSISTENCY * trajectory.circle_abs_turn:
+            return CIRCLE_CLOCKWISE if trajectory.circle_turn > 0 else CIRCLE_COUNTERCLOCKWISE
+
+        return None
+
+# Returns the (hand, x, y) palm positions of the hands of a GestureRecognizerResult
+def result_hands(result):
+    return [(handedness[0].category_name, landmarks[TRACKED_LANDMARK].x, landmarks[TRACKED_LANDMARK].y)
+            for handedness, landmarks in zip(result.handedness, result.hand_landmarks)]
+
+# Runs a tracker over the records of a result log (see result_log.py) and returns the (record index, gesture name, hand) tuples of the motion gestures it
+# detects, so that the detection can be checked and tuned against recorded landmark sequences. The records' capture times are used unless other times are
+# given (such as those of result_log.replay_offsets, which are comparable across recording sessions).
+def detect_records(records, tracker=None, aspect_ratio=DEFAULT_ASPECT_RATIO, times=None):
+    # Imported here, as the result log module depends on the recognizer, which depends on this module
+    import result_log
+
+    tracker = tracker if tracker is not None else MotionTracker()
+    events = []
+
+    hand_counts = records["hand_count"].tolist()
+    captured_at = (records["captured_at"] if times is None else times).tolist()
+    handedness = records["hands"]["hand"].tolist()
+    palms = records["hands"]["landmarks"][:, :, TRACKED_LANDMARK, :2].tolist()
+
+    for i, hand_count in enumerate(hand_counts):
+        hands = [(result_log.HAND_NAMES[handedness[i][j]], palms[i][j][0], palms[i][j][1]) for j in range(hand_count)]
+
+        for name, hand in tracker.update(hands, captured_at[i], aspect_ratio):
+            events.append((i, name, hand))
+
+    return events
@@ -0,0 +1,170 @@
+import threading, queue, heapq, time, multiprocessing, frame_source, gesture_recognizer, metrics
+
+# Constants
+MODE_THREADS = "threads"
+MODE_PROCESSES = "processes"
+REORDER_WINDOW = 0.03
+DEDUP_WINDOW = 0.15
+STOP_CHECK_INTERVAL = 0.25
+
+# Metrics of the merged gesture stream
+GESTURES_DEDUPLICATED = metrics.REGISTRY.counter("gesture_maestro_gestures_deduplicated_total",
+                                                 "Gestures discarded because another source saw the same one within the deduplication window.")
+
+# Gesture queue adapter given to the recognizer of each source: it tags every gesture with the index of its source before putting it into the shared queue,
+# and ignores the None sentinel put by the recognizer when it stops (the worker reports the end of the source itself)
+class SourceQueue:
+    def __init__(self, index, output_queue):
+        self.index = index
+        self.output_queue = output_queue
+
+    def put(self, item, block=True, timeout=None):
+        if item is not None:
+            self.output_queue.put((self.index, "gesture", item))
+
+# Runs the recognizer of one frame source until it ends or the stop Event is set, then reports the end of the source to the output queue, along with the
+# recognizer's error (if any) and the number of frames read and submitted for inference. It runs in a thread or in a child process; in the latter case, the
+# gestures' capture times (time.perf_counter values) can be compared with the parent's, as the clock is system-wide on the supported platforms.
+def run_source_worker(index, source_spec, config, output_queue, stop_event, realtime=True):
+    source = frame_source.from_spec(source_spec, realtime)
+    recognizer = gesture_recognizer.LiveRecognizer(stop_event, None, SourceQueue(index, output_queue), source)
+
+    if config is not None:
+        recognizer.load_config(config)
+
+    try:
+        recognizer.run()
+    finally:
+        stats = {"frames_read": getattr(source, "frame_index", 0), "inference_frames_submitted": recognizer.controller.submitted_count}
+        output_queue.put((index, "end", (recognizer.error, stats)))
+
+# Multi-source recognizer class. Each frame source gets its own recognizer (and MediaPipe instance), running in a thread or, so that throughput scales with
+# the number of cores instead of sharing the GIL, in a child process (spawned, as the parent's threads may hold locks when it is started; the metrics recorded
+# by the children aren't reported by the parent). Their gestures are merged into a single stream put into the gesture queue: each gesture is held for
+# reorder_window seconds after it arrives, so that a gesture captured earlier by a slower source can still overtake it, and leaves in capture time order; a
+# gesture seen by another source (same hand and name) less than dedup_window seconds before is discarded. The stream ends (with a None sentinel) once every
+# source has ended or the stop Event is set.
+class MultiSourceRecognizer(threading.Thread):
+    def __init__(self, stop_recognizer: threading.Event, gesture_queue: queue.Queue, source_specs: list, mode: str = MODE_THREADS,
+                 dedup_window: float = DEDUP_WINDOW, reorder_window: float = REORDER_WINDOW, realtime: bool = True, source_worker=run_source_worker):
+        super().__init__()
+
+        # Event that, when set, will be used to stop every source
+        self.stop_recognizer = stop_recognizer
+
+        # Queue where the merged gestures are put
+        self.gesture_queue = gesture_queue
+
+        self.source_specs = list(source_specs)
+        self.mode = mode
+        self.dedup_window = dedup_window
+        self.reorder_window = reorder_window
+        self.realtime = realtime
+
+        # Function run by the worker of each source, with the same arguments as run_source_worker (replaceable, e.g. to simulate sources)
+        self.source_worker = source_worker
+
+        # Configuration given to the recognizer of each source, set by load_config before the thread is started
+        self.config = None
+
+        # Errors reported by the sources, indexed by source, and description of all of them
+        self.source_errors = {}
+        self.error = None
+
+        # Statistics reported by each source when it ends, number of gestures received from each source and number of gestures forwarded and discarded
+        self.source_stats = [None] * len(self.source_specs)
+        self.received_counts = [0] * len(self.source_specs)
+        self.forwarded_count = 0
+        self.deduplicated_count = 0
+
+        # Capture time and source of the last gesture forwarded for each hand and gesture name
+        self.last_forwarded = {}
+
+    # Stores the configuration the recognizer of each source will be created with. The sources' recognizers are created when the thread starts, so
+    # configuration changes are only applied to a running multi-source recognizer by restarting it.
+    def load_config(self, config):
+        self.config = config
+
+    def run(self):
+        if self.mode == MODE_PROCESSES:
+            context = multiprocessing.get_context("spawn")
+            output_queue = context.Queue()
+            stop_events = [context.Event() for _ in self.source_specs]
+            workers = [context.Process(target=self.source_worker, args=(i, spec, self.config, output_queue, stop_events[i], self.realtime), daemon=True)
+                       for i, spec in enumerate(self.source_specs)]
+        else:
+            output_queue = queue.Queue()
+            stop_events = [threading.Event() for _ in self.source_specs]
+            workers = [threading.Thread(target=self.source_worker, args=(i, spec, self.config, output_queue, stop_events[i], self.realtime), daemon=True)
+                       for i, spec in enumerate(self.source_specs)]
+
+        for worker in workers:
+            worker.start()
+
+        # Gestures waiting for their reorder window to pass, as (capture time, arrival order, release time, source, gesture) tuples; the oldest capture is
+        # released first, once its own window has passed (later captures can't leave before it)
+        pending = []
+        arrival_count = 0
+        ended_count = 0
+
+        while ended_count < len(workers):
+            if self.stop_recognizer.is_set():
+                for stop_event in stop_events:
+                    stop_event.set()
+
+            # Wait for the next message until the oldest pending gesture must be released
+            timeout = STOP_CHECK_INTERVAL
+
+            if pending:
+                timeout = min(max(pending[0][2] - time.perf_counter(), 0), timeout)
+
+            try:
+                index, kind, payload = output_queue.get(timeout=timeout)
+
+                if kind == "gesture":
+                    self.received_counts[index] += 1
+                    heapq.heappush(pending, (payload["captured_at"], arrival_count, time.perf_counter() + self.reorder_window, index, payload))
+                    arrival_count += 1
+                else:
+                    ended_count += 1
+                    error, self.source_stats[index] = payload
+
+                    if error is not None:
+                        self.source_errors[index] = error
+            except queue.Empty:
+                pass
+
+            now = time.perf_counter()
+
+            while pending and pending[0][2] <= now:
+                self.forward(*heapq.heappop(pending)[3:])
+
+        while pending:
+            self.forward(*heapq.heappop(pending)[3:])
+
+        for worker in workers:
+            worker.join()
+
+        if self.source_errors:
+            self.error = "; ".join(f"source {self.source_specs[index]}: {error}" for index, error in sorted(self.source_errors.items()))
+
+        # Stop the other threads once every source has ended, and wake up the consumers of the gesture queue, so that they notice that the recognizer has
+        # stopped
+        self.stop_recognizer.set()
+        self.gesture_queue.put(None)
+
+    # Puts a gesture into the gesture queue, unless another source has seen the same one within the deduplication window
+    def forward(self, index, gesture):
+        key = (gesture["hand"], gesture["name"])
+        last = self.last_forwarded.get(key)
+
+        if last is not None and last[1] != index and gesture["captured_at"] - last[0] < self.dedup_window:
+            self.deduplicated_count += 1
+            GESTURES_DEDUPLICATED.inc()
+            return
+
+        self.last_forwarded[key] = (gesture["captured_at"], index)
+        self.forwarded_count += 1
+
+        gesture["source"] = index
+        self.gesture_queue.put(gesture)
@@ -0,0 +1,88 @@
+import cv2
+import numpy as np
+
+# Hand landmark overlay renderer. It draws the same hand skeleton as MediaPipe's drawing_utils.draw_landmarks with the default hand styles, but converts the
+# landmarks to a NumPy array once, scales them to pixel coordinates in a single vectorized operation and draws the connections with one cv2.polylines call
+# per color, using connection index arrays and styles that are computed only once.
+
+# Constants (colors are the ones used by MediaPipe's default hand styles)
+WHITE = (224, 224, 224)
+GRAY = (128, 128, 128)
+RED = (48, 48, 255)
+PEACH = (180, 229, 255)
+PURPLE = (128, 64, 128)
+YELLOW = (0, 204, 255)
+GREEN = (48, 255, 48)
+BLUE = (192, 101, 21)
+
+LANDMARK_RADIUS = 5
+LANDMARK_BORDER_RADIUS = max(LANDMARK_RADIUS + 1, int(LANDMARK_RADIUS * 1.2))
+PALM_THICKNESS = 3
+FINGER_THICKNESS = 2
+NUM_LANDMARKS = 21
+
+# Groups of connections between hand landmarks (the same ones as mp.solutions.hands.HAND_CONNECTIONS) along with their color and thickness
+CONNECTION_GROUPS = (
+    (GRAY, PALM_THICKNESS, ((0, 1), (0, 5), (9, 13), (13, 17), (5, 9), (0, 17))),
+    (PEACH, FINGER_THICKNESS, ((1, 2), (2, 3), (3, 4))),
+    (PURPLE, FINGER_THICKNESS, ((5, 6), (6, 7), (7, 8))),
+    (YELLOW, FINGER_THICKNESS, ((9, 10), (10, 11), (11, 12))),
+    (GREEN, FINGER_THICKNESS, ((13, 14), (14, 15), (15, 16))),
+    (BLUE, FINGER_THICKNESS, ((17, 18), (18, 19), (19, 20)))
+)
+
+# Groups of hand landmarks along with their color
+LANDMARK_GROUPS = (
+    (RED, (0, 1, 5, 9, 13, 17)),
+    (PEACH, (2, 3, 4)),
+    (PURPLE, (6, 7, 8)),
+    (YELLOW, (10, 11, 12)),
+    (GREEN, (14, 15, 16)),
+    (BLUE, (18, 19, 20))
+)
+
+class LandmarkRenderer:
+    def __init__(self):
+        # Index arrays of the start and end landmarks of every connection, one pair per style
+        self.connections = [(color, thickness, np.array([start for start, _ in pairs]), np.array([end for _, end in pairs]))
+                            for color, thickness, pairs in CONNECTION_GROUPS]
+
+        # Color of every landmark, indexed by landmark
+        self.landmark_colors = [None] * NUM_LANDMARKS
+
+        for color, indices in LANDMARK_GROUPS:
+            for index in indices:
+                self.landmark_colors[index] = color
+
+    # Returns an (N, 2) float32 array with the normalized x and y coordinates of the given landmarks
+    @staticmethod
+    def to_array(hand_landmarks):
+        return np.array([(landmark.x, landmark.y) for landmark in hand_landmarks], dtype=np.float32)
+
+    # Returns the pixel coordinates of an array of normalized coordinates in an image of the given size, along with a mask of the landmarks inside the image
+    @staticmethod
+    def to_pixels(points, width, height):
+        visible = ((points >= 0) & (points <= 1)).all(axis=1)
+        pixels = np.minimum(np.floor(points * (width, height)), (width - 1, height - 1)).astype(np.int32)
+
+        return pixels, visible
+
+    # Draws the landmarks (an iterable of objects with x and y attributes, or an (N, 2) array of normalized coordinates) of one hand on an image in place
+    def draw(self, image, hand_landmarks):
+        points = hand_landmarks if isinstance(hand_landmarks, np.ndarray) else self.to_array(hand_landmarks)
+        height, width = image.shape[:2]
+        pixels, visible = self.to_pixels(points[:, :2], width, height)
+
+        # Draw the connections, one polylines call per style
+        for color, thickness, starts, ends in self.connections:
+            mask = visible[starts] & visible[ends]
+
+            if mask.any():
+                segments = np.stack((pixels[starts[mask]], pixels[ends[mask]]), axis=1)
+                cv2.polylines(image, segments, False, color, thickness)
+
+        # Draw the landmarks, each one as a filled white circle under a smaller filled circle of the landmark's color
+        for index, (x, y) in enumerate(pixels.tolist()):
+            if visible[index]:
+                cv2.circle(image, (x, y), LANDMARK_BORDER_RADIUS, WHITE, -1)
+                cv2.circle(image, (x, y), LANDMARK_RADIUS, self.landmark_colors[index], -1)
@@ -0,0 +1,102 @@
+import cv2, time
+from PIL import Image, ImageDraw, ImageFont, ImageTk
+
+# Constants
+DISPLAY_FPS = 30.0
+SCALE = 1.0
+ACTION_FONT_SIZE = 18
+METRICS_FONT_SIZE = 12
+ACTION_COLOR = (255, 0, 0)
+METRICS_COLOR = (255, 255, 0)
+ACTION_POSITION = (20, 20)
+METRICS_POSITION = (20, 50)
+
+# Preview renderer class. It turns the frames taken from the frame queue into the image shown by the interface while doing as little work as possible in the
+# Tkinter thread: the fonts are loaded once, each text is rasterized into a small transparent patch only when it changes (the patch is then pasted on every
+# frame), and a single PhotoImage is reused, its content replaced with paste(), instead of creating a new one per frame. Frames are displayed at most
+# display_fps times per second (0 means every frame), independently of the inference rate, and can be downscaled by the given scale factor.
+class PreviewRenderer:
+    def __init__(self, font_path: str, display_fps: float = DISPLAY_FPS, scale: float = SCALE):
+        self.display_fps = display_fps
+        self.scale = scale
+
+        self.action_font = ImageFont.truetype(font_path, ACTION_FONT_SIZE)
+        self.metrics_font = ImageFont.truetype(font_path, METRICS_FONT_SIZE)
+
+        # Rasterized text patches, indexed by position, along with the text each one contains
+        self.text_patches = {}
+
+        # PhotoImage shown by the interface, buffer the frames are downscaled into, and time at which the last frame was rendered
+        self.photo = None
+        self.scaled_buffer = None
+        self.last_render_time = 0
+
+    # Loads the preview settings of the application configuration (the "Preview" section)
+    def load_config(self, config):
+        preview = config["Preview"]
+
+        self.display_fps = preview["DISPLAY_FPS"]
+        self.scale = preview["SCALE"]
+
+    # Returns True if a new frame should be displayed at the given time (time.perf_counter value) according to the display frame rate; otherwise, returns False
+    def is_due(self, now):
+        return not self.display_fps or now - self.last_render_time >= 1 / self.display_fps
+
+    # Returns the time (in seconds) until the next frame is due
+    def time_until_due(self, now):
+        if not self.display_fps:
+            return 0
+
+        return max(self.last_render_time + 1 / self.display_fps - now, 0)
+
+    # Renders an RGB frame along with the last executed action and the metrics text (if any) into the PhotoImage, and returns True if a new PhotoImage has been
+    # created (the first time, or when the frame size changes), which means that it must be set on the Label displaying it again
+    def render(self, image_array, action_text, metrics_text=None):
+        self.last_render_time = time.perf_counter()
+
+        image_array = self.downscale(image_array)
+
+        # Convert the NumPy array to a Pillow image, which copies it
+        image_pil = Image.fromarray(image_array)
+
+        # Paste the text patches over the frame
+        self.paste_text(image_pil, ACTION_POSITION, action_text, self.action_font, ACTION_COLOR)
+
+        if metrics_text is not None:
+            self.paste_text(image_pil, METRICS_POSITION, metrics_text, self.metrics_font, METRICS_COLOR)
+
+        if self.photo is not None and (self.photo.width(), self.photo.height()) == image_pil.size:
+            self.photo.paste(image_pil)
+            return False
+
+        self.photo = ImageTk.PhotoImage(image_pil)
+        return True
+
+    # Returns the frame resized by the scale factor (into a buffer reused across frames), or the frame itself if the scale factor is 1
+    def downscale(self, image_array):
+        if self.scale == 1 or self.scale <= 0:
+            return image_array
+
+        height, width = image_array.shape[:2]
+        size = (max(round(width * self.scale), 1), max(round(height * self.scale), 1))
+
+        buffer = self.scaled_buffer if self.scaled_buffer is not None and self.scaled_buffer.shape[:2] == (size[1], size[0]) else None
+        self.scaled_buffer = cv2.resize(image_array, size, dst=buffer, interpolation=cv2.INTER_AREA if self.scale < 1 else cv2.INTER_LINEAR)
+
+        return self.scaled_buffer
+
+    # Pastes the patch containing a text on an image at the given position, rasterizing the text again only if it has changed
+    def paste_text(self, image_pil, position, text, font, color):
+        if not text:
+            return
+
+        patch_text, patch = self.text_patches.get(position, (None, None))
+
+        if patch_text != text:
+            left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).multiline_textbbox((0, 0), text, font=font)
+            patch = Image.new("RGBA", (max(right, 1), max(bottom, 1)), color + (0,))
+            ImageDraw.Draw(patch).multiline_text((0, 0), text, font=font, fill=color + (255,))
+
+            self.text_patches[position] = (text, patch)
+
+        image_pil.paste(patch, position, patch)
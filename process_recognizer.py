@@ -0,0 +1,260 @@
+import threading, queue, multiprocessing, numpy as np
+import gesture_recognizer, frame_source, buffer_pool, metrics, shm_transport, result_log, custom_gestures
+
+# Constants
+STOP_CHECK_INTERVAL = 0.25
+STATUS_INTERVAL = 0.5
+PROCESS_JOIN_TIMEOUT = 5.0
+
+# Multiprocessing context used to create the recognizer process and its synchronization primitives. Processes are spawned rather than forked, as the interface
+# process already runs Tkinter and several threads when the recognizer is started.
+CONTEXT = multiprocessing.get_context("spawn")
+
+# Gesture queue used by the recognizer process, which sends every gesture to the interface process as a compact record instead (the recognizer's None
+# sentinel is replaced by the "end" record)
+class GestureRecordQueue:
+    def __init__(self, sender):
+        self.sender = sender
+
+    def put(self, item, block=True, timeout=None):
+        if item is not None:
+            self.sender.send(("gesture", item["name"], item["hand"], item["timestamp"], item["captured_at"]))
+
+# Live gesture recognizer running in the recognizer process. Along with the gestures, it sends the landmarks of every result (a float32 array with the x, y
+# and z coordinates of the 21 landmarks of each detected hand), their handedness and the frame's aspect ratio.
+class IsolatedRecognizer(gesture_recognizer.LiveRecognizer):
+    def __init__(self, sender, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.sender = sender
+
+    def emit_gestures(self, result, timestamp_ms, captured_at):
+        super().emit_gestures(result, timestamp_ms, captured_at)
+
+        self.sender.send(("landmarks", timestamp_ms, captured_at, custom_gestures.landmark_array(result.hand_landmarks), self.last_handedness,
+                          self.frame_aspect_ratio))
+
+# Returns the status record of the recognizer process: the inference rate controller's state, the totals of its pipeline counters (which the interface
+# process adds to its own metrics) and the last resume duration
+def status_record(recognizer):
+    return ("status", recognizer.controller.mode, recognizer.controller.effective_fps(), metrics.FRAMES_CAPTURED.value, metrics.RESULTS.value,
+            metrics.GESTURES.value, recognizer.last_resume_duration)
+
+# Applies the commands received from the interface process to the recognizer, and sends its status periodically
+def follow_commands(connection, sender, recognizer, start_event):
+    while not recognizer.stop_recognizer.is_set():
+        try:
+            if connection.poll(STATUS_INTERVAL):
+                command, *args = connection.recv()
+
+                if command == "config":
+                    recognizer.load_config(*args)
+                elif command == "start":
+                    start_event.set()
+                elif command == "pause":
+                    recognizer.pause(*args)
+                elif command == "resume":
+                    recognizer.last_resume_duration = None
+                    recognizer.resume()
+                elif command == "restart":
+                    recognizer.restart()
+        except (EOFError, OSError):
+            # The interface process has gone away
+            recognizer.stop_recognizer.set()
+            break
+
+        sender.send(status_record(recognizer))
+
+# Entry point of the recognizer process: loads the model right away, waits for the "start" command and runs the live gesture recognizer until it stops, then
+# removes the shared frame ring and sends the "end" record with the recognizer's error, if any
+def run_recognizer_process(connection, stop_event, lock, source_spec, realtime, loop, slots, result_log_path=None):
+    sender = shm_transport.RecordSender(connection)
+    frame_pool = buffer_pool.BufferPool()
+    frame_writer = shm_transport.FrameRingWriter(sender, lock, frame_pool, slots)
+
+    source = frame_source.from_spec(source_spec, realtime)
+
+    if loop and hasattr(source, "loop"):
+        source.loop = True
+
+    recognizer = IsolatedRecognizer(sender, stop_event, frame_writer, GestureRecordQueue(sender), source, frame_pool=frame_pool)
+    recognizer.preload()
+
+    if result_log_path is not None:
+        recognizer.result_log = result_log.ResultLogWriter(result_log_path)
+
+    start_event = threading.Event()
+    threading.Thread(target=follow_commands, args=(connection, sender, recognizer, start_event), daemon=True).start()
+
+    while not start_event.wait(STOP_CHECK_INTERVAL) and not stop_event.is_set():
+        pass
+
+    try:
+        if not stop_event.is_set():
+            recognizer.run()
+    finally:
+        frame_writer.close()
+
+        if recognizer.result_log is not None:
+            recognizer.result_log.close()
+
+        sender.send(status_record(recognizer))
+        sender.send(("end", recognizer.error))
+
+# State of the recognizer process' inference rate controller, as reported by its last status record
+class RemoteControllerState:
+    def __init__(self):
+        self.mode = "active"
+        self.fps = 0.0
+
+    def effective_fps(self):
+        return self.fps
+
+# Process-isolated gesture recognizer class. The live gesture recognizer runs in a separate process, so that capture, inference and drawing don't share the
+# interface's GIL: frames are written into a shared memory ring that the interface reads without copying (see shm_transport.py), and gestures, landmarks and
+# status are sent back as compact records over a pipe. This thread receives those records, putting the gestures into the gesture queue; it offers the same
+# interface as LiveRecognizer to the interface and the recognizer service (preload, load_config, pause, resume, restart, error...), forwarding the commands
+# to the recognizer process.
+class ProcessRecognizer(threading.Thread):
+    def __init__(self, stop_recognizer: threading.Event, gesture_queue: queue.Queue, source_spec: str = "0", realtime: bool = True, loop: bool = False,
+                 slots: int = shm_transport.DEFAULT_SLOTS, result_log_path: str = None):
+        super().__init__()
+
+        # Event that, when set, will be used to stop this thread and the recognizer process
+        self.stop_recognizer = stop_recognizer
+
+        # Queue where the received gestures are put
+        self.gesture_queue = gesture_queue
+
+        # Arguments of the recognizer process
+        self.source_spec = source_spec
+        self.realtime = realtime
+        self.loop = loop
+        self.slots = slots
+        self.result_log_path = result_log_path
+
+        # Lock shared with the recognizer process to guard the shared frame ring, and frame queue the interface reads the frames from. The interface gives
+        # every frame back to the pool once displayed, which ignores them, as they aren't pooled buffers.
+        self.lock = CONTEXT.Lock()
+        self.frame_queue = shm_transport.FrameRingReader(self.lock)
+        self.frame_pool = buffer_pool.BufferPool()
+
+        # Recognizer process, Event used to stop it, and this process' end of the pipe (records are received by this thread; commands can be sent from any)
+        self.process = None
+        self.process_stop = CONTEXT.Event()
+        self.connection = None
+        self.sender = None
+
+        # State reported by the recognizer process
+        self.controller = RemoteControllerState()
+        self.error = None
+        self.last_resume_duration = None
+        self.last_hand_landmarks = np.empty((0, custom_gestures.LANDMARK_COUNT, 3), np.float32)
+        self.last_handedness = []
+        self.frame_aspect_ratio = 1.0
+        self.counter_totals = (0, 0, 0)
+
+        # Event cleared while recognition is paused
+        self.active = threading.Event()
+        self.active.set()
+
+    # Starts the recognizer process, which loads the model right away, so that it is ready by the time the thread is started
+    def preload(self):
+        if self.process is None:
+            self.connection, child_connection = CONTEXT.Pipe()
+            self.sender = shm_transport.RecordSender(self.connection)
+
+            self.process = CONTEXT.Process(target=run_recognizer_process, daemon=True,
+                                           args=(child_connection, self.process_stop, self.lock, self.source_spec, self.realtime, self.loop, self.slots,
+                                                 self.result_log_path))
+            self.process.start()
+            child_connection.close()
+
+    # Sends the application configuration to the recognizer process
+    def load_config(self, config):
+        self.preload()
+        self.sender.send(("config", config))
+
+    def pause(self, release_source=None):
+        self.active.clear()
+        self.sender.send(("pause", release_source))
+
+    def resume(self):
+        if self.active.is_set():
+            return
+
+        self.last_resume_duration = None
+        self.active.set()
+        self.sender.send(("resume",))
+
+    def restart(self):
+        self.sender.send(("restart",))
+
+    def is_paused(self):
+        return not self.active.is_set()
+
+    # When the thread is started, the recognizer process is started (unless it has been preloaded) and told to start recognizing; its records are then
+    # received until it ends
+    def run(self):
+        self.preload()
+        self.sender.send(("start",))
+
+        while True:
+            if self.stop_recognizer.is_set():
+                self.process_stop.set()
+
+            try:
+                if not self.connection.poll(STOP_CHECK_INTERVAL):
+                    if not self.process.is_alive():
+                        self.error = self.error or f"The recognizer process has exited unexpectedly (exit code {self.process.exitcode})"
+                        break
+
+                    continue
+
+                record = self.connection.recv()
+            except (EOFError, OSError):
+                if self.error is None and not self.stop_recognizer.is_set():
+                    self.error = "The recognizer process has exited unexpectedly"
+
+                break
+
+            if record[0] == "end":
+                self.error = record[1]
+                break
+
+            self.handle_record(record)
+
+        self.process_stop.set()
+        self.process.join(PROCESS_JOIN_TIMEOUT)
+        self.connection.close()
+
+        # Stop the other threads, as the recognizer does when it stops, and wake up the consumers of the gesture queue
+        self.stop_recognizer.set()
+        self.gesture_queue.put(None)
+
+    # Handles a record received from the recognizer process
+    def handle_record(self, record):
+        kind = record[0]
+
+        if kind == "frame":
+            self.frame_queue.notify()
+        elif kind == "gesture":
+            _, name, hand, timestamp_ms, captured_at = record
+            self.gesture_queue.put({"name": name, "hand": hand, "timestamp": timestamp_ms, "captured_at": captured_at})
+        elif kind == "landmarks":
+            _, _, _, self.last_hand_landmarks, self.last_handedness, self.frame_aspect_ratio = record
+        elif kind == "ring":
+            self.frame_queue.attach(*record[1:])
+        elif kind == "status":
+            _, self.controller.mode, self.controller.fps, captured, results, gestures, last_resume_duration = record
+
+            if self.active.is_set() and last_resume_duration is not None:
+                self.last_resume_duration = last_resume_duration
+
+            # Add the recognizer process' counts since the last status to this process' metrics
+            for counter, total, previous in zip((metrics.FRAMES_CAPTURED, metrics.RESULTS, metrics.GESTURES), (captured, results, gestures),
+                                                self.counter_totals):
+                if total > previous:
+                    counter.inc(total - previous)
+
+            self.counter_totals = (captured, results, gestures)
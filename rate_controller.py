@@ -0,0 +1,101 @@
+import threading, time, collections
+
+# Constants
+MODE_ACTIVE = "active"
+MODE_IDLE = "idle"
+IDLE_FPS = 2.0
+MAX_FPS = 0.0
+MAX_IN_FLIGHT = 1
+IDLE_AFTER = 1.0
+IN_FLIGHT_TIMEOUT = 0.5
+FPS_WINDOW = 30
+
+# Inference rate controller class. It decides which frames are sent to the gesture recognizer: while no hand has been detected for IDLE_AFTER seconds, frames
+# are only sent at a low idle rate; as soon as a result contains a hand, every frame is sent again, up to an optional maximum rate. In both modes, no frame is
+# sent while the number of frames waiting for a result has reached the in-flight limit, instead of letting MediaPipe drop them silently. Frames whose result
+# never arrives (because MediaPipe dropped them anyway) stop counting as in flight after IN_FLIGHT_TIMEOUT seconds.
+class InferenceRateController:
+    def __init__(self, idle_fps: float = IDLE_FPS, max_fps: float = MAX_FPS, max_in_flight: int = MAX_IN_FLIGHT, idle_after: float = IDLE_AFTER):
+        # Frame rates (0 means unlimited) and in-flight limit
+        self.idle_fps = idle_fps
+        self.max_fps = max_fps
+        self.max_in_flight = max(max_in_flight, 1)
+
+        # Time (in seconds) without hands after which the controller switches to the idle mode
+        self.idle_after = idle_after
+
+        # Current mode, and time at which a hand was last detected (the first result counts as one, so the controller starts in the active mode)
+        self.mode = MODE_ACTIVE
+        self.last_hand_time = None
+        self.last_submit_time = 0
+
+        # Time at which each frame waiting for a result was sent, indexed by the frame's timestamp
+        self.in_flight = collections.OrderedDict()
+
+        # Times at which the last frames were sent, used to compute the effective frame rate
+        self.submit_times = collections.deque(maxlen=FPS_WINDOW)
+
+        # Number of frames sent and skipped
+        self.submitted_count = 0
+        self.skipped_count = 0
+
+        self.lock = threading.Lock()
+
+    # Changes the frame rates and in-flight limit, keeping the current mode and the frames waiting for a result (so it can be called while frames are being
+    # sent and their results received)
+    def configure(self, idle_fps, max_fps, max_in_flight):
+        with self.lock:
+            self.idle_fps = idle_fps
+            self.max_fps = max_fps
+            self.max_in_flight = max(max_in_flight, 1)
+
+    # Returns True if the frame read at the given time should be sent to the gesture recognizer; otherwise, returns False and counts the frame as skipped
+    def should_submit(self, now):
+        with self.lock:
+            # Forget the frames whose result is not going to arrive
+            while self.in_flight and now - next(iter(self.in_flight.values())) > IN_FLIGHT_TIMEOUT:
+                self.in_flight.popitem(last=False)
+
+            fps = self.idle_fps if self.mode == MODE_IDLE else self.max_fps
+
+            if len(self.in_flight) >= self.max_in_flight or (fps > 0 and now - self.last_submit_time < 1 / fps):
+                self.skipped_count += 1
+                return False
+
+            return True
+
+    # Registers that the frame with the given timestamp has been sent to the gesture recognizer at the given time
+    def submitted(self, timestamp_ms, now):
+        with self.lock:
+            self.in_flight[timestamp_ms] = now
+            self.last_submit_time = now
+            self.submit_times.append(now)
+            self.submitted_count += 1
+
+    # Registers the result of the frame with the given timestamp, switching modes depending on whether it contains any hand
+    def completed(self, timestamp_ms, hands_detected, now):
+        with self.lock:
+            # Results arrive in order, so the frames sent before this one won't get theirs
+            while self.in_flight and next(iter(self.in_flight)) <= timestamp_ms:
+                self.in_flight.popitem(last=False)
+
+            if hands_detected or self.last_hand_time is None:
+                self.last_hand_time = now
+                self.mode = MODE_ACTIVE
+            elif now - self.last_hand_time > self.idle_after:
+                self.mode = MODE_IDLE
+
+    # Goes back to the active mode and forgets the frames waiting for a result, e.g. when recognition resumes after a pause
+    def reset(self):
+        with self.lock:
+            self.mode = MODE_ACTIVE
+            self.last_hand_time = None
+            self.in_flight.clear()
+
+    # Returns the rate at which frames have been sent to the gesture recognizer recently (over the last FPS_WINDOW frames, up to now)
+    def effective_fps(self):
+        with self.lock:
+            if not self.submit_times:
+                return 0.0
+
+            return len(self.submit_times) / max(time.perf_counter() - self.submit_times[0], 1e-6)
@@ -0,0 +1,55 @@
+import threading, gesture_recognizer, gesture_handler
+
+# Recognizer service class. It owns the gesture recognizer and handler threads for the whole life of the application and gives them pause, resume and restart
+# semantics: pausing stops reading frames while the MediaPipe gesture recognizer stays loaded (and the capture device stays open and warm, unless it is
+# released while paused), so resuming only takes the time needed to read the next frame; restarting reopens the frame source, e.g. to apply new capture
+# settings, without reloading the model. Stopping ends both threads for good.
+class RecognizerService:
+    def __init__(self, recognizer: gesture_recognizer.LiveRecognizer, handler: gesture_handler.GestureHandler):
+        self.recognizer = recognizer
+        self.handler = handler
+
+        self.started = False
+        self.lock = threading.Lock()
+
+    # Starts the gesture recognizer and handler threads, unless they have already been started
+    def start(self):
+        with self.lock:
+            if not self.started:
+                self.recognizer.start()
+                self.handler.start()
+                self.started = True
+
+    # Pauses recognition, releasing the frame source while paused if requested (by default, as set in the configuration)
+    def pause(self, release_source=None):
+        self.recognizer.pause(release_source)
+
+    # Resumes recognition after a pause
+    def resume(self):
+        self.recognizer.resume()
+
+    # Pauses recognition if it is running, or resumes it if it is paused, and returns True if it is now paused; otherwise, returns False
+    def toggle(self, release_source=None):
+        if self.recognizer.is_paused():
+            self.resume()
+            return False
+
+        self.pause(release_source)
+        return True
+
+    # Reopens the frame source, keeping the model loaded
+    def restart(self):
+        self.recognizer.restart()
+
+    # Returns True if recognition is paused; otherwise, returns False
+    def is_paused(self):
+        return self.recognizer.is_paused()
+
+    # Returns the time (in seconds) between the last resume request and the first frame read after it, or None if recognition has never been resumed
+    def last_resume_duration(self):
+        return self.recognizer.last_resume_duration
+
+    # Stops both threads for good, waking them up if they are waiting (the recognizer checks the stop Event while paused)
+    def stop(self):
+        self.handler.stop()
+        self.recognizer.active.set()
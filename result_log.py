@@ -0,0 +1,262 @@
+import os, time, struct, threading, queue, numpy as np, gesture_recognizer, custom_gestures, motion_gestures
+
+# Constants
+MAGIC = b"GMRL"
+VERSION = 1
+HEADER_SIZE = 64
+MAX_HANDS = 2
+LANDMARK_COUNT = 21
+FLUSH_INTERVAL = 1.0
+STOP_CHECK_INTERVAL = 0.25
+CLASSIFY_BATCH_SIZE = 4096
+SESSION_MARKER = -1
+
+# Gesture and handedness names stored in the log as indices (unknown names are stored as 0)
+GESTURE_NAMES = ("None", "Closed_Fist", "Open_Palm", "Pointing_Up", "Thumb_Down", "Thumb_Up", "Victory", "ILoveYou")
+HAND_NAMES = ("", "Left", "Right")
+
+# Layout of each hand of a record: handedness index and score, top gesture index and score, and the x, y and z coordinates of the 21 landmarks
+HAND_DTYPE = np.dtype([("hand", np.uint8), ("hand_score", np.float32), ("gesture", np.uint8), ("gesture_score", np.float32),
+                       ("landmarks", np.float32, (LANDMARK_COUNT, 3))], align=True)
+
+# Layout of each record of the log, one per recognition result: the frame's timestamp (as sent to the recognizer) and capture time (time.perf_counter value),
+# the number of detected hands and the hands themselves (those beyond hand_count are zeroed). A record without hands whose timestamp is SESSION_MARKER starts
+# a new recording session, whose capture times can't be compared with those of the previous one (time.perf_counter restarts with the system).
+RECORD_DTYPE = np.dtype([("timestamp_ms", np.int64), ("captured_at", np.float64), ("hand_count", np.uint8), ("hands", HAND_DTYPE, (MAX_HANDS,))], align=True)
+
+# Custom exception class for handling files that are not result logs or were written with another record layout
+class ResultLogError(Exception):
+    pass
+
+# Returns the header of a result log: magic bytes, format version and record size, padded to HEADER_SIZE bytes
+def build_header():
+    return struct.pack("<4sII", MAGIC, VERSION, RECORD_DTYPE.itemsize).ljust(HEADER_SIZE, b"\0")
+
+# Fills a record (a single-element array of RECORD_DTYPE) with a GestureRecognizerResult
+def encode(record, result, timestamp_ms, captured_at):
+    # Clearing the raw bytes is much faster than clearing the structured array field by field
+    record.view(np.uint8).fill(0)
+    record["timestamp_ms"] = timestamp_ms
+    record["captured_at"] = captured_at
+
+    hand_count = min(len(result.handedness), MAX_HANDS)
+    record["hand_count"] = hand_count
+
+    # Fields are assigned through column views of the hands, which is much faster than going through each hand's scalar
+    hands = record["hands"][0]
+
+    for i in range(hand_count):
+        handedness = result.handedness[i][0]
+
+        hands["hand"][i] = HAND_NAMES.index(handedness.category_name) if handedness.category_name in HAND_NAMES else 0
+        hands["hand_score"][i] = handedness.score
+
+        if i < len(result.gestures) and result.gestures[i]:
+            gesture = result.gestures[i][0]
+            hands["gesture"][i] = GESTURE_NAMES.index(gesture.category_name) if gesture.category_name in GESTURE_NAMES else 0
+            hands["gesture_score"][i] = gesture.score
+
+        if i < len(result.hand_landmarks):
+            hands["landmarks"][i] = [(landmark.x, landmark.y, landmark.z) for landmark in result.hand_landmarks[i][:LANDMARK_COUNT]]
+
+# Append-only writer of a result log. Records are encoded into a preallocated array and appended to the file as raw bytes; the file is flushed at most every
+# FLUSH_INTERVAL seconds and when it is closed, so a crash loses at most the last second of results (and a partially written record, which readers ignore).
+# A new file gets a header; an existing one is appended to if its header matches the current record layout, after a session marker record (and once a
+# partially written last record has been cut off, so that the new records stay aligned).
+class ResultLogWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.record = np.zeros(1, RECORD_DTYPE)
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            check_header(path)
+            self.file = open(path, "r+b")
+            self.file.truncate(HEADER_SIZE + (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize)
+            self.file.seek(0, os.SEEK_END)
+
+            self.record["timestamp_ms"] = SESSION_MARKER
+            self.record["captured_at"] = time.perf_counter()
+            self.file.write(self.record.tobytes())
+        else:
+            self.file = open(path, "wb")
+            self.file.write(build_header())
+
+        self.record_count = 0
+        self.last_flush_time = time.perf_counter()
+        self.lock = threading.Lock()
+
+    # Appends the record of a recognition result (called by the recognizer's result workers)
+    def write(self, result, timestamp_ms, captured_at):
+        with self.lock:
+            if self.file is None:
+                return
+
+            encode(self.record, result, timestamp_ms, captured_at)
+            self.file.write(self.record.tobytes())
+            self.record_count += 1
+
+            now = time.perf_counter()
+
+            if now - self.last_flush_time >= FLUSH_INTERVAL:
+                self.file.flush()
+                self.last_flush_time = now
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+# Raises ResultLogError if the file doesn't start with a valid header for the current record layout
+def check_header(path):
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+
+    if len(header) < HEADER_SIZE or header[:4] != MAGIC:
+        raise ResultLogError(f"{path} is not a result log")
+
+    _, version, record_size = struct.unpack_from("<4sII", header)
+
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ResultLogError(f"{path} was written with an unsupported record layout (version {version}, {record_size} bytes per record)")
+
+# Returns the records of a result log as a read-only structured array mapped to the file (an incomplete last record is left out)
+def load(path: str):
+    check_header(path)
+
+    record_count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+
+    if record_count == 0:
+        return np.zeros(0, RECORD_DTYPE)
+
+    return np.memmap(path, RECORD_DTYPE, "r", HEADER_SIZE, (record_count,))
+
+# Returns the time of each record (in seconds) since the first one. Capture times are only compared within a recording session: the first record of each
+# session comes right after the last record of the previous one, and a capture time earlier than the previous one (in a log written without session markers)
+# doesn't move the time back.
+def replay_offsets(records):
+    captured_at = np.asarray(records["captured_at"], np.float64)
+
+    if not len(captured_at):
+        return captured_at
+
+    steps = np.diff(captured_at, prepend=captured_at[:1])
+    markers = np.asarray(records["timestamp_ms"]) == SESSION_MARKER
+    steps[markers] = 0.0
+    steps[1:][markers[:-1]] = 0.0
+
+    return np.cumsum(np.maximum(steps, 0.0))
+
+# Returns the (record index, hand index) pairs of the gestures the recognizer emitted for the records' results (a gesture other than "None" whose score reaches
+# the threshold), in record order, computed over whole columns so that large logs are scanned quickly
+def gesture_events(records, score_threshold):
+    hands = records["hands"]
+    detected = np.arange(MAX_HANDS) < records["hand_count"][:, None]
+
+    return np.nonzero(detected & (hands["gesture"] != 0) & (hands["gesture_score"] >= score_threshold))
+
+# Returns the (record index, gesture name, hand) tuples of every gesture the recognizer emitted for the records' results, in the order it emitted them: for
+# each record, the gesture of each hand (its custom gesture, if the classifier has templates and one matches, or else its built-in gesture) and then the
+# motion gestures completed by the hands' trajectories (followed over the records' times, see replay_offsets), if a tracker is given and enabled. Custom
+# gestures are classified in batches of hands, and frames are assumed to have the given aspect ratio, which the log doesn't record.
+def replay_events(records, score_threshold, classifier=None, tracker=None, aspect_ratio=motion_gestures.DEFAULT_ASPECT_RATIO):
+    hands = records["hands"]
+    names = {}
+
+    record_indices, hand_indices = gesture_events(records, score_threshold)
+
+    for record_index, hand_index, gesture in zip(record_indices.tolist(), hand_indices.tolist(), hands["gesture"][record_indices, hand_indices].tolist()):
+        names[(record_index, hand_index)] = GESTURE_NAMES[gesture]
+
+    if classifier is not None and classifier.names():
+        record_indices, hand_indices = np.nonzero(np.arange(MAX_HANDS) < records["hand_count"][:, None])
+
+        for start in range(0, len(record_indices), CLASSIFY_BATCH_SIZE):
+            batch = (record_indices[start:start + CLASSIFY_BATCH_SIZE], hand_indices[start:start + CLASSIFY_BATCH_SIZE])
+            custom_names = classifier.classify(custom_gestures.landmark_array(hands["landmarks"][batch]), hands["hand"][batch] == HAND_NAMES.index("Left"),
+                                               aspect_ratio)
+
+            for record_index, hand_index, name in zip(batch[0].tolist(), batch[1].tolist(), custom_names):
+                if name is not None:
+                    names[(record_index, hand_index)] = name
+
+    events = [(record_index, name, HAND_NAMES[hands["hand"][record_index, hand_index]]) for (record_index, hand_index), name in sorted(names.items())]
+
+    # The sort is stable, so the motion gestures of a record stay after the gestures of its hands
+    if tracker is not None and tracker.enabled:
+        events.extend(motion_gestures.detect_records(records, tracker, aspect_ratio, replay_offsets(records)))
+        events.sort(key=lambda event: event[0])
+
+    return events
+
+# Result replayer class, a stand-in for the live gesture recognizer that feeds the gestures of a result log into the gesture queue without loading MediaPipe.
+# The custom and motion gestures are derived again from the recorded landmarks (see replay_events), with the templates and settings of the configuration
+# loaded by load_config. Records are replayed at speed times their recorded rate, or as fast as possible when speed is 0. Each gesture is given its recorded
+# capture time mapped onto the replay clock (the time it is due at, or its offset from the start of the log, see replay_offsets, when replaying as fast as
+# possible, which is ahead of real time and left out of the handler's dispatch latency), so the gesture handler sees the gestures as far apart as they were
+# recorded instead of all of them being captured while the previous action was executed.
+class ResultReplayer(threading.Thread):
+    def __init__(self, stop_recognizer: threading.Event, gesture_queue: queue.Queue, records, speed: float = 1.0,
+                 score_threshold: float = gesture_recognizer.GESTURE_SCORE_THRESHOLD, aspect_ratio: float = motion_gestures.DEFAULT_ASPECT_RATIO):
+        super().__init__()
+
+        # Event that, when set, will be used to stop this thread; it is set once every record has been replayed, as the recognizer does at the end of a source
+        self.stop_recognizer = stop_recognizer
+        self.gesture_queue = gesture_queue
+
+        self.records = records
+        self.speed = speed
+        self.score_threshold = score_threshold
+
+        # Classifier of the custom gestures and tracker of the motion gestures, as in the live recognizer, and aspect ratio of the recorded frames
+        self.custom_gestures = custom_gestures.CustomGestureClassifier()
+        self.motion = motion_gestures.MotionTracker()
+        self.aspect_ratio = aspect_ratio
+
+        # Number of records (up to the last one with a gesture) and gestures replayed, and description of the error that stopped the replayer (always None,
+        # as in a recognizer that has reached the end of its source)
+        self.replayed_count = 0
+        self.gesture_count = 0
+        self.error = None
+
+    # Loads the custom gesture templates and the motion gesture settings of the application configuration, before executing the thread
+    def load_config(self, config):
+        self.custom_gestures.load_config(config)
+        self.motion.load_config(config)
+
+    def run(self):
+        events = replay_events(self.records, self.score_threshold, self.custom_gestures, self.motion, self.aspect_ratio)
+
+        offsets = replay_offsets(self.records).tolist()
+        timestamps = self.records["timestamp_ms"]
+
+        start_time = time.perf_counter()
+
+        for record_index, name, hand in events:
+            if self.stop_recognizer.is_set():
+                break
+
+            offset = offsets[record_index]
+
+            # Wait until the record is due on the replay clock (unless replaying as fast as possible), checking the stop Event regularly
+            if self.speed > 0:
+                due_time = start_time + offset / self.speed
+                now = time.perf_counter()
+
+                while now < due_time and not self.stop_recognizer.wait(min(due_time - now, STOP_CHECK_INTERVAL)):
+                    now = time.perf_counter()
+            else:
+                due_time = start_time + offset
+
+            self.gesture_queue.put({
+                "name": name,
+                "hand": hand,
+                "timestamp": int(timestamps[record_index]),
+                "captured_at": due_time
+            })
+
+            self.gesture_count += 1
+            self.replayed_count = record_index + 1
+
+        self.stop_recognizer.set()
+        self.gesture_queue.put(None)
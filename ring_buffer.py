@@ -0,0 +1,99 @@
+import threading, queue, collections
+
+# Bounded buffer with overwrite-oldest semantics, used to exchange items (frames, executed actions...) between threads. Producers never block: when the buffer is
+# full, the oldest item is discarded and counted as dropped, so the memory held by the buffer is capped at a fixed number of items and consumers always have
+# access to the newest one. The get, put_nowait, get_nowait, qsize and empty methods follow the queue.Queue interface so it can be used as a drop-in replacement.
+# An optional function is called with every discarded item (e.g. to give a pooled frame buffer back to its pool), and listeners can be registered to be
+# notified of every new item (e.g. to wake up a consumer running an event loop instead of having it poll the buffer).
+class RingBuffer:
+    def __init__(self, capacity: int = 1, on_drop=None):
+        if capacity < 1:
+            raise ValueError("RingBuffer capacity must be at least 1")
+
+        # Maximum number of items stored at the same time
+        self.capacity = capacity
+
+        # Stored items, the oldest one on the left
+        self.items = collections.deque(maxlen=capacity)
+
+        # Condition used to wake up consumers waiting for a new item
+        self.not_empty = threading.Condition(threading.Lock())
+
+        # Number of items put into the buffer, and number of them that were discarded without being consumed
+        self.put_count = 0
+        self.dropped_count = 0
+
+        # Function called with each discarded item, and functions called without arguments after each new item, outside of the buffer's lock
+        self.on_drop = on_drop
+        self.listeners = []
+
+    # Adds an item to the buffer, discarding the oldest one if the buffer is full. The block and timeout arguments are accepted for queue.Queue compatibility
+    # but ignored, as this method never blocks.
+    def put(self, item, block=True, timeout=None):
+        dropped = []
+
+        with self.not_empty:
+            if len(self.items) == self.capacity:
+                self.dropped_count += 1
+                dropped.append(self.items.popleft())
+
+            self.items.append(item)
+            self.put_count += 1
+
+            self.not_empty.notify()
+
+        self.drop(dropped)
+
+        for listener in self.listeners:
+            listener()
+
+    # Registers a function that will be called, from the producer's thread, every time an item is put into the buffer
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    # Removes and returns the oldest item in the buffer, raising queue.Empty if no item is available (immediately if block is False, or after the timeout)
+    def get(self, block=True, timeout=None):
+        with self.not_empty:
+            if block and not self.not_empty.wait_for(lambda: self.items, timeout):
+                raise queue.Empty
+
+            if not self.items:
+                raise queue.Empty
+
+            return self.items.popleft()
+
+    def get_nowait(self):
+        return self.get(False)
+
+    # Removes and returns the newest item in the buffer, discarding (and counting as dropped) every older item, or raises queue.Empty if the buffer is empty
+    def get_latest(self):
+        with self.not_empty:
+            if not self.items:
+                raise queue.Empty
+
+            self.dropped_count += len(self.items) - 1
+            item = self.items.pop()
+            dropped = list(self.items)
+            self.items.clear()
+
+        self.drop(dropped)
+
+        return item
+
+    # Calls the on_drop function with each of the given discarded items
+    def drop(self, dropped):
+        if self.on_drop is not None:
+            for item in dropped:
+                self.on_drop(item)
+
+    # Returns the number of items currently stored
+    def qsize(self):
+        with self.not_empty:
+            return len(self.items)
+
+    # Returns True if there are no items stored; otherwise, returns False
+    def empty(self):
+        return self.qsize() == 0
@@ -0,0 +1,230 @@
+import threading, queue, numpy as np
+from multiprocessing import shared_memory
+
+# Constants
+DEFAULT_SLOTS = 3
+NO_SLOT = -1
+
+# Layout of the header of each slot of a shared frame ring, followed by the frame's pixels
+SLOT_HEADER_DTYPE = np.dtype([("height", np.int32), ("width", np.int32), ("channels", np.int32), ("frame_index", np.int64)])
+
+# Indices of the ring's control values: the newest published slot, the slot being read, and the number of frames published
+CONTROL_LATEST = 0
+CONTROL_READER = 1
+CONTROL_SEQUENCE = 2
+CONTROL_SIZE = 3
+
+# Ring of frame slots in a multiprocessing.shared_memory block, written by the recognizer process and read by the interface process without copying the
+# frames. The writer copies each frame into a slot that is neither the newest published one nor the one being read, then publishes it; the reader takes a
+# view of the newest slot, which the writer won't touch until the reader takes another one. A multiprocessing lock shared by both processes guards the choice
+# of slots, never the copies. The block is created by the writer and attached to by the reader using its name.
+class SharedFrameRing:
+    def __init__(self, lock, slot_bytes: int = 0, slots: int = DEFAULT_SLOTS, name: str = None):
+        self.lock = lock
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.slot_size = SLOT_HEADER_DTYPE.itemsize + slot_bytes
+
+        # Control values are followed by the slots; the memory block is created when no name is given, or attached to otherwise
+        control_bytes = CONTROL_SIZE * np.dtype(np.int64).itemsize
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=control_bytes + slots * self.slot_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.owner = name is None
+        self.control = np.ndarray(CONTROL_SIZE, np.int64, self.shm.buf)
+        self.headers = [np.ndarray((), SLOT_HEADER_DTYPE, self.shm.buf, control_bytes + i * self.slot_size) for i in range(slots)]
+        self.offsets = [control_bytes + i * self.slot_size + SLOT_HEADER_DTYPE.itemsize for i in range(slots)]
+
+        if self.owner:
+            self.control[:] = (NO_SLOT, NO_SLOT, 0)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # Returns True if a frame with the given shape fits in a slot; otherwise, returns False
+    def fits(self, shape):
+        return int(np.prod(shape)) <= self.slot_bytes
+
+    # Copies a frame into a free slot and publishes it as the newest one
+    def write(self, frame, frame_index):
+        with self.lock:
+            latest, reader = self.control[CONTROL_LATEST], self.control[CONTROL_READER]
+            slot = next(i for i in range(self.slots) if i != latest and i != reader)
+
+        header = self.headers[slot]
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim > 2 else 1
+        header["height"], header["width"], header["channels"], header["frame_index"] = height, width, channels, frame_index
+
+        np.copyto(self.view(slot, frame.shape), frame)
+
+        with self.lock:
+            self.control[CONTROL_LATEST] = slot
+            self.control[CONTROL_SEQUENCE] += 1
+
+    # Returns (sequence, frame, frame_index) for the newest published frame, where frame is a view of its slot that stays valid until the next call, or
+    # raises queue.Empty if no frame has been published yet
+    def read_latest(self):
+        with self.lock:
+            slot = int(self.control[CONTROL_LATEST])
+            sequence = int(self.control[CONTROL_SEQUENCE])
+
+            if slot == NO_SLOT:
+                raise queue.Empty
+
+            self.control[CONTROL_READER] = slot
+
+        header = self.headers[slot]
+        shape = (int(header["height"]), int(header["width"]), int(header["channels"]))
+
+        return sequence, self.view(slot, shape), int(header["frame_index"])
+
+    # Returns the number of frames published so far
+    def sequence(self):
+        return int(self.control[CONTROL_SEQUENCE])
+
+    # Returns an array of the given shape backed by a slot's pixels
+    def view(self, slot, shape):
+        return np.ndarray(shape, np.uint8, self.shm.buf, self.offsets[slot])
+
+    # Closes the memory block, removing it if this ring created it. Returns False if it cannot be closed yet, as views of it are still in use.
+    def close(self):
+        self.control = self.headers = None
+
+        try:
+            self.shm.close()
+        except BufferError:
+            return False
+
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+        return True
+
+# Writer side of the frame transport, used by the recognizer process as its frame queue. Each frame put into it is copied into the shared frame ring, its
+# buffer is given back to the pool and a "frame" record is sent to the interface process. The ring is created on the first frame and replaced by a larger
+# one when a frame doesn't fit (e.g. after the capture resolution has changed), announcing it with a "ring" record.
+class FrameRingWriter:
+    def __init__(self, sender, lock, frame_pool, slots: int = DEFAULT_SLOTS):
+        self.sender = sender
+        self.lock = lock
+        self.frame_pool = frame_pool
+        self.slots = slots
+
+        self.ring = None
+        self.retired_rings = []
+        self.put_count = 0
+
+    def put(self, frame, block=True, timeout=None):
+        if self.ring is None or not self.ring.fits(frame.shape):
+            if self.ring is not None:
+                self.retired_rings.append(self.ring)
+
+            self.ring = SharedFrameRing(self.lock, frame.nbytes, self.slots)
+            self.sender.send(("ring", self.ring.name, self.ring.slot_bytes, self.ring.slots))
+
+        self.ring.write(frame, self.put_count)
+        self.frame_pool.release(frame)
+        self.put_count += 1
+
+        self.sender.send(("frame",))
+
+    # Removes every ring created by this writer
+    def close(self):
+        for ring in self.retired_rings + [self.ring]:
+            if ring is not None:
+                ring.close()
+
+        self.ring = None
+        self.retired_rings = []
+
+# Reader side of the frame transport, used by the interface process as its frame queue. It follows the RingBuffer interface used by the interface (qsize,
+# get_latest and add_listener): get_latest returns a view of the newest frame in shared memory instead of a copy, valid until the next call.
+class FrameRingReader:
+    def __init__(self, lock):
+        self.lock = lock
+
+        self.ring = None
+        self.retired_rings = []
+
+        # Sequence number of the last frame returned, and number of published frames that were never returned
+        self.last_sequence = 0
+        self.dropped_count = 0
+
+        self.listeners = []
+        self.ring_lock = threading.Lock()
+
+    # Attaches to the ring announced by a "ring" record, replacing the previous one
+    def attach(self, name, slot_bytes, slots):
+        with self.ring_lock:
+            if self.ring is not None:
+                self.retired_rings.append(self.ring)
+
+            self.ring = SharedFrameRing(self.lock, slot_bytes, slots, name)
+            self.last_sequence = 0
+
+    # Notifies the listeners that a new frame has been published, as announced by a "frame" record
+    def notify(self):
+        for listener in self.listeners:
+            listener()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    # Returns the view of the newest frame, raising queue.Empty if no new frame has been published since the last call
+    def get_latest(self):
+        with self.ring_lock:
+            if self.ring is None or self.ring.sequence() == self.last_sequence:
+                raise queue.Empty
+
+            sequence, frame, _ = self.ring.read_latest()
+
+            self.dropped_count += max(sequence - self.last_sequence - 1, 0)
+            self.last_sequence = sequence
+
+            # The previous rings can be closed once the views of their frames are not used anymore
+            self.retired_rings = [ring for ring in self.retired_rings if not ring.close()]
+
+        return frame
+
+    def get_nowait(self):
+        return self.get_latest()
+
+    # Returns 1 if a frame has been published since the last one returned; otherwise, returns 0
+    def qsize(self):
+        with self.ring_lock:
+            return int(self.ring is not None and self.ring.sequence() != self.last_sequence)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    # Detaches from every ring
+    def close(self):
+        with self.ring_lock:
+            for ring in self.retired_rings + [self.ring]:
+                if ring is not None:
+                    ring.close()
+
+            self.ring = None
+            self.retired_rings = []
+
+# Sends records over one end of a multiprocessing pipe from any thread (a Connection can't be used by several threads at the same time)
+class RecordSender:
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.Lock()
+
+    def send(self, record):
+        with self.lock:
+            try:
+                self.connection.send(record)
+            except (OSError, ValueError):
+                # The other process has closed its end of the pipe
+                pass
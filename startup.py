@@ -0,0 +1,16 @@
+import time
+
+# Time (time.perf_counter value) at which this module was imported, which the application does before any other import
+START_TIME = time.perf_counter()
+
+# Startup stages reached, in order, and the time (in seconds since START_TIME) each one was reached
+stages = {}
+
+# Records the time at which a startup stage has been reached, unless it had already been reached
+def mark(stage):
+    if stage not in stages:
+        stages[stage] = time.perf_counter() - START_TIME
+
+# Returns the line reporting the time at which each startup stage was reached
+def report():
+    return "startup: " + " | ".join(f"{stage} {seconds:.2f} s" for stage, seconds in stages.items())